@@ -21,38 +21,213 @@ A: Clear criteria for each route, examples showing correct classifications, and
    edge cases (like "unknown" for unrelated questions). The prompt should be unambiguous
    so the model consistently routes questions correctly.
 
+Q: How do you classify 100k historical questions without 100k LLM calls?
+A: Normalize and dedupe first, and skip anything already in the route cache. Pack
+   the rest (e.g. 50 per call) into one prompt with numbered ids and ask for
+   structured output with one key per id (q0, q1, ...). Each value is constrained
+   by a strict JSON schema to a one-letter code (p|h|b|u), a single output token
+   per label, so the reply is short and always parseable. Packs run concurrently
+   under a cap. A pack whose request or reply is rejected (a 400, a reply that
+   fails the schema) is split in half and retried, so one bad question cannot
+   sink its neighbours. A 429, 503 or timeout is the quota, not the pack: the
+   same pack waits (Retry-After, else exponential backoff with jitter) and is
+   sent again, and after a few tries the run stops. Auth errors stop it at once.
+   Finished packs are cached as they land, so a stopped run resumes where it
+   was. At 50 per pack and 16 packs in flight, 100k questions take 2,000 calls:
+   minutes, bounded by the deployment's TPM quota.
+
 SAMPLE CODE:
 """
 
+import asyncio
 import os
+import random
+import sqlite3
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, List, Literal, Optional, Sequence
 
+from langchain_core.exceptions import OutputParserException
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_openai import AzureChatOpenAI
+from pydantic import BaseModel, ValidationError, create_model
+
+from ragkit.batch import dedupe, normalize_question
+from ragkit.limiter import is_overload_error
+from ragkit.paths import data_path
 
 ROUTES = ["policy", "hr", "hybrid"]
+ROUTE_CODES = {"p": "policy", "h": "hr", "b": "hybrid", "u": "unknown"}
 
+# Q: Why is the prompt a module-level constant?
+# A: 21_hr_policy_server.py reuses it to escalate questions its local intent
+#    classifier is unsure about, so both route with the same instructions.
+ROUTE_PROMPT = PromptTemplate.from_template(
+    "Classify the user question into a single route: policy | hr | hybrid.\n"
+    "Instructions:\n"
+    "- 'policy': ONLY for company rules/policies (e.g., overtime policy, PTO accrual, leave eligibility, holiday policy, expense policy).\n"
+    "- 'hr': ONLY for personal HR data (e.g., my manager, my salary, my PTO balance, my start date, my years of service).\n"
+    "- 'hybrid': if BOTH policy and personal HR data are required.\n"
+    "- If the question is unrelated to company policy or personal HR data (e.g., weather, sports, general trivia), return 'unknown'.\n\n"
+    "Examples:\n"
+    "- 'Who is my manager?' -> hr\n"
+    "- 'How is overtime computed?' -> policy\n"
+    "- 'Given my 2 years, what overtime am I eligible for?' -> hybrid\n"
+    "Return only one word: policy | hr | hybrid | unknown.\n\n"
+    "Question: {q}"
+)
 
-def classify_route(question: str) -> str:
-    """Return one of 'policy' | 'hr' | 'hybrid'."""
-    llm = AzureChatOpenAI(
+
+BATCH_ROUTE_PROMPT = PromptTemplate.from_template(
+    "Classify each numbered user question into a route, answering with its code.\n"
+    "Codes:\n"
+    "- p (policy): ONLY company rules/policies (e.g., overtime policy, PTO accrual, leave eligibility, holiday policy, expense policy).\n"
+    "- h (hr): ONLY personal HR data (e.g., my manager, my salary, my PTO balance, my start date, my years of service).\n"
+    "- b (hybrid): BOTH policy and personal HR data are required.\n"
+    "- u (unknown): unrelated to company policy or personal HR data (e.g., weather, sports, general trivia).\n\n"
+    "Examples:\n"
+    "- 'Who is my manager?' -> h\n"
+    "- 'How is overtime computed?' -> p\n"
+    "- 'Given my 2 years, what overtime am I eligible for?' -> b\n\n"
+    "Return one key per question id with its code.\n\n"
+    "Questions:\n{questions}"
+)
+
+
+@lru_cache(maxsize=1)
+def make_llm() -> AzureChatOpenAI:
+    # One client per process; building it per question re-reads config and reconnects
+    return AzureChatOpenAI(
         azure_deployment=os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"], temperature=0
     )
-    prompt = PromptTemplate.from_template(
-        "Classify the user question into a single route: policy | hr | hybrid.\n"
-        "Instructions:\n"
-        "- 'policy': ONLY for company rules/policies (e.g., overtime policy, PTO accrual, leave eligibility, holiday policy, expense policy).\n"
-        "- 'hr': ONLY for personal HR data (e.g., my manager, my salary, my PTO balance, my start date, my years of service).\n"
-        "- 'hybrid': if BOTH policy and personal HR data are required.\n"
-        "- If the question is unrelated to company policy or personal HR data (e.g., weather, sports, general trivia), return 'unknown'.\n\n"
-        "Examples:\n"
-        "- 'Who is my manager?' -> hr\n"
-        "- 'How is overtime computed?' -> policy\n"
-        "- 'Given my 2 years, what overtime am I eligible for?' -> hybrid\n"
-        "Return only one word: policy | hr | hybrid | unknown.\n\n"
-        "Question: {q}"
+
+
+@lru_cache(maxsize=None)
+def pack_schema(size: int) -> type:
+    """Structured output for a pack: required keys q0..q{size-1}, each one code."""
+    code = Literal["p", "h", "b", "u"]
+    return create_model("RoutePack", **{f"q{i}": (code, ...) for i in range(size)})
+
+
+class RouteCache:
+    """Routes by normalized question, in sqlite so re-runs skip finished work."""
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS routes (question TEXT PRIMARY KEY, route TEXT)"
+        )
+
+    def get_many(self, questions: Sequence[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        for i in range(0, len(questions), 500):
+            chunk = list(questions[i : i + 500])
+            marks = ",".join("?" * len(chunk))
+            found.update(
+                self.db.execute(
+                    f"SELECT question, route FROM routes WHERE question IN ({marks})",
+                    chunk,
+                ).fetchall()
+            )
+        return found
+
+    def put_many(self, routes: Dict[str, str]) -> None:
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO routes VALUES (?, ?)", routes.items()
+            )
+
+
+def _status(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def is_rejected_pack(exc: BaseException) -> bool:
+    """The pack itself was bad (request refused, reply off schema): split it."""
+    if isinstance(exc, (ValidationError, OutputParserException)):
+        return True
+    return _status(exc) in (400, 422) or "LengthFinishReason" in type(exc).__name__
+
+
+def retry_delay(exc: BaseException, attempt: int) -> float:
+    """Seconds to wait after an overload: the provider's Retry-After, else backoff."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return min(30.0, 2.0**attempt) * random.uniform(0.5, 1.0)
+
+
+async def aclassify_routes(
+    questions: Sequence[str],
+    llm: Optional[AzureChatOpenAI] = None,
+    pack_size: int = 50,
+    max_concurrency: int = 16,
+    cache: Optional[RouteCache] = None,
+    retries: int = 5,
+) -> List[str]:
+    """Route many questions with packed structured-output calls; same labels as classify_route."""
+    llm = llm or make_llm()
+    keys = [normalize_question(q) for q in questions]
+    unique, positions = dedupe(keys)
+    routes = cache.get_many(unique) if cache is not None else {}
+    todo = [q for q in unique if q not in routes]
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def run_pack(pack: List[str]) -> Dict[str, str]:
+        chain = BATCH_ROUTE_PROMPT | llm.with_structured_output(
+            pack_schema(len(pack)), method="json_schema", strict=True
+        )
+        numbered = "\n".join(f"q{i}: {q}" for i, q in enumerate(pack))
+        for attempt in range(retries + 1):
+            try:
+                async with sem:
+                    out: BaseModel = await chain.ainvoke({"questions": numbered})
+                break
+            except Exception as e:
+                if is_overload_error(e) and attempt < retries:
+                    await asyncio.sleep(retry_delay(e, attempt))
+                    continue
+                if not is_rejected_pack(e):
+                    raise  # auth, quota still exhausted, or a bug: stop the run
+                if len(pack) == 1:
+                    return {}  # left unrouted; retried on the next run
+                mid = len(pack) // 2
+                halves = await asyncio.gather(
+                    run_pack(pack[:mid]), run_pack(pack[mid:])
+                )
+                return {**halves[0], **halves[1]}
+        return {q: ROUTE_CODES[getattr(out, f"q{i}")] for i, q in enumerate(pack)}
+
+    async def run_and_cache(pack: List[str]) -> None:
+        found = await run_pack(pack)
+        routes.update(found)
+        if cache is not None:
+            cache.put_many(found)
+
+    packs = [todo[i : i + pack_size] for i in range(0, len(todo), pack_size)]
+    await asyncio.gather(*(run_and_cache(p) for p in packs))
+    return [
+        route if route in ROUTES else "I don't know."
+        for route in (routes.get(unique[p], "") for p in positions)
+    ]
+
+
+def classify_routes(questions: Sequence[str], **kwargs) -> List[str]:
+    return asyncio.run(aclassify_routes(questions, **kwargs))
+
+
+def classify_route(question: str) -> str:
+    """Return one of 'policy' | 'hr' | 'hybrid'."""
+    llm = make_llm()
+    route = (
+        (ROUTE_PROMPT | llm | StrOutputParser()).invoke({"q": question}).strip().lower()
     )
-    route = (prompt | llm | StrOutputParser()).invoke({"q": question}).strip().lower()
     return route if route in ROUTES else "I don't know."
 
 
@@ -64,5 +239,17 @@ if __name__ == "__main__":
         "How's the weather in Tokyo?",
         "How's the capital of France?",
     ]
-    for t in tests:
-        print(t, "->", classify_route(t))
+    if len(sys.argv) > 1:
+        # python 09g_prompt_routing.py questions.txt  (one question per line)
+        with open(sys.argv[1]) as fh:
+            questions = [line.strip() for line in fh if line.strip()]
+        t0 = time.perf_counter()
+        cache = RouteCache(os.getenv("ROUTE_CACHE") or data_path("route_cache.sqlite"))
+        routes = classify_routes(questions, cache=cache)
+        elapsed = time.perf_counter() - t0
+        counts = {r: routes.count(r) for r in sorted(set(routes))}
+        print(f"{len(questions)} questions in {elapsed:.1f}s: {counts}")
+    else:
+        for t in tests:
+            print(t, "->", classify_route(t))
+        print("batch:", classify_routes(tests))
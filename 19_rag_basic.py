@@ -34,9 +34,17 @@ from langchain_chroma import Chroma
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from ragkit.context import annotate_token_counts, pack_context
+from ragkit.retrieval import AdaptiveK, query_candidates, select_candidates
+from ragkit.tracing import TRACE_CALLBACK, get_tracer
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+RETRIEVAL_K = AdaptiveK.from_env(default_k=6)
+
 
 # Q: How do you build a vector store from documents?
 # A: Load documents, split into chunks, create embeddings, and store in vector database
@@ -53,7 +61,9 @@ def build_vectorstore(persist_dir: str) -> Chroma:
         # Q: How do you split text into chunks?
         # A: Use RecursiveCharacterTextSplitter with chunk_size and chunk_overlap
         #    Overlap ensures context isn't lost at chunk boundaries
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1200, chunk_overlap=200)
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1200, chunk_overlap=200, add_start_index=True
+        )
         docs = splitter.create_documents(
             [text], metadatas=[{"source": str(corpus_path)}]
         )
@@ -63,10 +73,16 @@ def build_vectorstore(persist_dir: str) -> Chroma:
         # Load PDF pages, then split into chunks
         loader = PyPDFLoader(str(pdf_path))
         pages = loader.load()
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000, chunk_overlap=150, add_start_index=True
+        )
         docs = splitter.split_documents(pages)
 
     print(f"Loaded {len(docs)} chunks for indexing")
+    # Q: Why count tokens at index time?
+    # A: The context packer needs each chunk's token count on every request;
+    #    storing it in metadata once avoids re-tokenizing the same chunks
+    annotate_token_counts(docs)
 
     # Q: How do you create embeddings?
     # A: Use an embeddings model (AzureOpenAIEmbeddings) to convert text to vectors
@@ -98,10 +114,6 @@ def get_or_create_vectorstore(base_persist_dir: str) -> Chroma:
 # Q: How do you create a RAG chain?
 # A: Combine retriever (finds relevant docs) with LLM (generates answer from context)
 def make_chain(vs: Chroma):
-    # Q: How do you create a retriever?
-    # A: Convert vector store to retriever with search_kwargs (like k=6 for top 6 results)
-    retriever = vs.as_retriever(search_kwargs={"k": 6})
-
     # Q: How do you design a RAG prompt?
     # A: Include placeholders for context and question - instruct model to use context
     #    and say "don't know" if answer isn't in context
@@ -126,12 +138,24 @@ def make_chain(vs: Chroma):
     def format_docs(docs):
         return "\n\n".join(f"[{i+1}] {d.page_content}" for i, d in enumerate(docs))
 
+    # Q: How do you keep retrieved context from bloating the prompt?
+    # A: Fetch candidates with scores and vectors, keep only as many as the score
+    #    profile supports (adaptive k), merge overlapping neighbours, order by MMR
+    #    to skip near-duplicates, and stop at a token budget
+    def retrieve_and_pack(question: str) -> str:
+        qvec = vs.embeddings.embed_query(question)
+        hits = query_candidates(vs, [qvec], RETRIEVAL_K.max_k, include_embeddings=True)
+        cands = select_candidates(vs, hits[0], RETRIEVAL_K, label="19/rag")
+        packed = pack_context(cands, CONTEXT_TOKEN_BUDGET, query_embedding=qvec)
+        print(f"Context: {packed.tokens_used} tokens ({packed.tokens_saved} saved)")
+        return packed.text(format_docs)
+
     # Q: How do you build the complete RAG chain?
     # A: Use LCEL to chain: question → retrieve → format → prompt → llm → parse
-    #    LCEL chain: take question -> retrieve -> format -> prompt -> llm -> string
+    #    LCEL chain: take question -> retrieve + pack -> prompt -> llm -> string
     return (
         {
-            "context": itemgetter("question") | retriever | format_docs,
+            "context": itemgetter("question") | RunnableLambda(retrieve_and_pack),
             "question": itemgetter("question"),
         }
         | prompt
@@ -149,6 +173,11 @@ def main():
             "Set OPENAI_API_KEY or configure Azure with AZURE_OPENAI_DEPLOYMENT_NAME (and related Azure env vars)."
         )
 
+    # Q: How do you see where a RAG call spends its time?
+    # A: TRACE_EXPORT=file (or otlp) records one trace per question: retrieval,
+    #    prompt, LLM (model, tokens) and parser as spans
+    get_tracer(service="19_rag_basic")
+
     persist_dir = str(Path(__file__).parent / ".chroma_rag_resume")
     vs = get_or_create_vectorstore(persist_dir)
     chain = make_chain(vs)
@@ -167,7 +196,7 @@ def main():
             f"Retrieved {len(top_docs)} docs. First snippet: ",
             (top_docs[0].page_content[:180] + "...") if top_docs else "<none>",
         )
-        answer = chain.invoke({"question": q})
+        answer = chain.invoke({"question": q}, config={"callbacks": [TRACE_CALLBACK]})
         print("\n--- Answer ---\n", answer)
 
 
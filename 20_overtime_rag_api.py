@@ -24,25 +24,71 @@ A: Retrieve policy context via RAG, fetch user data from HR systems, then comput
 SAMPLE CODE:
 """
 
+import asyncio
+import functools
+import importlib.util
+import itertools
 import os
+import tempfile
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Mapping, Optional, Union
 
-import httpx
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from langchain_chroma import Chroma
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_openai import (AzureChatOpenAI, AzureOpenAIEmbeddings,
-                              ChatOpenAI, OpenAIEmbeddings)
+from langchain_openai import (
+    AzureChatOpenAI,
+    AzureOpenAIEmbeddings,
+    ChatOpenAI,
+    OpenAIEmbeddings,
+)
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pydantic import BaseModel
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
+from starlette.background import BackgroundTask
+
+from ragkit.answers import render_rule_answer, rule_question
+from ragkit.batch import dedupe, error_item, normalize_question
+from ragkit.context import PackedContext, annotate_token_counts, pack_context
+from ragkit.deadline import (
+    DEADLINE_HEADER,
+    CircuitBreaker,
+    StageBudgets,
+    StageFailed,
+    deadline_scope,
+    parse_deadline_header,
+    run_stage,
+    snippet,
+)
+from ragkit.fakes import FakeChatModel, fake_models_enabled, make_fake_embeddings
+from ragkit.hr_cache import HRViewCache
+from ragkit.hr_provider import make_hr_provider
+from ragkit.hr_store import get_hr_store
+from ragkit.llm_scheduler import add_overload_handler, get_scheduler, llm_priority
+from ragkit.metrics import STAGE_TIMER, install_metrics
+from ragkit.overtime import ARROW_STREAM, CSV, iter_arrow, iter_csv
+from ragkit.policy_rules import PolicyRules, RulesFile, pages_text, rules_path
+from ragkit.retrieval import AdaptiveK, query_candidates, select_candidates
+from ragkit.shared_index import (
+    MmapIndex,
+    file_lock,
+    load_shared_index,
+    shared_index_enabled,
+)
+from ragkit.signals import get_signals
+from ragkit.singleflight import SingleFlight, make_key
+from ragkit.tracing import TRACE_CALLBACK, install_tracing
+from ragkit.usage import MeteredEmbeddings, install_usage, meter_llm, tag_usage
 
 POLICY_PDF = Path(__file__).parent / "20_policy_overtime.pdf"
 PERSIST_BASE = str(Path(__file__).parent / ".chroma_overtime")
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+RETRIEVAL_K = AdaptiveK.from_env(default_k=4)
 
 
 def ensure_policy_pdf() -> None:
@@ -65,27 +111,33 @@ def ensure_policy_pdf() -> None:
 
 
 def make_embeddings():
-    if os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT"):
-        return AzureOpenAIEmbeddings(
+    # Metered: tokens and latency of every embedding call land in the usage rollup
+    if fake_models_enabled():
+        embeddings = make_fake_embeddings()
+    elif os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT"):
+        embeddings = AzureOpenAIEmbeddings(
             azure_deployment=os.environ["AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT"]
         )
-    return OpenAIEmbeddings()
+    else:
+        embeddings = OpenAIEmbeddings()
+    return MeteredEmbeddings(embeddings)
 
 
 def make_llm():
-    if os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"):
-        return AzureChatOpenAI(
+    # Every call goes through the process-wide scheduler (priority lanes, RPM/TPM)
+    # and is metered for token/cost accounting
+    if fake_models_enabled():
+        model = FakeChatModel.from_env()
+    elif os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"):
+        model = AzureChatOpenAI(
             azure_deployment=os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"], temperature=0
         )
-    return ChatOpenAI(temperature=0, model="gpt-4o-mini")
+    else:
+        model = ChatOpenAI(temperature=0, model="gpt-4o-mini")
+    return meter_llm(get_scheduler().wrap(model))
 
 
-def build_or_load_index() -> Chroma:
-    ensure_policy_pdf()
-    embeddings = make_embeddings()
-    deployment_suffix = os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT", "openai")
-    persist_dir = f"{PERSIST_BASE}_{deployment_suffix}"
-
+def open_or_build_chroma(embeddings, persist_dir: str) -> Chroma:
     if Path(persist_dir).exists():
         try:
             return Chroma(embedding_function=embeddings, persist_directory=persist_dir)
@@ -94,27 +146,79 @@ def build_or_load_index() -> Chroma:
 
     loader = PyPDFLoader(str(POLICY_PDF))
     pages = loader.load()
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=120)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=800, chunk_overlap=120, add_start_index=True
+    )
     docs = splitter.split_documents(pages)
+    annotate_token_counts(docs)
     vs = Chroma.from_documents(
         docs, embedding=embeddings, persist_directory=persist_dir
     )
+    # Index time: the overtime tiers are compiled from the pages just embedded
+    compile_policy_rules(pages).save(rules_path(persist_dir))
     return vs
 
 
-app = FastAPI(title="Overtime RAG API")
+def compile_policy_rules(pages=None) -> PolicyRules:
+    if pages is None:
+        pages = PyPDFLoader(str(POLICY_PDF)).load()
+    return PolicyRules.compile(pages_text(pages), source=POLICY_PDF.name)
+
+
+def index_dir() -> str:
+    deployment_suffix = (
+        "fake"
+        if fake_models_enabled()
+        else os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT", "openai")
+    )
+    return f"{PERSIST_BASE}_{deployment_suffix}"
+
+
+def build_or_load_index() -> Union[Chroma, MmapIndex]:
+    ensure_policy_pdf()
+    embeddings = make_embeddings()
+    persist_dir = index_dir()
+
+    # Pre-fork workers build once under a lock and share a memory-mapped snapshot
+    if shared_index_enabled():
+        return load_shared_index(
+            persist_dir,
+            embeddings,
+            lambda: open_or_build_chroma(embeddings, persist_dir),
+        )
+    with file_lock(f"{persist_dir}.lock"):
+        return open_or_build_chroma(embeddings, persist_dir)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await hr_provider.aclose()
+
+
+app = FastAPI(title="Overtime RAG API", lifespan=lifespan)
+add_overload_handler(app)
+install_metrics(app)
+install_tracing(app)
+install_usage(app, service="20_overtime_rag_api")
 vectorstore = build_or_load_index()
+# Overtime tiers compiled with the index; followed across rebuilds
+policy_rules = RulesFile.ensure(index_dir(), compile_policy_rules)
 llm = make_llm()
 parser = StrOutputParser()
+CALLBACKS = [STAGE_TIMER, TRACE_CALLBACK]
+inflight = SingleFlight()
+retrieval_flight = SingleFlight()
+BUDGETS = StageBudgets.from_env()
+breakers = {name: CircuitBreaker(name) for name in ("retrieval", "hr", "llm")}
+
 
+# Fake HR data lives in the shared HR store (same employees as servers 21/22)
+hr_store = get_hr_store()
+hr_views = HRViewCache.for_store(hr_store)
 
-# Fake HR data
-USER_YEARS: Dict[str, float] = {
-    "alice": 0.8,
-    "bob": 1.0,
-    "carol": 2.0,
-    "dave": 3.4,
-}
+# In-process by default; HR_PROVIDER=remote + HR_API_BASE for a real HR service
+hr_provider = make_hr_provider(hr_store)
 
 
 class AskRequest(BaseModel):
@@ -122,64 +226,310 @@ class AskRequest(BaseModel):
     question: str
 
 
+class AskBatchRequest(BaseModel):
+    items: List[AskRequest]
+    max_concurrency: int = 8
+
+
+ANSWER_PROMPT = PromptTemplate.from_template(
+    "You are an HR assistant. Use the policy context and years of service to answer.\n\n"
+    "Policy Context:\n{context}\n\n"
+    "Years of service: {years}\n\n"
+    "Question: {question}\n\n"
+    "Answer in one short paragraph and cite the multiplier explicitly (e.g., 1.25x)."
+)
+
+
+def _years(user: str) -> float:
+    return float((hr_store.get(user, ["years"]) or {}).get("years") or 0.0)
+
+
 @app.get("/hr/years/{user}")
-async def hr_years(user: str) -> Dict[str, float]:
-    return {"user": user, "years": USER_YEARS.get(user.lower(), 0.0)}
+async def hr_years(user: str, if_none_match: Optional[str] = Header(None)) -> Response:
+    # Unknown users report 0 years, so a view always exists
+    return hr_views.respond(
+        user,
+        ("years",),
+        if_none_match,
+        lambda: {"user": user.lower(), "years": _years(user)},
+    )
+
+
+@app.get("/hr/years")
+async def hr_years_batch(users: str) -> Dict[str, Dict[str, float]]:
+    wanted = {u.strip().lower() for u in users.split(",") if u.strip()}
+    found = hr_store.get_many(wanted, ["years"])
+    return {
+        "years": {u: float((found.get(u) or {}).get("years") or 0.0) for u in wanted}
+    }
+
+
+@app.get("/stats/hr_cache")
+async def hr_cache_stats() -> Mapping[str, int]:
+    return hr_views.stats()
 
 
 def pick_multiplier(years: float) -> float:
-    if years > 2:
-        return 1.7
-    if years == 2:
-        return 1.5
-    if years >= 1:
-        return 1.25
-    return 1.0
+    return policy_rules.rules.multiplier(years)
 
 
-@app.post("/ask")
-async def ask(req: AskRequest) -> Dict[str, str]:
-    # 1) Retrieve policy context
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-    docs = await retriever.ainvoke(req.question)
-    context = "\n\n".join(d.page_content for d in docs)
-
-    # 2) Call fictitious HR API to fetch years of service
-    years: Optional[float] = None
-    try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"http://localhost:8000/hr/years/{req.user}")
-            if resp.status_code == 200:
-                years = float(resp.json().get("years", 0.0))
-    except Exception:
-        years = USER_YEARS.get(req.user.lower(), 0.0)
-    if years is None:
-        years = USER_YEARS.get(req.user.lower(), 0.0)
+@app.get("/stats/policy_rules")
+async def policy_rules_stats() -> Dict[str, object]:
+    rules = policy_rules.rules
+    return {
+        "version": rules.version,
+        "source": rules.source,
+        "tiers": [t.text for t in rules.tiers],
+        "reloads": policy_rules.reloads,
+    }
 
-    # 3) Compute policy multiplier and compose answer with LLM
-    multiplier = pick_multiplier(years)
-    prompt = PromptTemplate.from_template(
-        "You are an HR assistant. Use the policy context and years of service to answer.\n\n"
-        "Policy Context:\n{context}\n\n"
-        "User: {user}\nYears of service: {years}\n\n"
-        "Question: {question}\n\n"
-        "Answer in one short paragraph and cite the multiplier explicitly (e.g., 1.25x)."
+
+async def retrieve_context(question: str) -> PackedContext:
+    # Retrieve candidates with vectors, then merge/dedupe/budget them into the prompt
+    qvec = await vectorstore.embeddings.aembed_query(question)
+    hits = await asyncio.to_thread(
+        query_candidates,
+        vectorstore,
+        [qvec],
+        RETRIEVAL_K.max_k,
+        include_embeddings=True,
+    )
+    cands = select_candidates(vectorstore, hits[0], RETRIEVAL_K, label="20/ask")
+    return pack_context(cands, CONTEXT_TOKEN_BUDGET, query_embedding=qvec)
+
+
+async def answer_question(question: str, years: float, packed: PackedContext) -> str:
+    # Compose the answer with the LLM; shared by coalesced requests
+    chain = ANSWER_PROMPT | llm | parser
+    return await chain.ainvoke(
+        {"context": packed.text(), "years": years, "question": question},
+        config={"callbacks": CALLBACKS},
     )
-    chain = prompt | llm | parser
-    answer = chain.invoke(
-        {
-            "context": context,
-            "user": req.user,
-            "years": years,
-            "question": req.question,
-        }
+
+
+async def years_of_service(user: str) -> float:
+    return await run_stage(
+        "hr", hr_provider.get_years(user), BUDGETS.hr, breakers["hr"]
     )
 
-    return {
+
+async def policy_context(question: str) -> PackedContext:
+    return await run_stage(
+        "retrieval",
+        retrieval_flight.do(make_key(question), lambda: retrieve_context(question)),
+        BUDGETS.retrieval,
+        breakers["retrieval"],
+    )
+
+
+@app.post("/ask")
+async def ask(
+    req: AskRequest, x_deadline_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER)
+) -> Dict[str, object]:
+    question = req.question
+    degraded: List[str] = []
+    answer: Optional[str] = None
+    tag_usage(user=req.user)
+
+    with deadline_scope(parse_deadline_header(x_deadline_ms, BUDGETS.request)):
+        # "What's my overtime rate?" is answered from the compiled policy rules:
+        # no retrieval and no LLM call
+        ruled, asked = rule_question(question, get_signals().match(question).intents)
+        if ruled:
+            return await rule_answer(req.user, asked)
+
+        # 1) HR lookup and policy retrieval are independent; run them concurrently
+        years, packed = await asyncio.gather(
+            years_of_service(req.user), policy_context(question), return_exceptions=True
+        )
+        if isinstance(years, BaseException):
+            degraded.append("hr")
+            years = _years(req.user)
+        if isinstance(packed, BaseException):
+            degraded.append("retrieval")
+            packed = PackedContext()
+
+        # 2) Answer, coalescing identical concurrent requests; skipped without policy
+        if "retrieval" not in degraded:
+            key = make_key(question, years=years)
+            try:
+                answer = await run_stage(
+                    "llm",
+                    inflight.do(key, lambda: answer_question(question, years, packed)),
+                    BUDGETS.llm,
+                    breakers["llm"],
+                )
+            except StageFailed:
+                degraded.append("llm")
+
+    # 3) Compute policy multiplier
+    multiplier = pick_multiplier(years)
+    resp: Dict[str, object] = {
         "answer": answer,
         "computed_multiplier": f"{multiplier:.2f}x",
         "years": str(years),
+        "context_tokens_saved": str(packed.tokens_saved),
+    }
+    if answer is None:
+        # Degraded: return what we computed plus the raw policy text we have
+        resp["answer"] = (
+            f"A full answer is not available right now. With {years} years of "
+            f"service your overtime multiplier is {multiplier:.2f}x."
+        )
+        resp["policy_snippet"] = snippet(packed.text())
+    if degraded:
+        resp["degraded"] = True
+        resp["degraded_stages"] = degraded
+    return resp
+
+
+async def rule_answer(user: str, asked: Optional[float]) -> Dict[str, object]:
+    # Years named in the question ("with 3 years") win over the asker's record
+    rules = policy_rules.rules
+    years = asked
+    personal = years is None
+    degraded = False
+    if years is None:
+        try:
+            years = await years_of_service(user)
+        except Exception:
+            degraded = True
+            years = _years(user)
+    resp: Dict[str, object] = {
+        "answer": render_rule_answer(rules, years, personal),
+        "answered_by": "rules",
+        "computed_multiplier": f"{rules.multiplier(years):.2f}x",
+        "years": str(years),
+        "context_tokens_saved": "0",
+        "policy_version": rules.version,
     }
+    if degraded:
+        resp["degraded"] = True
+        resp["degraded_stages"] = ["hr"]
+    return resp
+
+
+@app.get("/stats/breakers")
+async def breaker_stats() -> Dict[str, Dict[str, object]]:
+    return {name: b.stats() for name, b in breakers.items()}
+
+
+@app.get("/stats/llm_scheduler")
+async def llm_scheduler_stats() -> Dict[str, object]:
+    return get_scheduler().stats()
+
+
+@app.get("/stats/singleflight")
+async def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    return {"answer": inflight.stats(), "retrieval": retrieval_flight.stats()}
+
+
+@app.post("/ask/batch")
+async def ask_batch(req: AskBatchRequest) -> Dict[str, object]:
+    items = req.items
+
+    # 1) One embeddings call and one multi-query search for the unique questions
+    questions, q_pos = dedupe([normalize_question(i.question) for i in items])
+    try:
+        vectors = await vectorstore.embeddings.aembed_documents(questions)
+        hits = await asyncio.to_thread(
+            query_candidates,
+            vectorstore,
+            vectors,
+            RETRIEVAL_K.max_k,
+            include_embeddings=True,
+        )
+    except Exception as e:
+        return {"results": [error_item(e) for _ in items]}
+    packs = [
+        pack_context(
+            select_candidates(vectorstore, h, RETRIEVAL_K, label="20/ask/batch"),
+            CONTEXT_TOKEN_BUDGET,
+            query_embedding=v,
+        )
+        for h, v in zip(hits, vectors)
+    ]
+
+    # 2) One HR lookup for every user in the batch
+    try:
+        years_by_user = await hr_provider.get_years_many(i.user for i in items)
+    except Exception as e:
+        return {"results": [error_item(e) for _ in items]}
+
+    # 3) One LLM call per distinct (years, question), run with a concurrency cap
+    keys, key_pos = dedupe(
+        [(years_by_user[i.user.lower()], q_pos[n]) for n, i in enumerate(items)]
+    )
+    inputs = [
+        {"context": packs[qi].text(), "years": years, "question": questions[qi]}
+        for years, qi in keys
+    ]
+    chain = ANSWER_PROMPT | llm | parser
+    with llm_priority("batch"):
+        answers = await chain.abatch(
+            inputs,
+            config={
+                "max_concurrency": max(1, req.max_concurrency),
+                "callbacks": CALLBACKS,
+            },
+            return_exceptions=True,
+        )
+
+    results: List[Dict[str, object]] = []
+    for n, item in enumerate(items):
+        answer = answers[key_pos[n]]
+        if isinstance(answer, BaseException):
+            results.append(error_item(answer))
+            continue
+        years = years_by_user.get(item.user.lower(), 0.0)
+        results.append(
+            {
+                "answer": answer,
+                "computed_multiplier": f"{pick_multiplier(years):.2f}x",
+                "years": str(years),
+                "context_tokens_saved": str(packs[q_pos[n]].tokens_saved),
+            }
+        )
+    return {"results": results}
+
+
+@app.post("/overtime/bulk")
+async def overtime_bulk(request: Request) -> Response:
+    # Payroll run: years/hours (optional user, rate) columns in, overtime out, in
+    # the request's format (text/csv or Arrow IPC stream), computed and sent back
+    # chunk by chunk
+    content_type = request.headers.get("content-type", CSV).split(";")[0].strip()
+    if content_type not in (CSV, ARROW_STREAM):
+        raise HTTPException(status_code=415, detail=f"send {CSV} or {ARROW_STREAM}")
+    if content_type == ARROW_STREAM and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=415, detail="Arrow input needs pyarrow")
+
+    # Spool the upload (memory up to 16 MiB, then disk): a response generator
+    # that reads the request body races Starlette's disconnect listener for it
+    spool = tempfile.SpooledTemporaryFile(max_size=16 << 20)
+    async for data in request.stream():
+        spool.write(data)
+    spool.seek(0)
+    # One rules version for the whole run, reported in a header
+    rules = policy_rules.rules
+    if content_type == ARROW_STREAM:
+        parts = iter_arrow(spool, rules)
+    else:
+        parts = iter_csv(iter(functools.partial(spool.read, 1 << 20), b""), rules)
+    try:
+        # The first part needs the header: a bad header is a 400, not a cut
+        # stream; bad rows after it come back in the CSV "error" column
+        first = await asyncio.to_thread(next, parts, b"")
+    except ValueError as e:
+        spool.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    # A sync iterator: StreamingResponse runs it in a worker thread
+    return StreamingResponse(
+        itertools.chain([first], parts),
+        media_type=content_type,
+        headers={"X-Policy-Version": rules.version},
+        background=BackgroundTask(spool.close),
+    )
 
 
 def build():
@@ -189,4 +539,12 @@ def build():
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("20_overtime_rag_api:app", host="0.0.0.0", port=8000, reload=False)
+    # WEB_CONCURRENCY=N runs N pre-forked workers over one shared index; the
+    # import above already built it, so workers only map the snapshot
+    uvicorn.run(
+        "20_overtime_rag_api:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=False,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
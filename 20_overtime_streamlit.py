@@ -25,6 +25,7 @@ SAMPLE CODE:
 """
 
 import os
+import secrets
 
 import httpx
 import streamlit as st
@@ -64,10 +65,17 @@ if st.button("Ask", type="primary"):
         try:
             # Q: How do you send a POST request to the API?
             # A: Use client.post() with the endpoint URL and JSON data
+            # Q: How do you stop the server from working past the client timeout?
+            # A: Send a deadline header a bit below the client timeout; the server
+            #    returns a degraded answer instead of running past it
+            # Q: How do you follow one request through the server?
+            # A: Send a W3C traceparent; the server's trace continues this trace id
+            traceparent = f"00-{secrets.token_hex(16)}-{secrets.token_hex(8)}-01"
             with httpx.Client(timeout=30.0) as client:
                 resp = client.post(
                     f"{api_base}/ask",
                     json={"user": user.strip(), "question": question.strip()},
+                    headers={"X-Deadline-Ms": "28000", "traceparent": traceparent},
                 )
                 # Q: How do you handle API errors?
                 # A: Check status_code - if not 200, display error message
@@ -82,17 +90,37 @@ if st.button("Ask", type="primary"):
                     st.info(
                         f"Computed multiplier: {data.get('computed_multiplier', '<n/a>')}  |  Years: {data.get('years', '<n/a>')}"
                     )
+                    if data.get("degraded"):
+                        st.warning(
+                            f"Degraded response (slow stages: {', '.join(data.get('degraded_stages', []))})"
+                        )
+                        if data.get("policy_snippet"):
+                            st.caption(data["policy_snippet"])
+                st.caption(f"Trace id: {traceparent.split('-')[1]}")
         except Exception as e:
             st.exception(e)
 
 st.divider()
 st.subheader("Check HR Years (optional)")
 check_user = st.text_input("User to check", value=user)
+# Q: How do you avoid re-downloading data that has not changed?
+# A: Keep the last body and its ETag per URL in session_state and send
+#    If-None-Match; the server answers 304 (no body) while the record is unchanged
 if st.button("Get years from HR"):
     try:
+        url = f"{api_base}/hr/years/{check_user.strip()}"
+        etags = st.session_state.setdefault("hr_etags", {})
+        cached = etags.get(url)
         with httpx.Client(timeout=15.0) as client:
-            resp = client.get(f"{api_base}/hr/years/{check_user.strip()}")
-            if resp.status_code == 200:
+            resp = client.get(
+                url, headers={"If-None-Match": cached[0]} if cached else None
+            )
+            if resp.status_code == 304 and cached:
+                st.json(cached[1])
+                st.caption("Not modified since the last lookup")
+            elif resp.status_code == 200:
+                if etag := resp.headers.get("etag"):
+                    etags[url] = (etag, resp.json())
                 st.json(resp.json())
             else:
                 st.error(f"HR request failed: {resp.status_code} {resp.text}")
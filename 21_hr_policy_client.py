@@ -16,6 +16,11 @@ A: Debug info (intent, facts used, policy snippets) helps users understand how t
    arrived at answers. It's useful for troubleshooting, transparency, and building trust
    in the AI system's reasoning.
 
+Q: How does the client avoid re-fetching an unchanged HR profile?
+A: It keeps the last profile and its ETag in session state and sends
+   If-None-Match; while the record is unchanged the server answers 304 with no
+   body and the kept profile is shown.
+
 Q: How do you handle different response types from the API?
 A: The API returns structured JSON with answer, intent, facts, and metadata. The client
    conditionally displays different sections based on what's available, providing a
@@ -25,6 +30,7 @@ SAMPLE CODE:
 """
 
 import os
+import secrets
 
 import httpx
 import streamlit as st
@@ -47,17 +53,20 @@ with col1:
 with col2:
     question = st.text_input("Question", value="what's my overtime rate?")
 
-debug = st.checkbox("Show debug (intent, facts, policy)", value=True)
+debug = st.checkbox("Show debug (intent, facts, policy, timing)", value=True)
 
 if st.button("Ask", type="primary"):
     if not user.strip() or not question.strip():
         st.error("Provide both user and question")
     else:
         try:
+            # W3C trace context: the server continues this trace id
+            traceparent = f"00-{secrets.token_hex(16)}-{secrets.token_hex(8)}-01"
             with httpx.Client(timeout=45.0) as client:
                 resp = client.post(
                     f"{api_base}/ask",
                     json={"user": user.strip(), "question": question.strip()},
+                    headers={"X-Deadline-Ms": "42000", "traceparent": traceparent},
                 )
             if resp.status_code != 200:
                 st.error(f"Request failed: {resp.status_code} {resp.text}")
@@ -67,11 +76,51 @@ if st.button("Ask", type="primary"):
                 st.write(data.get("answer", "<no answer>"))
                 if m := data.get("computed_multiplier"):
                     st.info(f"Computed multiplier: {m}")
+                if data.get("degraded"):
+                    st.warning(
+                        f"Degraded response (slow stages: {', '.join(data.get('degraded_stages', []))})"
+                    )
+                    if data.get("policy_snippet"):
+                        st.caption(data["policy_snippet"])
                 if debug:
                     st.divider()
                     st.write("Intent:", data.get("intent"))
+                    st.write("Answered by:", data.get("answered_by"))
+                    st.write("Trace id:", traceparent.split("-")[1])
                     st.write("Used policy:", data.get("used_policy"))
                     st.write("HR facts:")
                     st.json(data.get("hr_facts", {}))
+                    # Server-Timing: "retrieval;dur=12.3, llm;dur=900.1, total;dur=915.0"
+                    timings = {}
+                    for part in resp.headers.get("server-timing", "").split(","):
+                        name, _, dur = part.strip().partition(";dur=")
+                        if name and dur:
+                            timings[name] = float(dur)
+                    if timings:
+                        st.write("Server timing (ms):")
+                        st.table({"stage": list(timings), "ms": list(timings.values())})
         except Exception as e:
             st.exception(e)
+
+st.divider()
+st.subheader("My HR profile")
+if st.button("Show profile"):
+    try:
+        url = f"{api_base}/hr/profile/{user.strip()}"
+        etags = st.session_state.setdefault("hr_etags", {})
+        cached = etags.get(url)
+        with httpx.Client(timeout=15.0) as client:
+            resp = client.get(
+                url, headers={"If-None-Match": cached[0]} if cached else None
+            )
+        if resp.status_code == 304 and cached:
+            st.json(cached[1])
+            st.caption("Not modified since the last lookup")
+        elif resp.status_code == 200:
+            if etag := resp.headers.get("etag"):
+                etags[url] = (etag, resp.json())
+            st.json(resp.json())
+        else:
+            st.error(f"Profile request failed: {resp.status_code} {resp.text}")
+    except Exception as e:
+        st.exception(e)
@@ -24,16 +24,20 @@ A: Intent routing enables: (1) Optimized processing for each question type, (2)
 SAMPLE CODE:
 """
 
+import asyncio
+import importlib.util
 import os
+import time
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Mapping, Optional, Union
 
 import httpx
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Response
 from langchain_chroma import Chroma
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain_openai import (AzureChatOpenAI, AzureOpenAIEmbeddings,
                               ChatOpenAI, OpenAIEmbeddings)
 from langchain_text_splitters import RecursiveCharacterTextSplitter
@@ -41,8 +45,45 @@ from pydantic import BaseModel
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 
+from ragkit.answers import (AnswerPathStats, render_hr_answer,
+                            render_rule_answer, rule_question, template_fields)
+from ragkit.batch import dedupe, error_item, normalize_question
+from ragkit.context import PackedContext, annotate_token_counts, pack_context
+from ragkit.deadline import (DEADLINE_HEADER, CircuitBreaker, StageBudgets,
+                             StageFailed, deadline_scope,
+                             parse_deadline_header, run_stage, snippet)
+from ragkit.fakes import (FakeChatModel, fake_models_enabled,
+                          make_fake_embeddings)
+from ragkit.hr_cache import HRViewCache
+from ragkit.hr_loader import HRLoader
+from ragkit.hr_store import FIELDS as HR_FIELDS
+from ragkit.hr_store import get_hr_store
+from ragkit.intent_classifier import IntentRouter
+from ragkit.llm_scheduler import (Overloaded, add_overload_handler,
+                                  get_scheduler, llm_priority)
+from ragkit.metrics import STAGE_TIMER, install_metrics, set_intent
+from ragkit.policy_rules import PolicyRules, RulesFile, pages_text, rules_path
+from ragkit.retrieval import AdaptiveK, query_candidates, select_candidates
+from ragkit.shared_index import (MmapIndex, file_lock, load_shared_index,
+                                 shared_index_enabled)
+from ragkit.signals import SignalMatch, get_signals
+from ragkit.singleflight import SingleFlight, make_key
+from ragkit.stages import StageGraph
+from ragkit.tracing import TRACE_CALLBACK, install_tracing
+from ragkit.usage import MeteredEmbeddings, install_usage, meter_llm, tag_usage
+
+# The LLM routing prompt lives in a lesson file whose name starts with digits
+_ROUTING_PATH = Path(__file__).parent / "09g_prompt_routing.py"
+_spec = importlib.util.spec_from_file_location("routing09g", str(_ROUTING_PATH))
+if _spec is None or _spec.loader is None:
+    raise RuntimeError("Failed to load routing prompt from 09g_prompt_routing.py")
+routing09g = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(routing09g)  # type: ignore[attr-defined]
+
 POLICY_PDF = Path(__file__).parent / "21_policy_overtime.pdf"
 PERSIST_BASE = str(Path(__file__).parent / ".chroma_hr_policy21")
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+RETRIEVAL_K = AdaptiveK.from_env(default_k=4)
 
 
 def ensure_policy_pdf() -> None:
@@ -66,28 +107,33 @@ def ensure_policy_pdf() -> None:
 
 
 def make_embeddings():
-    if os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT"):
-        return AzureOpenAIEmbeddings(
+    # Metered: tokens and latency of every embedding call land in the usage rollup
+    if fake_models_enabled():
+        embeddings = make_fake_embeddings()
+    elif os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT"):
+        embeddings = AzureOpenAIEmbeddings(
             azure_deployment=os.environ["AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT"]
         )
-    return OpenAIEmbeddings()
+    else:
+        embeddings = OpenAIEmbeddings()
+    return MeteredEmbeddings(embeddings)
 
 
 def make_llm():
-    if os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"):
-        return AzureChatOpenAI(
-            azure_deployment=os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"],
-            temperature=0,
+    # Every call goes through the process-wide scheduler (priority lanes, RPM/TPM)
+    # and is metered for token/cost accounting
+    if fake_models_enabled():
+        model = FakeChatModel.from_env()
+    elif os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"):
+        model = AzureChatOpenAI(
+            azure_deployment=os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"], temperature=0
         )
-    return ChatOpenAI(temperature=0, model="gpt-4o-mini")
-
+    else:
+        model = ChatOpenAI(temperature=0, model="gpt-4o-mini")
+    return meter_llm(get_scheduler().wrap(model))
 
-def build_or_load_index() -> Chroma:
-    ensure_policy_pdf()
-    embeddings = make_embeddings()
-    deployment_suffix = os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT", "openai")
-    persist_dir = f"{PERSIST_BASE}_{deployment_suffix}"
 
+def open_or_build_chroma(embeddings, persist_dir: str) -> Chroma:
     if Path(persist_dir).exists():
         try:
             return Chroma(embedding_function=embeddings, persist_directory=persist_dir)
@@ -96,103 +142,131 @@ def build_or_load_index() -> Chroma:
 
     loader = PyPDFLoader(str(POLICY_PDF))
     pages = loader.load()
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=120)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=800, chunk_overlap=120, add_start_index=True
+    )
     docs = splitter.split_documents(pages)
+    annotate_token_counts(docs)
     vs = Chroma.from_documents(
         docs, embedding=embeddings, persist_directory=persist_dir
     )
+    # Index time: the overtime tiers are compiled from the pages just embedded
+    compile_policy_rules(pages).save(rules_path(persist_dir))
     return vs
 
 
+def compile_policy_rules(pages=None) -> PolicyRules:
+    if pages is None:
+        pages = PyPDFLoader(str(POLICY_PDF)).load()
+    return PolicyRules.compile(pages_text(pages), source=POLICY_PDF.name)
+
+
+def index_dir() -> str:
+    deployment_suffix = (
+        "fake"
+        if fake_models_enabled()
+        else os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT", "openai")
+    )
+    return f"{PERSIST_BASE}_{deployment_suffix}"
+
+
+def build_or_load_index() -> Union[Chroma, MmapIndex]:
+    ensure_policy_pdf()
+    embeddings = make_embeddings()
+    persist_dir = index_dir()
+
+    # Pre-fork workers build once under a lock and share a memory-mapped snapshot
+    if shared_index_enabled():
+        return load_shared_index(
+            persist_dir,
+            embeddings,
+            lambda: open_or_build_chroma(embeddings, persist_dir),
+        )
+    with file_lock(f"{persist_dir}.lock"):
+        return open_or_build_chroma(embeddings, persist_dir)
+
+
 app = FastAPI(title="HR Policy Server 21")
+add_overload_handler(app)
+install_metrics(app)
+install_tracing(app)
+install_usage(app, service="21_hr_policy_server")
 vectorstore = build_or_load_index()
+# Overtime tiers compiled with the index; followed across rebuilds
+policy_rules = RulesFile.ensure(index_dir(), compile_policy_rules)
+router = IntentRouter.from_env(vectorstore.embeddings)
 llm = make_llm()
 parser = StrOutputParser()
+CALLBACKS = [STAGE_TIMER, TRACE_CALLBACK]
+inflight = SingleFlight()
+retrieval_flight = SingleFlight()
+answer_paths = AnswerPathStats()
+BUDGETS = StageBudgets.from_env()
+breakers = {name: CircuitBreaker(name) for name in ("retrieval", "hr", "llm")}
 
 
-# Fake HR data (expandable)
-USER_PROFILE: Dict[str, Dict[str, object]] = {
-    "alice": {
-        "years": 0.8,
-        "dob": "1995-08-09",
-        "title": "Analyst",
-        "manager": "bob",
-        "salary": 90000,
-        "pto_balance": 32,
-    },
-    "bob": {
-        "years": 1.0,
-        "dob": "1990-01-05",
-        "title": "Manager",
-        "manager": "carol",
-        "salary": 140000,
-        "pto_balance": 18,
-    },
-    "carol": {
-        "years": 2.0,
-        "dob": "1988-02-10",
-        "title": "Senior Manager",
-        "manager": "dave",
-        "salary": 170000,
-        "pto_balance": 25,
-    },
-    "dave": {
-        "years": 3.4,
-        "dob": "1985-11-22",
-        "title": "Director",
-        "manager": None,
-        "salary": 220000,
-        "pto_balance": 12,
-    },
-}
+hr_store = get_hr_store()
+hr_views = HRViewCache.for_store(hr_store)
 
 
 def pick_multiplier(years: float) -> float:
-    if years > 2:
-        return 1.7
-    if years == 2:
-        return 1.5
-    if years >= 1:
-        return 1.25
-    return 1.0
+    return policy_rules.rules.multiplier(years)
 
 
 # ----- Intent Routing -----
-def route_intent(q: str) -> str:
-    ql = q.lower()
-    hr_signals = [
-        "date of birth",
-        "dob",
-        "manager",
-        "title",
-        "salary",
-        "pto",
-        "pto balance",
-        "years of service",
-        "start date",
-        "email",
-        "phone",
-        "employee id",
-    ]
-    policy_signals = [
-        "overtime",
-        "leave policy",
-        "travel policy",
-        "expense policy",
-        "holiday",
-        "paid time off",
-        "policy",
-    ]
-
-    if any(k in ql for k in hr_signals) and any(k in ql for k in policy_signals):
+def route_intent(signals: SignalMatch) -> str:
+    # Signal phrases live in ragkit/signals.json; one compiled pass finds them all
+    hr = "hr" in signals.intents
+    policy = "policy" in signals.intents
+    if hr and policy:
         return "hybrid_query"
-    if any(k in ql for k in hr_signals):
+    if hr:
         return "hr_query"
-    if any(k in ql for k in policy_signals):
+    if policy:
         return "policy_query"
     return "hybrid_query"
 
 
+INTENT_FOR_ROUTE = {
+    "policy": "policy_query",
+    "hr": "hr_query",
+    "hybrid": "hybrid_query",
+    "unknown": "hybrid_query",
+}
+
+
+async def classify_intent(
+    question: str, signals: SignalMatch, qvec: Optional[List[float]]
+) -> str:
+    # Local centroid classifier on the retrieval embedding; the LLM routing prompt
+    # only for questions it is unsure about; signal phrases if that fails too.
+    decision = None
+    if qvec is not None:
+        decision = router.classify(qvec)
+        if decision.confident:
+            router.record(question, decision.route, "centroid", decision)
+            return INTENT_FOR_ROUTE[decision.route]
+    try:
+        text = await run_stage(
+            "route",
+            (routing09g.ROUTE_PROMPT | llm | parser).ainvoke(
+                {"q": question}, config={"callbacks": CALLBACKS}
+            ),
+            BUDGETS.route,
+            breakers["llm"],
+        )
+    except (StageFailed, Overloaded):
+        # Routing is optional: a shed LLM call falls back to the signals too
+        text = ""
+    route = text.strip().lower()
+    if route in INTENT_FOR_ROUTE:
+        router.record(question, route, "llm", decision)
+        return INTENT_FOR_ROUTE[route]
+    intent = route_intent(signals)
+    router.record(question, intent.split("_")[0], "signals", decision)
+    return intent
+
+
 def redact_if_sensitive(key: str) -> bool:
     # Very simple privacy gate: deny DOB and salary unless explicitly allowed via env
     if key in {"dob", "salary"} and not os.getenv(
@@ -202,109 +276,97 @@ def redact_if_sensitive(key: str) -> bool:
     return False
 
 
-async def fetch_hr_fields(user: str, fields: list[str]) -> Dict[str, object]:
-    # In real life: call external HR APIs per field. Here we serve from USER_PROFILE.
-    profile = USER_PROFILE.get(user.lower()) or {}
+def _project_fields(
+    profile: Optional[Dict[str, object]], fields: list[str]
+) -> Dict[str, object]:
     data: Dict[str, object] = {}
     for f in fields:
         if redact_if_sensitive(f):
             continue
         if f == "years":
-            data["years"] = float(profile.get("years", 0.0))
-        elif f in profile:
+            data["years"] = float((profile or {}).get("years") or 0.0)
+        elif profile and f in profile:
             data[f] = profile[f]
     return data
 
 
-FIELD_MAP = {
-    "date of birth": ["dob"],
-    "dob": ["dob"],
-    "manager": ["manager"],
-    "title": ["title"],
-    "salary": ["salary"],
-    "pto": ["pto_balance"],
-    "pto balance": ["pto_balance"],
-    "years of service": ["years"],
-}
+def _allowed(fields: Iterable[str]) -> List[str]:
+    # Redacted fields are never read from the store, not just dropped afterwards
+    return [f for f in fields if not redact_if_sensitive(f)]
 
 
-def fields_for_question(q: str) -> list[str]:
-    ql = q.lower()
-    fields: list[str] = []
-    for k, vals in FIELD_MAP.items():
-        if k in ql:
-            fields.extend(vals)
-    # Ensure multiplier dependency
-    if "overtime" in ql and "years" not in fields:
-        fields.append("years")
-    # Dedupe
-    seen = set()
-    out: list[str] = []
-    for f in fields:
-        if f not in seen:
-            out.append(f)
-            seen.add(f)
-    return out
+async def fetch_hr_rows(
+    users: List[str], fields: List[str]
+) -> Dict[str, Dict[str, object]]:
+    # In real life: a bulk call to the HR API. Here one indexed query (tens of
+    # microseconds) in the HR store, cheap enough to run inline.
+    return hr_store.get_many(users, fields)
 
 
-class AskRequest(BaseModel):
-    user: str
-    question: str
+def make_hr_loader() -> HRLoader:
+    # One per request; redaction is the same for every subject on this server
+    return HRLoader(fetch_hr_rows, authorize=lambda fields, _subject: _allowed(fields))
 
 
-@app.get("/hr/profile/{user}")
-async def hr_profile(user: str) -> Dict[str, object]:
-    profile = USER_PROFILE.get(user.lower())
-    if not profile:
-        raise HTTPException(status_code=404, detail="user not found")
-    safe = {k: v for k, v in profile.items() if not redact_if_sensitive(k)}
-    return safe
+async def load_hr_facts(
+    loader: HRLoader, user: str, fields: List[str], about_manager: bool = False
+) -> Dict[str, object]:
+    if not about_manager:
+        return _project_fields(await loader.load(user, fields), fields)
+    # "my manager's title": the asker's record names the manager, whose fields
+    # come back as manager.<field>
+    own_fields = list(dict.fromkeys([*fields, "manager"]))
+    own = await loader.load(user, own_fields)
+    facts = _project_fields(own, own_fields)
+    if own.get("manager"):
+        theirs = await loader.load(str(own["manager"]), fields)
+        for k, v in _project_fields(theirs, fields).items():
+            facts[f"manager.{k}"] = v
+    return facts
 
 
-@app.post("/ask")
-async def ask(req: AskRequest) -> Dict[str, object]:
-    intent = route_intent(req.question)
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
+class AskRequest(BaseModel):
+    user: str
+    question: str
 
-    policy_context = ""
-    hr_facts: Dict[str, object] = {}
 
-    if intent in ("policy_query", "hybrid_query"):
-        docs = await retriever.ainvoke(req.question)
-        policy_context = "\n\n".join(d.page_content for d in docs)
+class AskBatchRequest(BaseModel):
+    items: List[AskRequest]
+    max_concurrency: int = 8
+
+
+# Prompts by intent
+PROMPT_POLICY = PromptTemplate.from_template(
+    "Answer using ONLY the policy context below. If missing, say you don't know.\n\n{context}\n\nQ: {question}"
+)
+PROMPT_HR = PromptTemplate.from_template(
+    "Answer using ONLY these HR facts; do not infer or fabricate.\nFacts: {facts}\n\nQ: {question}"
+)
+PROMPT_HYBRID = PromptTemplate.from_template(
+    "Combine HR facts (for personal details) and policy context (for rules). If either is missing, say so explicitly.\n\nHR facts: {facts}\n\nPolicy: {context}\n\nQ: {question}"
+)
+PROMPTS = {
+    "policy_query": PROMPT_POLICY,
+    "hr_query": PROMPT_HR,
+    "hybrid_query": PROMPT_HYBRID,
+}
 
-    if intent in ("hr_query", "hybrid_query"):
-        needed_fields = fields_for_question(req.question)
-        hr_facts = await fetch_hr_fields(
-            req.user, needed_fields or ["years"]
-        )  # default years for overtime
 
-    # Select prompt by intent
-    prompt_policy = PromptTemplate.from_template(
-        "Answer using ONLY the policy context below. If missing, say you don't know.\n\n{context}\n\nQ: {question}"
-    )
-    prompt_hr = PromptTemplate.from_template(
-        "Answer using ONLY these HR facts; do not infer or fabricate.\nFacts: {facts}\n\nQ: {question}"
-    )
-    prompt_hybrid = PromptTemplate.from_template(
-        "Combine HR facts (for personal details) and policy context (for rules). If either is missing, say so explicitly.\n\nHR facts: {facts}\n\nPolicy: {context}\n\nQ: {question}"
-    )
+def degraded_answer(hr_facts: Dict[str, object]) -> str:
+    # Fallback when a stage missed its budget: report only what we already have
+    text = "A full answer is not available right now."
+    if hr_facts:
+        facts = ", ".join(f"{k}: {v}" for k, v in hr_facts.items())
+        text += f" Your HR record shows {facts}."
+    return text
 
-    if intent == "policy_query":
-        chain = prompt_policy | llm | parser
-        answer = chain.invoke({"context": policy_context, "question": req.question})
-    elif intent == "hr_query":
-        chain = prompt_hr | llm | parser
-        answer = chain.invoke({"facts": hr_facts, "question": req.question})
-    else:
-        chain = prompt_hybrid | llm | parser
-        answer = chain.invoke(
-            {"facts": hr_facts, "context": policy_context, "question": req.question}
-        )
 
+def overtime_extra(
+    question: str, user: str, hr_facts: Dict[str, object]
+) -> Dict[str, object]:
     # Add computed multiplier if years present and question relates to overtime
     extra: Dict[str, object] = {}
-    if "overtime" in req.question.lower():
+    if "overtime" in question.lower():
         years_val: Optional[float] = None
         if "years" in hr_facts:
             try:
@@ -313,17 +375,410 @@ async def ask(req: AskRequest) -> Dict[str, object]:
                 years_val = None
         if years_val is None:
             # fallback heuristic not to fail silently
-            prof = USER_PROFILE.get(req.user.lower()) or {}
-            years_val = float(prof.get("years", 0.0))
+            prof = hr_store.get(user, ["years"]) or {}
+            years_val = float(prof.get("years") or 0.0)
         extra["computed_multiplier"] = f"{pick_multiplier(years_val):.2f}x"
+    return extra
 
+
+async def rule_answer(user: str, asked: Optional[float]) -> Optional[Dict[str, object]]:
+    # Years named in the question ("with 3 years") win over the asker's record;
+    # None (HR unavailable) leaves the question to the full pipeline
+    rules = policy_rules.rules
+    years = asked
+    hr_facts: Dict[str, object] = {}
+    if years is None:
+        try:
+            hr_facts = await run_stage(
+                "hr",
+                load_hr_facts(make_hr_loader(), user, ["years"]),
+                BUDGETS.hr,
+                breakers["hr"],
+            )
+        except StageFailed:
+            return None
+        years = float(hr_facts.get("years") or 0.0)
+    intent = "hybrid_query" if hr_facts else "policy_query"
+    set_intent(intent)
+    tag_usage(intent=intent)
     return {
         "intent": intent,
-        "answer": answer,
+        "answer": render_rule_answer(rules, years, personal=bool(hr_facts)),
+        "answered_by": "rules",
+        "hr_facts": hr_facts,
+        "used_policy": True,
+        "context_tokens_saved": 0,
+        "computed_multiplier": f"{rules.multiplier(years):.2f}x",
+        "policy_version": rules.version,
+    }
+
+
+@app.get("/hr/profile/{user}")
+async def hr_profile(
+    user: str, if_none_match: Optional[str] = Header(None)
+) -> Response:
+    # No roles on this server: one redacted view per user
+    resp = hr_views.respond(
+        user,
+        ("profile",),
+        if_none_match,
+        lambda: hr_store.get(user, _allowed(HR_FIELDS)),
+    )
+    if resp is None:
+        raise HTTPException(status_code=404, detail="user not found")
+    return resp
+
+
+async def retrieve_context(question: str, qvec: List[float]) -> PackedContext:
+    # Retrieve candidates with vectors, then merge/dedupe/budget them into the prompt
+    hits = await asyncio.to_thread(
+        query_candidates,
+        vectorstore,
+        [qvec],
+        RETRIEVAL_K.max_k,
+        include_embeddings=True,
+    )
+    cands = select_candidates(vectorstore, hits[0], RETRIEVAL_K, label="21/ask")
+    return pack_context(cands, CONTEXT_TOKEN_BUDGET, query_embedding=qvec)
+
+
+async def answer_question(
+    question: str, intent: str, hr_facts: Dict[str, object], packed: PackedContext
+) -> str:
+    # LLM call for one (question, intent, facts, context); shared by coalesced requests
+    chain = PROMPTS[intent] | llm | parser
+    return await chain.ainvoke(
+        {"facts": hr_facts, "context": packed.text(), "question": question},
+        config={"callbacks": CALLBACKS},
+    )
+
+
+@app.post("/ask")
+async def ask(
+    req: AskRequest, x_deadline_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER)
+) -> Dict[str, object]:
+    t0 = time.perf_counter()
+    question = req.question
+    signals = get_signals().match(question)
+    requested_fields = signals.fields
+    about_manager = "about_manager" in signals.intents
+    degraded: List[str] = []
+    tag_usage(user=req.user)
+
+    async def embed() -> Optional[List[float]]:
+        # One question embedding serves both intent classification and retrieval
+        try:
+            return await run_stage(
+                "embed",
+                vectorstore.embeddings.aembed_query(question),
+                BUDGETS.retrieval,
+                breakers["retrieval"],
+            )
+        except StageFailed:
+            return None
+
+    async def route(qvec: Optional[List[float]]) -> str:
+        intent = await classify_intent(question, signals, qvec)
+        set_intent(intent)
+        tag_usage(intent=intent)
+        return intent
+
+    async def retrieve(qvec: Optional[List[float]]) -> PackedContext:
+        if qvec is None:
+            raise StageFailed("retrieval", "no query embedding")
+        key = make_key(question)
+        return await run_stage(
+            "retrieval",
+            retrieval_flight.do(key, lambda: retrieve_context(question, qvec)),
+            BUDGETS.retrieval,
+            breakers["retrieval"],
+        )
+
+    async def facts(intent: str) -> Dict[str, object]:
+        if intent not in ("hr_query", "hybrid_query"):
+            return {}
+        try:
+            return await run_stage(
+                "hr",
+                load_hr_facts(
+                    make_hr_loader(),
+                    req.user,
+                    requested_fields or ["years"],  # default years for overtime
+                    about_manager,
+                ),
+                BUDGETS.hr,
+                breakers["hr"],
+            )
+        except StageFailed:
+            degraded.append("hr")
+            return {}
+
+    async def context(intent: str) -> PackedContext:
+        if intent not in ("policy_query", "hybrid_query"):
+            graph.cancel("retrieve")
+            return PackedContext()
+        try:
+            return await graph.result("retrieve")
+        except StageFailed:
+            degraded.append("retrieval")
+            return PackedContext()
+
+    async def answer(
+        intent: str, hr_facts: Dict[str, object], packed: PackedContext
+    ) -> tuple[str, str]:
+        # Single-field HR questions are rendered from the facts without the LLM
+        if intent == "hr_query":
+            templated = render_hr_answer(template_fields(signals), hr_facts)
+            if templated is not None:
+                return templated, "template"
+        if intent == "policy_query" and "retrieval" in degraded:
+            return degraded_answer(hr_facts), "degraded"
+        # Identical questions with identical facts share one LLM call
+        key = make_key(question, intent=intent, facts=sorted(hr_facts.items()))
+        try:
+            text = await run_stage(
+                "llm",
+                inflight.do(
+                    key, lambda: answer_question(question, intent, hr_facts, packed)
+                ),
+                BUDGETS.llm,
+                breakers["llm"],
+            )
+        except StageFailed:
+            degraded.append("llm")
+            return degraded_answer(hr_facts), "degraded"
+        return text, "llm"
+
+    # The question embedding starts with the request and feeds both the intent
+    # classifier and speculative retrieval; HR facts and context run concurrently
+    # once the intent is known; the answer waits for both.
+    deadline = parse_deadline_header(x_deadline_ms, BUDGETS.request)
+    with deadline_scope(deadline):
+        # "What's my overtime rate?" comes from the compiled policy rules: no
+        # embedding, routing, retrieval or LLM call
+        is_rule, asked = rule_question(question, signals.intents)
+        if is_rule:
+            ruled = await rule_answer(req.user, asked)
+            if ruled is not None:
+                answer_paths.record("rules", time.perf_counter() - t0)
+                return ruled
+        async with StageGraph() as graph:
+            graph.add("embed", embed, eager=True)
+            graph.add("retrieve", retrieve, deps=["embed"], eager=True)
+            graph.add("intent", route, deps=["embed"])
+            graph.add("facts", facts, deps=["intent"])
+            graph.add("context", context, deps=["intent"])
+            graph.add("answer", answer, deps=["intent", "facts", "context"])
+            answer_text, answered_by = await graph.result("answer")
+            intent = await graph.result("intent")
+            hr_facts = await graph.result("facts")
+            packed = await graph.result("context")
+
+    extra = overtime_extra(question, req.user, hr_facts)
+    answer_paths.record(answered_by, time.perf_counter() - t0)
+
+    resp: Dict[str, object] = {
+        "intent": intent,
+        "answer": answer_text,
+        "answered_by": answered_by,
         "hr_facts": hr_facts,
-        "used_policy": bool(policy_context.strip()),
+        "used_policy": bool(packed.docs),
+        "context_tokens_saved": packed.tokens_saved,
         **extra,
     }
+    if answered_by == "degraded":
+        resp["policy_snippet"] = snippet(packed.text())
+    if degraded:
+        resp["degraded"] = True
+        resp["degraded_stages"] = degraded
+    return resp
+
+
+@app.get("/stats/breakers")
+async def breaker_stats() -> Dict[str, Dict[str, object]]:
+    return {name: b.stats() for name, b in breakers.items()}
+
+
+@app.get("/stats/llm_scheduler")
+async def llm_scheduler_stats() -> Dict[str, object]:
+    return get_scheduler().stats()
+
+
+@app.get("/stats/intents")
+async def intent_stats() -> Dict[str, object]:
+    return router.stats()
+
+
+@app.get("/stats/hr_cache")
+async def hr_cache_stats() -> Mapping[str, int]:
+    return hr_views.stats()
+
+
+@app.get("/stats/policy_rules")
+async def policy_rules_stats() -> Dict[str, object]:
+    rules = policy_rules.rules
+    return {
+        "version": rules.version,
+        "source": rules.source,
+        "tiers": [t.text for t in rules.tiers],
+        "reloads": policy_rules.reloads,
+    }
+
+
+@app.get("/stats/answers")
+async def answer_stats() -> Dict[str, object]:
+    return answer_paths.stats()
+
+
+@app.get("/stats/singleflight")
+async def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    return {"answer": inflight.stats(), "retrieval": retrieval_flight.stats()}
+
+
+@app.post("/ask/batch")
+async def ask_batch(req: AskBatchRequest) -> Dict[str, object]:
+    items = req.items
+    questions, q_pos = dedupe([normalize_question(i.question) for i in items])
+    matches = [get_signals().match(q) for q in questions]
+    intents = [route_intent(m) for m in matches]
+    q_fields = [m.fields or ["years"] for m in matches]
+    # Rule questions are answered from the compiled policy rules; years named
+    # in the question win over the asker's record
+    rules = policy_rules.rules
+    checks = [rule_question(q, m.intents) for q, m in zip(questions, matches)]
+    ruled = [r for r, _ in checks]
+    asked = [years for _, years in checks]
+    for n in range(len(questions)):
+        if ruled[n]:
+            intents[n] = "policy_query" if asked[n] is not None else "hybrid_query"
+
+    # 1) One embeddings call and one multi-query search for questions that need policy
+    needs_policy = [
+        n
+        for n, intent in enumerate(intents)
+        if intent in ("policy_query", "hybrid_query") and not ruled[n]
+    ]
+    packs = [PackedContext() for _ in questions]
+    try:
+        if needs_policy:
+            vectors = await vectorstore.embeddings.aembed_documents(
+                [questions[n] for n in needs_policy]
+            )
+            hits = await asyncio.to_thread(
+                query_candidates,
+                vectorstore,
+                vectors,
+                RETRIEVAL_K.max_k,
+                include_embeddings=True,
+            )
+            for n, h, v in zip(needs_policy, hits, vectors):
+                cands = select_candidates(
+                    vectorstore, h, RETRIEVAL_K, label="21/ask/batch"
+                )
+                packs[n] = pack_context(cands, CONTEXT_TOKEN_BUDGET, query_embedding=v)
+    except Exception as e:
+        return {"results": [error_item(e) for _ in items]}
+
+    # 2) One HR lookup for every (user, question) that needs HR facts: the
+    #    loader batches all of them into a single bulk fetch
+    keys, key_pos = dedupe([(i.user.lower(), q_pos[n]) for n, i in enumerate(items)])
+    loader = make_hr_loader()
+
+    async def facts_for(user: str, qi: int) -> Dict[str, object]:
+        if intents[qi] == "policy_query":
+            return {}
+        if ruled[qi]:
+            return await load_hr_facts(loader, user, ["years"])
+        return await load_hr_facts(
+            loader, user, q_fields[qi], "about_manager" in matches[qi].intents
+        )
+
+    # A failed lookup fails only the items that needed it
+    looked_up = await asyncio.gather(
+        *(facts_for(user, qi) for user, qi in keys), return_exceptions=True
+    )
+    failed = [r if isinstance(r, BaseException) else None for r in looked_up]
+    facts = [{} if isinstance(r, BaseException) else r for r in looked_up]
+
+    def rule_years(j: int) -> float:
+        qi = keys[j][1]
+        found = asked[qi]
+        return found if found is not None else float(facts[j].get("years") or 0.0)
+
+    # 3) Rule and single-field HR answers from templates; one LLM call per
+    #    remaining distinct (user, question), run with a concurrency cap
+    inputs = [
+        {
+            "intent": intents[qi],
+            "facts": facts[j],
+            "context": packs[qi].text(),
+            "question": questions[qi],
+        }
+        for j, (_, qi) in enumerate(keys)
+    ]
+    answers: List[object] = [
+        (
+            render_hr_answer(template_fields(matches[qi]), inp["facts"])
+            if inp["intent"] == "hr_query"
+            else None
+        )
+        for (_, qi), inp in zip(keys, inputs)
+    ]
+    answered_by = ["llm" if a is None else "template" for a in answers]
+    for j, (_, qi) in enumerate(keys):
+        if failed[j] is not None:
+            answers[j] = failed[j]
+        elif ruled[qi]:
+            years = rule_years(j)
+            answers[j] = render_rule_answer(rules, years, asked[qi] is None)
+            answered_by[j] = "rules"
+    llm_idx = [j for j, a in enumerate(answers) if a is None]
+    chain = RunnableLambda(lambda x: PROMPTS[x["intent"]].invoke(x)) | llm | parser
+    with llm_priority("batch"):
+        llm_answers = await chain.abatch(
+            [inputs[j] for j in llm_idx],
+            config=[
+                {
+                    "max_concurrency": max(1, req.max_concurrency),
+                    "callbacks": CALLBACKS,
+                    # Per-item usage attribution; one batch spans many users
+                    "metadata": {"user": keys[j][0], "intent": inputs[j]["intent"]},
+                }
+                for j in llm_idx
+            ],
+            return_exceptions=True,
+        )
+    for j, a in zip(llm_idx, llm_answers):
+        answers[j] = a
+
+    results: List[Dict[str, object]] = []
+    for n, item in enumerate(items):
+        answer = answers[key_pos[n]]
+        if isinstance(answer, BaseException):
+            results.append(error_item(answer))
+            continue
+        inp = inputs[key_pos[n]]
+        if answered_by[key_pos[n]] == "rules":
+            years = rule_years(key_pos[n])
+            extra: Dict[str, object] = {
+                "computed_multiplier": f"{rules.multiplier(years):.2f}x",
+                "policy_version": rules.version,
+            }
+        else:
+            extra = overtime_extra(item.question, item.user, inp["facts"])
+        results.append(
+            {
+                "intent": inp["intent"],
+                "answer": answer,
+                "answered_by": answered_by[key_pos[n]],
+                "hr_facts": inp["facts"],
+                "used_policy": bool(inp["context"].strip())
+                or answered_by[key_pos[n]] == "rules",
+                "context_tokens_saved": packs[q_pos[n]].tokens_saved,
+                **extra,
+            }
+        )
+    return {"results": results}
 
 
 def build():
@@ -333,4 +788,12 @@ def build():
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("21_hr_policy_server:app", host="0.0.0.0", port=8021, reload=False)
+    # WEB_CONCURRENCY=N runs N pre-forked workers over one shared index; the
+    # import above already built it, so workers only map the snapshot
+    uvicorn.run(
+        "21_hr_policy_server:app",
+        host="0.0.0.0",
+        port=8021,
+        reload=False,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
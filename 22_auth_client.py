@@ -24,6 +24,7 @@ SAMPLE CODE:
 """
 
 import os
+import secrets
 
 import httpx
 import streamlit as st
@@ -80,10 +81,13 @@ if st.button("Ask", type="primary"):
     else:
         try:
             headers = {"Authorization": f"Bearer {st.session_state.token}"}
+            # W3C trace context: the server continues this trace id
+            traceparent = f"00-{secrets.token_hex(16)}-{secrets.token_hex(8)}-01"
             with httpx.Client(timeout=45.0, headers=headers) as client:
                 resp = client.post(
                     f"{api_base}/ask",
                     json={"user": st.session_state.user, "question": q},
+                    headers={"X-Deadline-Ms": "42000", "traceparent": traceparent},
                 )
             if resp.status_code == 200:
                 data = resp.json()
@@ -94,6 +98,13 @@ if st.button("Ask", type="primary"):
                 )
                 if ot := data.get("overtime"):
                     st.info(f"Overtime: {ot}")
+                if data.get("degraded"):
+                    st.warning(
+                        f"Degraded response (slow stages: {', '.join(data.get('degraded_stages', []))})"
+                    )
+                    if data.get("policy_snippet"):
+                        st.caption(data["policy_snippet"])
+                st.caption(f"Trace id: {traceparent.split('-')[1]}")
             else:
                 st.error(f"{resp.status_code} {resp.text}")
         except Exception as e:
@@ -21,9 +21,17 @@ A: Dependency injection makes auth reusable - define it once, apply to any endpo
    with Depends(). It keeps auth logic separate from business logic, making code
    cleaner and easier to test.
 
+Q: How do you keep token verification cheap?
+A: A client sends the same token until it expires, so verify it once and cache
+   the verified claims by a digest of the token until its exp
+   (ragkit.jwt_verify). IdP tokens (RS256/ES256) are checked against a locally
+   held key set that is refetched when a new kid appears, so key rotation needs
+   no restart.
+
 SAMPLE CODE:
 """
 
+import asyncio
 import importlib.util
 import os
 import time
@@ -31,13 +39,33 @@ from pathlib import Path
 from typing import Dict, List, Optional
 
 import jwt
-from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_openai import AzureChatOpenAI, ChatOpenAI
 from pydantic import BaseModel
 
+from ragkit.answers import render_rule_answer, rule_question
+from ragkit.deadline import (
+    DEADLINE_HEADER,
+    CircuitBreaker,
+    StageBudgets,
+    StageFailed,
+    deadline_scope,
+    parse_deadline_header,
+    run_stage,
+    snippet,
+)
+from ragkit.fakes import FakeChatModel, fake_models_enabled
+from ragkit.jwt_verify import JWTVerifier, KeySet
+from ragkit.llm_scheduler import add_overload_handler, get_scheduler
+from ragkit.metrics import STAGE_TIMER, install_metrics
+from ragkit.signals import get_signals
+from ragkit.stages import StageGraph
+from ragkit.tracing import TRACE_CALLBACK, install_tracing
+from ragkit.usage import install_usage, meter_llm, tag_usage
+
 # Dynamically load tools from a filename that starts with digits (not a valid module name)
 _TOOLS_PATH = Path(__file__).parent / "22_tools.py"
 _spec = importlib.util.spec_from_file_location("tools22", str(_TOOLS_PATH))
@@ -51,11 +79,17 @@ ISSUER = "hr-demo-22"
 
 
 def make_llm():
-    if os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"):
-        return AzureChatOpenAI(
+    # Every call goes through the process-wide scheduler (priority lanes, RPM/TPM)
+    # and is metered for token/cost accounting
+    if fake_models_enabled():
+        model = FakeChatModel.from_env()
+    elif os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"):
+        model = AzureChatOpenAI(
             azure_deployment=os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"], temperature=0
         )
-    return ChatOpenAI(temperature=0, model="gpt-4o-mini")
+    else:
+        model = ChatOpenAI(temperature=0, model="gpt-4o-mini")
+    return meter_llm(get_scheduler().wrap(model))
 
 
 def encode_jwt(sub: str, roles: List[str]) -> str:
@@ -64,14 +98,35 @@ def encode_jwt(sub: str, roles: List[str]) -> str:
     return jwt.encode(payload, APP_SECRET, algorithm="HS256")
 
 
+def make_verifier() -> JWTVerifier:
+    # HS256 dev tokens by default. JWT_JWKS_URL (or JWT_JWKS_FILE) adds an IdP key
+    # set for RS256/ES256, selected by kid; JWT_ALGORITHMS lists what is accepted
+    algorithms = [
+        a.strip() for a in os.getenv("JWT_ALGORITHMS", "HS256").split(",") if a.strip()
+    ]
+    ttl_s = float(os.getenv("JWT_JWKS_TTL_S", "300"))
+    key_set = None
+    if os.getenv("JWT_JWKS_URL"):
+        key_set = KeySet.from_url(os.environ["JWT_JWKS_URL"], ttl_s=ttl_s)
+    elif os.getenv("JWT_JWKS_FILE"):
+        key_set = KeySet.from_file(os.environ["JWT_JWKS_FILE"], ttl_s=ttl_s)
+    issuers = [i.strip() for i in os.getenv("JWT_ISSUERS", ISSUER).split(",")]
+    return JWTVerifier(
+        algorithms,
+        secret=APP_SECRET,
+        key_set=key_set,
+        issuer=[i for i in issuers if i],
+        audience=os.getenv("JWT_AUDIENCE") or None,
+        maxsize=int(os.getenv("JWT_CACHE_SIZE", "10000")),
+    )
+
+
+verifier = make_verifier()
+
+
 def decode_jwt(token: str) -> Dict[str, object]:
     try:
-        return jwt.decode(
-            token,
-            APP_SECRET,
-            algorithms=["HS256"],
-            options={"require": ["exp", "iat", "iss", "sub"]},
-        )
+        return verifier.verify(token)
     except jwt.PyJWTError as e:
         raise HTTPException(status_code=401, detail=f"invalid token: {e}")
 
@@ -84,13 +139,31 @@ async def auth_dep(
 ) -> Dict[str, object]:
     if not creds or creds.scheme.lower() != "bearer":
         raise HTTPException(status_code=401, detail="missing bearer token")
-    claims = decode_jwt(creds.credentials)
+    # Repeated tokens are served from the verified-claims cache; a first sighting
+    # (public-key check, maybe a key set fetch) runs off the event loop
+    claims = verifier.cached(creds.credentials)
+    if claims is None:
+        claims = await asyncio.to_thread(decode_jwt, creds.credentials)
+    return claims
+
+
+async def admin_dep(claims: Dict[str, object] = Depends(auth_dep)) -> Dict[str, object]:
+    roles = claims.get("roles")
+    if not isinstance(roles, list) or "admin" not in roles:
+        raise HTTPException(status_code=403, detail="admin role required")
     return claims
 
 
 app = FastAPI(title="Auth HR/Policy Server 22")
+add_overload_handler(app)
+install_metrics(app)
+install_tracing(app)
+install_usage(app, service="22_auth_server", dependencies=[Depends(admin_dep)])
 llm = make_llm()
 parser = StrOutputParser()
+CALLBACKS = [STAGE_TIMER, TRACE_CALLBACK]
+BUDGETS = StageBudgets.from_env()
+breakers = {name: CircuitBreaker(name) for name in ("retrieval", "hr", "llm")}
 
 
 @app.post("/auth/dev_login")
@@ -110,9 +183,56 @@ class AskRequest(BaseModel):
     question: str
 
 
+ASK_SYS = (
+    "You decide which tools to call. Use hr_get for personal/HR facts (enforces auth). "
+    "Use policy_retrieve for company rules. Combine results faithfully to answer."
+)
+ASK_PROMPT = PromptTemplate.from_template(
+    "{sys}\n\nUser: {user}\nQuestion: {question}\n\nIf overtime depends on years, you may compute via compute_overtime."  # guidance
+)
+
+
+async def rule_answer(
+    user: str, caller: str, roles: List[str], asked: Optional[float]
+) -> Optional[Dict[str, object]]:
+    # Years named in the question win; otherwise they are read through the
+    # authorized loader. None (HR unavailable or not readable) falls back to the
+    # full pipeline.
+    rules = tools22.overtime_rules()
+    years = asked
+    facts: Dict[str, object] = {}
+    if years is None:
+        try:
+            facts = await run_stage(
+                "hr",
+                tools22.load_hr_facts(
+                    tools22.make_hr_loader(caller, roles), user, ["years"]
+                ),
+                BUDGETS.hr,
+                breakers["hr"],
+            )
+        except StageFailed:
+            return None
+        if "years" not in facts:
+            return None
+        years = float(facts["years"])  # type: ignore[arg-type]
+    return {
+        "answer": render_rule_answer(rules, years, bool(facts) and user == caller),
+        "answered_by": "rules",
+        "facts": facts,
+        "policy_used": True,
+        "overtime": {
+            "multiplier": rules.multiplier(years),
+            "policy_version": rules.version,
+        },
+    }
+
+
 @app.post("/ask")
 async def ask(
-    req: AskRequest, claims: Dict[str, object] = Depends(auth_dep)
+    req: AskRequest,
+    claims: Dict[str, object] = Depends(auth_dep),
+    x_deadline_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER),
 ) -> Dict[str, object]:
     user = (req.user or str(claims.get("sub", ""))).strip().lower()
     question = req.question
@@ -120,66 +240,134 @@ async def ask(
         list(claims.get("roles", [])) if isinstance(claims.get("roles"), list) else []
     )
 
-    sys = (
-        "You decide which tools to call. Use hr_get for personal/HR facts (enforces auth). "
-        "Use policy_retrieve for company rules. Combine results faithfully to answer."
-    )
-    prompt = PromptTemplate.from_template(
-        "{sys}\n\nUser: {user}\nQuestion: {question}\n\nIf overtime depends on years, you may compute via compute_overtime."  # guidance
-    )
-
-    # Simple loop: 1) retrieve policy; 2) try HR facts for common fields; 3) compute overtime if asked
-    policy = tools22.policy_retrieve.invoke({"query": question})
-
-    wanted_fields = []
-    ql = question.lower()
-    if "overtime" in ql and "years" not in wanted_fields:
-        wanted_fields.append("years")
-    if any(k in ql for k in ["manager", "title", "pto"]):
-        if "manager" in ql:
-            wanted_fields.append("manager")
-        if "title" in ql:
-            wanted_fields.append("title")
-        if "pto" in ql:
-            wanted_fields.append("pto_balance")
-
-    hr = (
-        tools22.hr_get.invoke(
-            {
-                "user": user,
-                "fields": wanted_fields,
-                "caller_user": str(claims.get("sub", "")).lower(),
-                "roles": roles,
-            }
-        )
-        if wanted_fields
-        else {"output": {}}
-    )
-    facts = hr.get("output", {}) if isinstance(hr, dict) else {}
-
-    extra = {}
-    if "years" in facts and "overtime" in ql:
-        ot = tools22.compute_overtime.invoke({"years": float(facts["years"])})
-        extra = ot.get("output", {}) if isinstance(ot, dict) else {}
-
-    chain = prompt | llm | parser
-    answer = chain.invoke(
-        {
-            "sys": sys,
-            "user": user,
-            "question": question,
-            "policy": policy,
-            "facts": facts,
-            "extra": extra,
-        }
-    )
-
-    return {
-        "answer": answer,
+    caller = str(claims.get("sub", "")).lower()
+    tag_usage(user=caller)
+    degraded: List[str] = []
+
+    # Same compiled signal matcher as server 21; the HR loader enforces field access
+    signals = get_signals().match(question)
+    wanted_fields = signals.fields
+    deadline = parse_deadline_header(x_deadline_ms, BUDGETS.request)
+
+    # "What's my overtime rate?" comes from the compiled policy rules: no
+    # retrieval and no LLM call
+    is_rule, asked = rule_question(question, signals.intents)
+    if is_rule:
+        with deadline_scope(deadline):
+            ruled = await rule_answer(user, caller, roles, asked)
+        if ruled is not None:
+            return ruled
+
+    async def policy() -> dict:
+        try:
+            return await run_stage(
+                "retrieval",
+                tools22.policy_retrieve.ainvoke(
+                    {"query": question}, config={"callbacks": CALLBACKS}
+                ),
+                BUDGETS.retrieval,
+                breakers["retrieval"],
+            )
+        except StageFailed:
+            degraded.append("retrieval")
+            return {}
+
+    async def hr() -> Dict[str, object]:
+        if not wanted_fields:
+            return {}
+        # Batched per request; authorization is still checked per subject
+        loader = tools22.make_hr_loader(caller, roles)
+        try:
+            return await run_stage(
+                "hr",
+                tools22.load_hr_facts(
+                    loader,
+                    user,
+                    wanted_fields,
+                    "about_manager" in signals.intents,
+                ),
+                BUDGETS.hr,
+                breakers["hr"],
+            )
+        except StageFailed:
+            degraded.append("hr")
+            return {}
+
+    async def overtime(facts: Dict[str, object]) -> Dict[str, object]:
+        if "years" in facts and "overtime" in signals.phrases:
+            ot = await tools22.compute_overtime.ainvoke(
+                {"years": float(facts["years"])}, config={"callbacks": CALLBACKS}
+            )
+            return ot if isinstance(ot, dict) else {}
+        return {}
+
+    async def answer(
+        policy: dict, facts: Dict[str, object], extra: Dict[str, object]
+    ) -> Optional[str]:
+        chain = ASK_PROMPT | llm | parser
+        try:
+            return await run_stage(
+                "llm",
+                chain.ainvoke(
+                    {
+                        "sys": ASK_SYS,
+                        "user": user,
+                        "question": question,
+                        "policy": policy,
+                        "facts": facts,
+                        "extra": extra,
+                    },
+                    config={"callbacks": CALLBACKS},
+                ),
+                BUDGETS.llm,
+                breakers["llm"],
+            )
+        except StageFailed:
+            degraded.append("llm")
+            return None
+
+    # Policy retrieval and the HR lookup are independent and run concurrently;
+    # overtime waits only on HR facts, the answer on everything.
+    with deadline_scope(deadline):
+        async with StageGraph() as graph:
+            graph.add("policy", policy, eager=True)
+            graph.add("hr", hr, eager=True)
+            graph.add("overtime", overtime, deps=["hr"])
+            graph.add("answer", answer, deps=["policy", "hr", "overtime"])
+            answer_text = await graph.result("answer")
+            policy_out = await graph.result("policy")
+            facts = await graph.result("hr")
+            extra = await graph.result("overtime")
+
+    resp: Dict[str, object] = {
+        "answer": answer_text,
         "facts": facts,
-        "policy_used": bool(policy.get("snippets")),
+        "policy_used": bool(policy_out.get("snippets")),
         **({"overtime": extra} if extra else {}),
     }
+    if answer_text is None:
+        # Degraded: return the facts/overtime we computed plus the raw policy text
+        resp["answer"] = "A full answer is not available right now."
+        resp["policy_snippet"] = snippet("\n\n".join(policy_out.get("snippets", [])))
+    if degraded:
+        resp["degraded"] = True
+        resp["degraded_stages"] = degraded
+    return resp
+
+
+@app.get("/stats/breakers")
+async def breaker_stats() -> Dict[str, Dict[str, object]]:
+    return {name: b.stats() for name, b in breakers.items()}
+
+
+@app.get("/stats/jwt")
+async def jwt_stats() -> Dict[str, object]:
+    return verifier.stats()
+
+
+@app.get("/stats/llm_scheduler")
+async def llm_scheduler_stats() -> Dict[str, object]:
+    return get_scheduler().stats()
 
 
 def build():
@@ -34,26 +34,52 @@ from langchain_core.tools import tool
 from langchain_openai import AzureOpenAIEmbeddings, OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from ragkit.authz import Authorizer, OrgIndex
+from ragkit.fakes import fake_models_enabled, make_fake_embeddings
+from ragkit.hr_loader import HRLoader
+from ragkit.hr_store import get_hr_store
+from ragkit.policy_rules import PolicyRules, RulesFile, pages_text, rules_path
+from ragkit.retrieval import AdaptiveK, query_candidates, select_candidates
+from ragkit.usage import MeteredEmbeddings
+
 # Build a reusable vectorstore over 21_policy_overtime.pdf (or create 22_policy_overtime.pdf)
 PDF_PATH = Path(__file__).parent / "21_policy_overtime.pdf"
 PERSIST_BASE = str(Path(__file__).parent / ".chroma_tools22")
+_RETRIEVAL_K = AdaptiveK.from_env(default_k=4)
 
 
 def _make_embeddings():
-    if os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT"):
+    if fake_models_enabled():
+        embeddings = make_fake_embeddings()
+    elif os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT"):
         from langchain_openai import AzureOpenAIEmbeddings
 
-        return AzureOpenAIEmbeddings(
+        embeddings = AzureOpenAIEmbeddings(
             azure_deployment=os.environ["AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT"]
         )
-    return OpenAIEmbeddings()
+    else:
+        embeddings = OpenAIEmbeddings()
+    return MeteredEmbeddings(embeddings)
+
+
+def _index_dir() -> str:
+    suffix = (
+        "fake"
+        if fake_models_enabled()
+        else os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT", "openai")
+    )
+    return f"{PERSIST_BASE}_{suffix}"
+
+
+def _compile_rules(pages=None) -> PolicyRules:
+    if pages is None:
+        pages = PyPDFLoader(str(PDF_PATH)).load()
+    return PolicyRules.compile(pages_text(pages), source=PDF_PATH.name)
 
 
 def _build_vectorstore() -> Chroma:
     embeddings = _make_embeddings()
-    persist_dir = (
-        f"{PERSIST_BASE}_{os.getenv('AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT','openai')}"
-    )
+    persist_dir = _index_dir()
     if Path(persist_dir).exists():
         try:
             return Chroma(embedding_function=embeddings, persist_directory=persist_dir)
@@ -63,98 +89,93 @@ def _build_vectorstore() -> Chroma:
     pages = loader.load()
     splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=120)
     docs = splitter.split_documents(pages)
-    return Chroma.from_documents(
+    vs = Chroma.from_documents(
         docs, embedding=embeddings, persist_directory=persist_dir
     )
+    # The overtime tiers are compiled from the same pages at index time
+    _compile_rules(pages).save(rules_path(persist_dir))
+    return vs
 
 
 _VECTORSTORE = _build_vectorstore()
+_RULES = RulesFile.ensure(_index_dir(), _compile_rules)
 
 
-# Minimal in-memory HR profile (server should enforce auth; tools do field checks)
-USER_PROFILE: Dict[str, Dict[str, object]] = {
-    "alice": {
-        "years": 0.8,
-        "dob": "1995-08-09",
-        "title": "Analyst",
-        "manager": "bob",
-        "salary": 90000,
-        "pto_balance": 32,
-    },
-    "bob": {
-        "years": 1.0,
-        "dob": "1990-01-05",
-        "title": "Manager",
-        "manager": "carol",
-        "salary": 140000,
-        "pto_balance": 18,
-    },
-    "carol": {
-        "years": 2.0,
-        "dob": "1988-02-10",
-        "title": "Senior Manager",
-        "manager": "dave",
-        "salary": 170000,
-        "pto_balance": 25,
-    },
-    "dave": {
-        "years": 3.4,
-        "dob": "1985-11-22",
-        "title": "Director",
-        "manager": None,
-        "salary": 220000,
-        "pto_balance": 12,
-    },
-}
+# HR profiles live in the shared store (server should enforce auth; tools do field checks)
+_HR_STORE = get_hr_store()
+_AUTHZ = Authorizer(OrgIndex.from_store(_HR_STORE))
 
 
 def _authorized(
-    field: str, subject_user: str, caller_user: str, roles: List[str]
-) -> bool:
-    # Self-access allowed for some fields; HR role can access more; deny by default
-    if field in {"years", "title", "manager", "pto_balance"}:
-        return (
-            caller_user == subject_user
-            or ("manager" in roles)
-            or ("hr" in roles)
-            or ("admin" in roles)
-        )
-    if field in {"dob", "salary"}:
-        # Allow self to view their own sensitive fields; others require HR/Admin
-        return (caller_user == subject_user) or ("hr" in roles) or ("admin" in roles)
-    return False
+    fields: List[str], subject_user: str, caller_user: str, roles: List[str]
+) -> List[str]:
+    # Self may read everything; managers read non-sensitive fields of their own
+    # reporting chain; HR/Admin read all. Compiled table, deny by default.
+    return _AUTHZ.allowed(fields, subject_user, caller_user, roles)
+
+
+def make_hr_loader(caller_user: str, roles: List[str]) -> HRLoader:
+    """Batched, memoized HR reads for one request; authorized per subject."""
+
+    async def fetch(
+        users: List[str], fields: List[str]
+    ) -> Dict[str, Dict[str, object]]:
+        return _HR_STORE.get_many(users, fields)
+
+    return HRLoader(
+        fetch,
+        authorize=lambda fields, subject: _authorized(
+            fields, subject, caller_user, roles
+        ),
+    )
+
+
+async def load_hr_facts(
+    loader: HRLoader, user: str, fields: List[str], about_manager: bool = False
+) -> Dict[str, object]:
+    """hr_get through a loader; "my manager's X" adds manager.<field> facts."""
+    own_fields = list(dict.fromkeys([*fields, "manager"])) if about_manager else fields
+    facts = await loader.load(user, own_fields)
+    if about_manager and facts.get("manager"):
+        theirs = await loader.load(str(facts["manager"]), fields)
+        facts.update({f"manager.{k}": v for k, v in theirs.items()})
+    return facts
 
 
 @tool("policy_retrieve")
 def policy_retrieve(query: str) -> dict:
     """Retrieve policy snippets relevant to the query."""
-    docs = _VECTORSTORE.similarity_search(query, k=4)
-    return {"snippets": [d.page_content for d in docs]}
+    qvec = _VECTORSTORE.embeddings.embed_query(query)
+    hits = query_candidates(_VECTORSTORE, [qvec], _RETRIEVAL_K.max_k)
+    cands = select_candidates(
+        _VECTORSTORE, hits[0], _RETRIEVAL_K, label="22/policy_retrieve"
+    )
+    return {"snippets": [c.doc.page_content for c in cands]}
 
 
 @tool("hr_get")
 def hr_get(user: str, fields: List[str], caller_user: str, roles: List[str]) -> dict:
     """Get HR fields for a user. Enforces auth based on roles and whether caller is the subject."""
-    profile = USER_PROFILE.get(user.lower()) or {}
+    allowed = _authorized(fields, user, caller_user, roles)
+    # Only authorized columns are read from the store
+    profile = _HR_STORE.get(user, allowed) or {}
     out: Dict[str, object] = {}
-    for f in fields:
-        if _authorized(f, user.lower(), caller_user.lower(), roles):
-            if f == "years":
-                out[f] = float(profile.get("years", 0.0))
-            elif f in profile:
-                out[f] = profile[f]
+    for f in allowed:
+        if f == "years":
+            out[f] = float(profile.get("years") or 0.0)
+        elif f in profile:
+            out[f] = profile[f]
     return out
 
 
+def overtime_rules() -> PolicyRules:
+    """The current compiled overtime tiers (reloaded after an index rebuild)."""
+    return _RULES.rules
+
+
 @tool("compute_overtime")
 def compute_overtime(years: float) -> dict:
     """Compute overtime multiplier from years of service."""
-    if years > 2:
-        mult = 1.7
-    elif years == 2:
-        mult = 1.5
-    elif years >= 1:
-        mult = 1.25
-    else:
-        mult = 1.0
-    return {"multiplier": mult}
+    # Tiers come from the policy PDF, compiled when the index was built
+    rules = overtime_rules()
+    return {"multiplier": rules.multiplier(years), "policy_version": rules.version}
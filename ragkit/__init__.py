@@ -0,0 +1,7 @@
+"""
+Shared helpers for the HR/policy RAG servers (19-22).
+
+The numbered lesson files cannot be imported by name, so code that more than one
+server needs lives in this package and is imported as ``from ragkit import ...``.
+Run the servers from the repository root so the package is on ``sys.path``.
+"""
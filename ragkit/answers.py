@@ -0,0 +1,146 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why answer some questions without the LLM?
+A: "Who is my manager?" is answered by one field of the HR record. Sending that
+   field through an LLM to rephrase it costs a network round trip, tokens and
+   hundreds of milliseconds, and adds a (small) risk of the model garbling a fact.
+   A template renders the same answer in microseconds and is exactly right.
+
+Q: When must the LLM still be used?
+A: When the question needs more than one field, when no field was recognized
+   (the request fell back to a default), or when the field has no template. The
+   template engine returns None and the caller falls back to the LLM prompt.
+   Only fields the question names count: "explain my overtime rate" loads
+   years of service, but "You have 3 years of service." would not answer it,
+   so any overtime, policy or narrative signal rules the template out.
+
+Q: And questions about the overtime rules themselves?
+A: "What's my overtime rate?" is a lookup in the compiled policy tiers
+   (ragkit.policy_rules) with the asker's years of service, or the tenure named
+   in the question ("after two years", "18 months"). A bare "multiplier" counts
+   only next to a tenure. Narrative questions ("why", "explain", approval), and
+   questions naming a tenure that cannot be read ("more than 2 years", "a few
+   years"), still go to the LLM with retrieved policy text.
+
+Q: How do you know it pays off?
+A: Count how many answers each path produced and their latency; the fraction of
+   traffic that bypassed the LLM and the latency difference come from those.
+
+SAMPLE CODE:
+"""
+
+from typing import AbstractSet, Dict, List, Optional, Sequence, Tuple
+
+from ragkit.policy_rules import PolicyRules, parse_tenure
+from ragkit.signals import SignalMatch
+
+# Signal groups whose questions a single HR field never answers
+NOT_TEMPLATED = frozenset(
+    {"policy", "overtime_rate", "multiplier", "narrative", "about_manager"}
+)
+
+FIELD_LABELS = {
+    "manager": "manager",
+    "title": "title",
+    "pto_balance": "PTO balance",
+    "years": "years of service",
+    "dob": "date of birth",
+    "salary": "salary",
+}
+
+
+def _render_value(field: str, value: object) -> str:
+    if field == "manager":
+        return (
+            f"Your manager is {value}."
+            if value
+            else "You do not have a manager on record."
+        )
+    if field == "years":
+        return f"You have {float(value):g} years of service."  # type: ignore[arg-type]
+    if field == "salary":
+        return f"Your salary is {value:,}."
+    return f"Your {FIELD_LABELS[field]} is {value}."
+
+
+def render_hr_answer(
+    requested_fields: Sequence[str], facts: Dict[str, object]
+) -> Optional[str]:
+    """Template answer for a single-field HR question, or None to use the LLM."""
+    if len(requested_fields) != 1:
+        return None
+    field = requested_fields[0]
+    if field not in FIELD_LABELS:
+        return None
+    if field not in facts:
+        return f"Your {FIELD_LABELS[field]} is not available to share."
+    return _render_value(field, facts[field])
+
+
+def template_fields(signals: SignalMatch) -> List[str]:
+    """Fields a template may answer: the ones named, none if more was asked."""
+    if signals.intents & NOT_TEMPLATED:
+        return []
+    return signals.named_fields
+
+
+def rule_question(
+    question: str, intents: AbstractSet[str]
+) -> Tuple[bool, Optional[float]]:
+    """(the compiled policy rules answer it, years named in it or None for the asker's)."""
+    if intents & {"narrative", "about_manager"}:
+        return False, None
+    named, years = parse_tenure(question)
+    if named and years is None:
+        return False, None
+    if "overtime_rate" in intents or ("multiplier" in intents and named):
+        return True, years
+    return False, None
+
+
+def render_rule_answer(rules: PolicyRules, years: float, personal: bool = True) -> str:
+    """Overtime multiplier for years of service, citing the policy sentence."""
+    tier = rules.tier(years)
+    who = "your" if personal else "the"
+    text = (
+        f"With {years:g} year{'' if years == 1 else 's'} of service {who} "
+        f"overtime multiplier is {rules.multiplier(years):.2f}x."
+    )
+    if tier is None:
+        return text + " No overtime tier of the policy applies at that service level."
+    return f"{text} Policy: {tier.text}"
+
+
+class AnswerPathStats:
+    def __init__(self) -> None:
+        self._count: Dict[str, int] = {}
+        self._seconds: Dict[str, float] = {}
+
+    def record(self, path: str, seconds: float) -> None:
+        self._count[path] = self._count.get(path, 0) + 1
+        self._seconds[path] = self._seconds.get(path, 0.0) + seconds
+
+    def stats(self) -> Dict[str, object]:
+        total = sum(self._count.values())
+        paths = {
+            p: {"count": n, "mean_ms": round(1000 * self._seconds[p] / n, 3)}
+            for p, n in self._count.items()
+        }
+        out: Dict[str, object] = {
+            "total": total,
+            "llm_bypass_fraction": (
+                round(
+                    sum(self._count.get(p, 0) for p in ("template", "rules")) / total,
+                    4,
+                )
+                if total
+                else 0.0
+            ),
+            "paths": paths,
+        }
+        if "template" in paths and "llm" in paths:
+            out["latency_saved_ms"] = round(
+                paths["llm"]["mean_ms"] - paths["template"]["mean_ms"], 3
+            )
+        return out
@@ -0,0 +1,37 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: How do you serve hundreds of questions in one request efficiently?
+A: Deduplicate first, then do every shared stage once for the whole batch: one
+   embeddings call, one multi-query vector search, one HR lookup for all users, and
+   llm.abatch() with a concurrency cap for the generation step.
+
+Q: How do you keep one bad item from failing the whole batch?
+A: Run the LLM step with return_exceptions=True and map each result back to its
+   input position, turning exceptions into per-item error entries.
+
+SAMPLE CODE:
+"""
+
+from typing import Hashable, List, Sequence, Tuple
+
+
+def normalize_question(q: str) -> str:
+    return " ".join(q.strip().lower().split())
+
+
+def dedupe(keys: Sequence[Hashable]) -> Tuple[List[Hashable], List[int]]:
+    """Return (unique keys in first-seen order, position in unique list for each key)."""
+    index: dict = {}
+    unique: List[Hashable] = []
+    positions: List[int] = []
+    for key in keys:
+        if key not in index:
+            index[key] = len(unique)
+            unique.append(key)
+        positions.append(index[key])
+    return unique, positions
+
+
+def error_item(exc: BaseException) -> dict:
+    return {"error": f"{type(exc).__name__}: {exc}"}
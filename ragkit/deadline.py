@@ -0,0 +1,186 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why give each request a deadline instead of relying on client timeouts?
+A: When the LLM provider slows down, the server keeps waiting long after the
+   client (Streamlit, 30-45 s) has given up, and the user gets nothing. A deadline
+   that travels with the request (X-Deadline-Ms header, or a server default) lets
+   every stage know how much time is left and stop early.
+
+Q: What is a per-stage budget?
+A: Each stage (retrieval, HR fetch, LLM) gets its own maximum, capped by what is
+   left of the request deadline. A stage that misses its budget is cut off and the
+   server returns what it already has (e.g. the computed multiplier plus the raw
+   policy snippet) with degraded: true, instead of timing out entirely.
+
+Q: What does a circuit breaker add?
+A: After repeated failures of a dependency the breaker "opens" and calls fail
+   immediately for a cool-down period, so requests degrade in microseconds instead
+   of each one waiting out the full budget. After the cool-down one trial call is
+   let through (half-open); success closes the breaker again.
+
+SAMPLE CODE:
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, Iterator, Optional
+
+from ragkit.llm_scheduler import Overloaded
+from ragkit.metrics import timed
+from ragkit.tracing import span
+
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+
+class StageFailed(Exception):
+    def __init__(self, stage: str, reason: str) -> None:
+        super().__init__(f"{stage}: {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+@dataclass
+class StageBudgets:
+    request: float = 20.0
+    retrieval: float = 3.0
+    hr: float = 1.0
+    route: float = 3.0
+    llm: float = 15.0
+
+    @classmethod
+    def from_env(cls) -> "StageBudgets":
+        return cls(
+            request=float(os.getenv("REQUEST_DEADLINE_S", cls.request)),
+            retrieval=float(os.getenv("RETRIEVAL_BUDGET_S", cls.retrieval)),
+            hr=float(os.getenv("HR_BUDGET_S", cls.hr)),
+            route=float(os.getenv("ROUTE_BUDGET_S", cls.route)),
+            llm=float(os.getenv("LLM_BUDGET_S", cls.llm)),
+        )
+
+
+class Deadline:
+    def __init__(self, seconds: float) -> None:
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "ragkit_deadline", default=None
+)
+
+
+def parse_deadline_header(value: Optional[str], default_s: float) -> float:
+    """Client-supplied budget in milliseconds, never longer than the server default."""
+    try:
+        return min(default_s, max(0.0, float(value) / 1000.0)) if value else default_s
+    except ValueError:
+        return default_s
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[Deadline]:
+    deadline = Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def remaining() -> Optional[float]:
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+class CircuitBreaker:
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "open":
+            self.rejected += 1
+            return False
+        if state == "half_open":
+            # Let this one trial call through; others see "open" until it reports
+            self.opened_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+async def run_stage(
+    name: str,
+    aw: Awaitable[Any],
+    budget: float,
+    breaker: Optional[CircuitBreaker] = None,
+) -> Any:
+    """Await aw within min(budget, time left on the request deadline).
+
+    Raises StageFailed on timeout, error or an open breaker; the caller degrades.
+    Overloaded from the LLM scheduler is re-raised as is: shedding load is our own
+    decision, not a dependency failure, so it neither trips the breaker nor degrades.
+    """
+    if breaker is not None and not breaker.allow():
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise StageFailed(name, "circuit open")
+    left = remaining()
+    timeout = budget if left is None else min(budget, left)
+    try:
+        with span(name), timed(name):
+            result = await asyncio.wait_for(aw, timeout=timeout)
+    except Overloaded:
+        raise
+    except asyncio.TimeoutError:
+        if breaker is not None:
+            breaker.record_failure()
+        raise StageFailed(name, f"exceeded {timeout:.2f}s budget")
+    except Exception as e:
+        if breaker is not None:
+            breaker.record_failure()
+        raise StageFailed(name, f"{type(e).__name__}: {e}") from e
+    if breaker is not None:
+        breaker.record_success()
+    return result
+
+
+def snippet(text: str, limit: int = 600) -> str:
+    text = text.strip()
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
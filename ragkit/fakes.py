@@ -0,0 +1,129 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: How do you load-test an LLM service without burning provider quota?
+A: Swap the provider-backed models for stand-ins that behave like them in the
+   ways that matter for capacity: a chat model that waits a realistic time to
+   first token, then emits tokens at a fixed rate and fails a configurable
+   fraction of calls with a 429, plus deterministic local embeddings. Everything
+   else (retrieval, HR lookup, scheduling, deadlines) runs for real.
+
+Q: How are the stand-ins switched on?
+A: FAKE_MODELS=1. The servers' make_llm()/make_embeddings() check it first, so
+   the same code paths run with no network. FAKE_LLM_TTFT_MS,
+   FAKE_LLM_TOKENS_PER_S, FAKE_LLM_OUTPUT_TOKENS, FAKE_LLM_ERROR_RATE and
+   FAKE_EMBEDDING_DIM shape their behaviour.
+
+SAMPLE CODE:
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from ragkit.context import count_tokens
+
+
+def fake_models_enabled() -> bool:
+    return os.getenv("FAKE_MODELS") == "1"
+
+
+class FakeRateLimitError(Exception):
+    """Stand-in for the provider's 429 response."""
+
+    status_code = 429
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model with configurable time to first token, token rate and error rate."""
+
+    ttft_s: float = 0.4
+    tokens_per_s: float = 60.0
+    output_tokens: int = 80
+    error_rate: float = 0.0
+    model_name: str = "fake-chat"
+
+    @classmethod
+    def from_env(cls) -> "FakeChatModel":
+        return cls(
+            ttft_s=float(os.getenv("FAKE_LLM_TTFT_MS", "400")) / 1000.0,
+            tokens_per_s=float(os.getenv("FAKE_LLM_TOKENS_PER_S", "60")),
+            output_tokens=int(os.getenv("FAKE_LLM_OUTPUT_TOKENS", "80")),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "ragkit-fake-chat"
+
+    def _check_error(self) -> None:
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeRateLimitError("fake provider: rate limit exceeded (429)")
+
+    def _words(self) -> List[str]:
+        return [f"tok{i}" for i in range(self.output_tokens)]
+
+    def _message(self, messages: List[BaseMessage]) -> AIMessage:
+        prompt_tokens = sum(count_tokens(str(m.content)) for m in messages)
+        return AIMessage(
+            content=" ".join(self._words()),
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": self.output_tokens,
+                "total_tokens": prompt_tokens + self.output_tokens,
+            },
+            response_metadata={"model_name": self.model_name},
+        )
+
+    def _duration(self) -> float:
+        return self.ttft_s + self.output_tokens / self.tokens_per_s
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._check_error()
+        time.sleep(self._duration())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._check_error()
+        await asyncio.sleep(self._duration())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self._check_error()
+        await asyncio.sleep(self.ttft_s)
+        for word in self._words():
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            await asyncio.sleep(1.0 / self.tokens_per_s)
+
+
+def make_fake_embeddings() -> DeterministicFakeEmbedding:
+    return DeterministicFakeEmbedding(size=int(os.getenv("FAKE_EMBEDDING_DIM", "256")))
@@ -0,0 +1,154 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why cache HR views at all when the store lookup is fast?
+A: Most profile requests are repeats: the client asks again on every button
+   press although nothing changed. Each one still runs a query, builds and
+   redacts the view and serializes it, and the whole body goes back over the
+   wire. A version check answers "nothing changed" without any of that.
+
+Q: How are views versioned?
+A: By the HR store itself: every row carries a version that sqlite triggers
+   bump on each write, whichever process or connection makes it (a sync job,
+   another worker, the loader). The ETag of a view is (store epoch, row
+   version, view key), so it changes exactly when the record does. The epoch
+   is random per database, so workers sharing HR_DB issue the same ETags, and
+   a recreated database never matches an old one.
+
+Q: Why not count versions in the cache and bump them from store upserts?
+A: That only sees writes made through this process's own store object. A
+   write from anywhere else left the counter alone, so the client kept
+   getting 304 for stale data.
+
+Q: What does a conditional request cost?
+A: One primary-key lookup of the row version; if If-None-Match matches, the
+   answer is a 304 with no body, no view built and nothing serialized.
+   Otherwise the view comes from a bounded LRU keyed by (user, view key),
+   where the view key includes the caller's role set because different roles
+   see differently redacted views. Entries remember the version they were
+   built at, so a stale entry is rebuilt on its next use instead of being
+   searched for and purged on every write.
+
+Q: What should the client do?
+A: Keep the last body and ETag per URL and send If-None-Match; on 304 reuse the
+   kept body. Responses carry "Cache-Control: private, no-cache": a browser or
+   client may store them, but must revalidate every time.
+
+SAMPLE CODE:
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from ragkit.hr_store import HRStore
+
+View = Optional[Dict[str, object]]
+CACHE_CONTROL = "private, no-cache"
+
+
+class HRViewCache:
+    """An LRU of redacted views with ETags from the HR store's row versions."""
+
+    def __init__(self, store: HRStore, maxsize: int = 4096) -> None:
+        self.store = store
+        self.maxsize = maxsize
+        self._views: "OrderedDict[Tuple[str, Hashable], Tuple[int, View]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @classmethod
+    def for_store(cls, store: HRStore, maxsize: int = 4096) -> "HRViewCache":
+        """A cache of views over store, current with writes from any process."""
+        return cls(store, maxsize)
+
+    def version(self, user: str) -> int:
+        return self.store.version(user)
+
+    def etag(self, user: str, key: Hashable, version: Optional[int] = None) -> str:
+        user = user.lower()
+        if version is None:
+            version = self.version(user)
+        digest = hashlib.blake2b(repr((user, key)).encode(), digest_size=6).hexdigest()
+        return f'"{self.store.epoch}-{version}-{digest}"'
+
+    def get(
+        self,
+        user: str,
+        key: Hashable,
+        build: Callable[[], View],
+        version: Optional[int] = None,
+    ) -> View:
+        """The cached view of user for key, built (and cached) if stale or absent.
+
+        version is the row version the caller already read, if any. A write
+        racing the build at worst caches a newer view under the older
+        version, which the next request sees as stale and rebuilds.
+        """
+        user = user.lower()
+        if version is None:
+            version = self.version(user)
+        with self._lock:
+            entry = self._views.get((user, key))
+            if entry is not None and entry[0] == version:
+                self._views.move_to_end((user, key))
+                self.hits += 1
+                return entry[1]
+        self.misses += 1
+        view = build()
+        with self._lock:
+            self._views[(user, key)] = (version, view)
+            self._views.move_to_end((user, key))
+            while len(self._views) > self.maxsize:
+                self._views.popitem(last=False)
+        return view
+
+    def stats(self) -> Mapping[str, int]:
+        return {
+            "views": len(self._views),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+    def respond(
+        self,
+        user: str,
+        key: Hashable,
+        if_none_match: Optional[str],
+        build: Callable[[], View],
+    ) -> Optional[Response]:
+        """304 if the client's copy is current, the view with its ETag, or None."""
+        version = self.version(user)
+        etag = self.etag(user, key, version)
+        if etag_matches(if_none_match, etag):
+            self.not_modified += 1
+            return not_modified(etag)
+        view = self.get(user, key, build, version)
+        if view is None:
+            return None
+        return JSONResponse(
+            view, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match semantics: "*" or any listed tag, weak or strong."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
@@ -0,0 +1,141 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why do multi-person questions get slow?
+A: "What's my manager's title?" or "compare my PTO with my manager's" need the
+   asker's record to find the manager, then the manager's record. Written as
+   plain calls that is one lookup per person (the N+1 pattern), and code that
+   fans out over several people issues one lookup per person even when they
+   are all needed at the same moment.
+
+Q: How does a DataLoader batch them?
+A: load(user, fields) does not fetch anything. It queues the (user, field)
+   keys and returns a future; the first load in an event-loop tick schedules a
+   dispatch with loop.call_soon, which runs after every coroutine that was
+   ready in that tick has queued its keys. The dispatch issues ONE bulk fetch
+   (get_many) for all queued users and the union of their fields, then
+   resolves every future. Callers stay simple: gather a few loads and they are
+   served by one query.
+
+Q: What is memoized?
+A: Every (user, field) the loader resolved, for the loader's lifetime.
+   A loader is created per request, so a record read twice in one request is
+   fetched once, and nothing leaks into the next request (which may have a
+   different caller and different permissions).
+
+Q: Where does authorization happen?
+A: In load(), per subject, before anything is queued: authorize(fields, user)
+   returns the fields the caller may read about that user, and only those keys
+   are queued. The bulk query selects the union of fields across subjects, but
+   only queued keys are memoized and returned, so one subject's permissions
+   never widen another's.
+
+SAMPLE CODE:
+"""
+
+import asyncio
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+FetchMany = Callable[
+    [List[str], List[str]], Awaitable[Mapping[str, Mapping[str, object]]]
+]
+Authorize = Callable[[Sequence[str], str], Sequence[str]]
+
+_MISSING = object()
+
+
+class HRLoader:
+    """Per-request batching and memoizing loader over a bulk HR fetch."""
+
+    def __init__(
+        self, fetch_many: FetchMany, authorize: Optional[Authorize] = None
+    ) -> None:
+        self._fetch_many = fetch_many
+        self._authorize = authorize
+        self._memo: Dict[Tuple[str, str], object] = {}
+        self._pending: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._queue: List[Tuple[str, str]] = []
+        self._scheduled = False
+        self._tasks: Set[asyncio.Task] = set()
+        self.loads = 0
+        self.batches = 0
+
+    async def load(self, user: str, fields: Sequence[str]) -> Dict[str, object]:
+        """Fields of user the caller may read; absent fields are denied or unset."""
+        user = user.lower()
+        allowed = self._authorize(fields, user) if self._authorize else fields
+        self.loads += 1
+        waits = []
+        for f in allowed:
+            key = (user, f)
+            if key in self._memo:
+                continue
+            fut = self._pending.get(key)
+            if fut is None:
+                fut = self._pending[key] = asyncio.get_running_loop().create_future()
+                self._queue.append(key)
+                self._schedule()
+            waits.append(fut)
+        if waits:
+            # Shielded: a cancelled caller must not cancel a future others share
+            await asyncio.gather(*(asyncio.shield(w) for w in waits))
+        out: Dict[str, object] = {}
+        for f in allowed:
+            value = self._memo.get((user, f), _MISSING)
+            if value is not _MISSING:
+                out[f] = value
+        return out
+
+    async def load_many(
+        self, users: Iterable[str], fields: Sequence[str]
+    ) -> Dict[str, Dict[str, object]]:
+        """Same fields for several users, resolved by one bulk fetch."""
+        wanted = list(dict.fromkeys(u.lower() for u in users))
+        found = await asyncio.gather(*(self.load(u, fields) for u in wanted))
+        return dict(zip(wanted, found))
+
+    def _schedule(self) -> None:
+        if not self._scheduled:
+            self._scheduled = True
+            # call_soon runs after everything already ready in this tick
+            asyncio.get_running_loop().call_soon(self._start_dispatch)
+
+    def _start_dispatch(self) -> None:
+        task = asyncio.get_running_loop().create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self) -> None:
+        batch, self._queue, self._scheduled = self._queue, [], False
+        users = list(dict.fromkeys(u for u, _ in batch))
+        fields = list(dict.fromkeys(f for _, f in batch))
+        self.batches += 1
+        try:
+            rows = await self._fetch_many(users, fields)
+        except Exception as e:
+            for key in batch:
+                fut = self._pending.pop(key)
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for key in batch:
+            # Only queued (authorized) keys are kept from the shared query
+            user, f = key
+            self._memo[key] = (rows.get(user) or {}).get(f, _MISSING)
+            fut = self._pending.pop(key)
+            if not fut.done():
+                fut.set_result(None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"loads": self.loads, "batches": self.batches}
@@ -0,0 +1,122 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why not have /ask call the server's own /hr endpoint over HTTP?
+A: A loopback request costs a full TCP + HTTP round trip back into the same process,
+   and when every worker is busy serving /ask there is nobody left to answer the
+   /hr call, so requests deadlock until they time out. Data that lives in-process
+   should be read in-process.
+
+Q: How do you keep the option of a real, remote HR service?
+A: Hide the lookup behind a small provider interface. The in-process provider reads
+   the data source directly; the remote provider holds ONE long-lived httpx client
+   (connection pool, keep-alive, timeouts) and supports batch lookups. Which one is
+   used, and the remote base URL, come from configuration.
+
+Q: How does the remote provider avoid re-downloading unchanged records?
+A: It keeps the last ETag and value per user and sends If-None-Match; the HR
+   service answers 304 while the record is unchanged and the kept value is used.
+
+SAMPLE CODE:
+"""
+
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Protocol, Tuple
+
+import httpx
+
+from ragkit.hr_store import HRStore
+
+
+class HRProvider(Protocol):
+    async def get_years(self, user: str) -> float: ...
+
+    async def get_years_many(self, users: Iterable[str]) -> Dict[str, float]: ...
+
+    async def aclose(self) -> None: ...
+
+
+class InProcessHRProvider:
+    """Reads years of service straight from the in-process HR store."""
+
+    def __init__(self, store: HRStore) -> None:
+        self._store = store
+
+    async def get_years(self, user: str) -> float:
+        return float((self._store.get(user, ["years"]) or {}).get("years") or 0.0)
+
+    async def get_years_many(self, users: Iterable[str]) -> Dict[str, float]:
+        wanted = {u.lower() for u in users}
+        found = self._store.get_many(wanted, ["years"])
+        return {u: float((found.get(u) or {}).get("years") or 0.0) for u in wanted}
+
+    async def aclose(self) -> None:
+        return None
+
+
+class RemoteHRProvider:
+    """Calls an HR HTTP service through one pooled, keep-alive client."""
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 2.0,
+        max_connections: int = 50,
+        max_keepalive: int = 20,
+        max_etags: int = 1024,
+    ) -> None:
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=30.0,
+            ),
+        )
+        # user -> (ETag, years): revalidated with If-None-Match, 304 reuses it
+        self._etags: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._max_etags = max_etags
+
+    async def get_years(self, user: str) -> float:
+        user = user.lower()
+        cached = self._etags.get(user)
+        resp = await self._client.get(
+            f"/hr/years/{user}",
+            headers={"If-None-Match": cached[0]} if cached else None,
+        )
+        if resp.status_code == 304 and cached:
+            self._etags.move_to_end(user)
+            return cached[1]
+        resp.raise_for_status()
+        years = float(resp.json().get("years", 0.0))
+        etag = resp.headers.get("etag")
+        if etag:
+            self._etags[user] = (etag, years)
+            self._etags.move_to_end(user)
+            while len(self._etags) > self._max_etags:
+                self._etags.popitem(last=False)
+        return years
+
+    async def get_years_many(self, users: Iterable[str]) -> Dict[str, float]:
+        wanted = sorted({u.lower() for u in users})
+        if not wanted:
+            return {}
+        resp = await self._client.get("/hr/years", params={"users": ",".join(wanted)})
+        resp.raise_for_status()
+        years = resp.json().get("years", {})
+        return {u: float(years.get(u, 0.0)) for u in wanted}
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def make_hr_provider(store: HRStore, base_url: Optional[str] = None) -> HRProvider:
+    """HR_PROVIDER=remote uses HR_API_BASE (or base_url); anything else stays in-process."""
+    if os.getenv("HR_PROVIDER", "inprocess").lower() == "remote":
+        url = os.getenv("HR_API_BASE") or base_url
+        if not url:
+            raise RuntimeError("HR_PROVIDER=remote requires HR_API_BASE")
+        return RemoteHRProvider(url, timeout=float(os.getenv("HR_API_TIMEOUT", "2.0")))
+    return InProcessHRProvider(store)
@@ -0,0 +1,335 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why move HR profiles from a dict in each server into a store?
+A: The dict was copied into 21 and 22, lives in every worker's memory, and is
+   searched by walking Python objects. A real HR extract has tens of thousands
+   of employees. A single sqlite file gives one source of truth that every
+   process can read, with real indexes and no server to run.
+
+Q: What makes the lookups fast?
+A: - The table is keyed by user (PRIMARY KEY, WITHOUT ROWID), so the row is
+     stored in the user index itself: a lookup is one B-tree descent.
+   - Column projection: only the requested fields are selected, from a
+     whitelist of column names, never by interpolating caller input.
+   - Prepared statements: sqlite3 caches compiled statements per connection by
+     SQL text. Projected columns follow table order and IN-lists are padded to
+     a few fixed sizes, so a handful of distinct statements cover every request
+     and are compiled once.
+   - get_many(users, fields) resolves a whole batch in one query per 500 users
+     instead of one query (or one dict walk) per user.
+
+Q: How is it shared across threads?
+A: One connection per thread (sqlite connections must not be shared between
+   threads without locking); reads run concurrently. The demo data lives in a
+   shared-cache in-memory database unless HR_DB points to a file; each store
+   gets its own uniquely named one, so two default stores never share rows.
+
+Q: How do caches notice writes made by another process?
+A: Every row carries a version, set by sqlite triggers from a store-wide
+   sequence on each insert or update -- whoever the writer is. version(user)
+   is one B-tree descent, so a cache can check it per request; seq() and
+   managers_since(seq) let an index catch up on just the rows that changed.
+
+Q: How fast is it?
+A: On 100k rows: about 14 us for one get(), and about 6 us per user with
+   get_many(100 users) versus 16 us per user for 100 separate get() calls.
+   Run this module to measure: python -m ragkit.hr_store
+
+SAMPLE CODE:
+"""
+
+import os
+import secrets
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+FIELDS = ("years", "dob", "title", "manager", "salary", "pto_balance")
+_IN_SIZES = (1, 8, 64, 500)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS employees (
+    user TEXT PRIMARY KEY,
+    years REAL NOT NULL DEFAULT 0,
+    dob TEXT,
+    title TEXT,
+    manager TEXT,
+    salary INTEGER,
+    pto_balance INTEGER,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+# Row versions are kept by triggers, so every writer bumps them: this process,
+# another worker, a sync job or plain sqlite3 on the file. seq is the last
+# version handed out; epoch is random per database, so ETags built from
+# versions never repeat when a database is recreated.
+_VERSIONING = """
+CREATE INDEX IF NOT EXISTS employees_version ON employees (version);
+CREATE TABLE IF NOT EXISTS hr_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    seq INTEGER NOT NULL,
+    epoch TEXT NOT NULL
+);
+INSERT OR IGNORE INTO hr_meta VALUES (0, 0, lower(hex(randomblob(4))));
+CREATE TRIGGER IF NOT EXISTS employees_insert_version
+AFTER INSERT ON employees BEGIN
+    UPDATE hr_meta SET seq = seq + 1;
+    UPDATE employees SET version = (SELECT seq FROM hr_meta) WHERE user = NEW.user;
+END;
+CREATE TRIGGER IF NOT EXISTS employees_update_version
+AFTER UPDATE OF years, dob, title, manager, salary, pto_balance ON employees BEGIN
+    UPDATE hr_meta SET seq = seq + 1;
+    UPDATE employees SET version = (SELECT seq FROM hr_meta) WHERE user = NEW.user;
+END;
+"""
+
+# Demo employees shared by servers 21 and 22 (lowercased user ids)
+DEMO_PROFILES: Dict[str, Dict[str, object]] = {
+    "alice": {
+        "years": 0.8,
+        "dob": "1995-08-09",
+        "title": "Analyst",
+        "manager": "bob",
+        "salary": 90000,
+        "pto_balance": 32,
+    },
+    "bob": {
+        "years": 1.0,
+        "dob": "1990-01-05",
+        "title": "Manager",
+        "manager": "carol",
+        "salary": 140000,
+        "pto_balance": 18,
+    },
+    "carol": {
+        "years": 2.0,
+        "dob": "1988-02-10",
+        "title": "Senior Manager",
+        "manager": "dave",
+        "salary": 170000,
+        "pto_balance": 25,
+    },
+    "dave": {
+        "years": 3.4,
+        "dob": "1985-11-22",
+        "title": "Director",
+        "manager": None,
+        "salary": 220000,
+        "pto_balance": 12,
+    },
+}
+
+
+def _columns(fields: Iterable[str]) -> List[str]:
+    wanted = set(fields)
+    return [f for f in FIELDS if f in wanted]
+
+
+class HRStore:
+    def __init__(self, path: Optional[str] = None) -> None:
+        # Default: a fresh in-memory database per store, shared by its threads
+        self.path = (
+            path or f"file:hr_store_{secrets.token_hex(4)}?mode=memory&cache=shared"
+        )
+        self._local = threading.local()
+        self._listeners: List[Callable[[Mapping[str, Mapping[str, object]]], None]] = []
+        # Keeps a shared in-memory database alive for the life of the store
+        self._keepalive = self._conn()
+        self._keepalive.executescript(_SCHEMA)
+        columns = {
+            r[1] for r in self._keepalive.execute("PRAGMA table_info(employees)")
+        }
+        if "version" not in columns:
+            # Files created before row versions: every row starts at version 0
+            self._keepalive.execute(
+                "ALTER TABLE employees ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            )
+        self._keepalive.executescript(_VERSIONING)
+        self.epoch: str = self._keepalive.execute(
+            "SELECT epoch FROM hr_meta"
+        ).fetchone()[0]
+
+    @classmethod
+    def from_env(cls) -> "HRStore":
+        """HR_DB=<file> for a persistent store; otherwise in-memory demo data."""
+        path = os.getenv("HR_DB")
+        store = cls(path) if path else cls()
+        if store.count() == 0:
+            store.upsert_many(DEMO_PROFILES)
+        return store
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, uri=self.path.startswith("file:"), cached_statements=256
+            )
+            self._local.conn = conn
+        return conn
+
+    def subscribe(
+        self, listener: Callable[[Mapping[str, Mapping[str, object]]], None]
+    ) -> None:
+        """Call listener(profiles) after every committed upsert through this store."""
+        self._listeners.append(listener)
+
+    def managers(self) -> List[Tuple[str, Optional[str]]]:
+        """(user, manager) for every employee: the reporting lines."""
+        return self._conn().execute("SELECT user, manager FROM employees").fetchall()
+
+    def version(self, user: str) -> int:
+        """Version of the user's row, bumped by every write from any connection.
+
+        Unknown users are at version 0.
+        """
+        row = (
+            self._conn()
+            .execute("SELECT version FROM employees WHERE user = ?", (user.lower(),))
+            .fetchone()
+        )
+        return 0 if row is None else row[0]
+
+    def seq(self) -> int:
+        """The newest row version in the store: it moves on every write."""
+        return self._conn().execute("SELECT seq FROM hr_meta").fetchone()[0]
+
+    def managers_since(self, seq: int) -> List[Tuple[str, Optional[str]]]:
+        """(user, manager) of the employees written after seq."""
+        return (
+            self._conn()
+            .execute("SELECT user, manager FROM employees WHERE version > ?", (seq,))
+            .fetchall()
+        )
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM employees").fetchone()[0]
+
+    def get(self, user: str, fields: Sequence[str]) -> Optional[Dict[str, object]]:
+        """Requested fields of one user (None if unknown); unknown fields are ignored."""
+        cols = _columns(fields)
+        row = (
+            self._conn()
+            .execute(
+                f"SELECT user{''.join(', ' + c for c in cols)} "
+                "FROM employees WHERE user = ?",
+                (user.lower(),),
+            )
+            .fetchone()
+        )
+        return None if row is None else dict(zip(cols, row[1:]))
+
+    def get_many(
+        self, users: Iterable[str], fields: Sequence[str]
+    ) -> Dict[str, Dict[str, object]]:
+        """Requested fields for many users at once, keyed by lowercased user."""
+        cols = _columns(fields)
+        select = f"SELECT user{''.join(', ' + c for c in cols)} FROM employees "
+        wanted = sorted({u.lower() for u in users})
+        conn = self._conn()
+        out: Dict[str, Dict[str, object]] = {}
+        for i in range(0, len(wanted), _IN_SIZES[-1]):
+            chunk = wanted[i : i + _IN_SIZES[-1]]
+            # Pad to a fixed size so the statement cache sees few distinct queries
+            size = next(s for s in _IN_SIZES if s >= len(chunk))
+            params = chunk + [chunk[-1]] * (size - len(chunk))
+            query = select + f"WHERE user IN ({','.join('?' * size)})"
+            for row in conn.execute(query, params):
+                out[row[0]] = dict(zip(cols, row[1:]))
+        return out
+
+    def upsert_many(self, profiles: Mapping[str, Mapping[str, object]]) -> None:
+        """Insert or update profiles; only the fields a profile carries change.
+
+        A partial profile ({"title": ...}) leaves the other columns as they
+        are (new rows get the column defaults), and listeners see only the
+        fields that were written, so they never mistake a missing field for a
+        cleared one.
+        """
+        changed: Dict[str, Dict[str, object]] = {}
+        by_columns: Dict[Tuple[str, ...], List[Tuple[object, ...]]] = {}
+        for user, p in profiles.items():
+            cols = tuple(_columns(p))
+            changed[user.lower()] = {c: p[c] for c in cols}
+            by_columns.setdefault(cols, []).append(
+                (user.lower(), *(p[c] for c in cols))
+            )
+        conn = self._conn()
+        with conn:
+            for cols, rows in by_columns.items():
+                names = "".join(", " + c for c in cols)
+                marks = ", ".join("?" * (len(cols) + 1))
+                action = (
+                    "UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in cols)
+                    if cols
+                    else "NOTHING"
+                )
+                conn.executemany(
+                    f"INSERT INTO employees (user{names}) VALUES ({marks}) "
+                    f"ON CONFLICT (user) DO {action}",
+                    rows,
+                )
+        for listener in self._listeners:
+            listener(changed)
+
+
+_store: Optional[HRStore] = None
+
+
+def get_hr_store() -> HRStore:
+    global _store
+    if _store is None:
+        _store = HRStore.from_env()
+    return _store
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    n_rows = 100_000
+    rng = random.Random(0)
+    profiles = {
+        f"emp{i:06d}": {
+            "years": round(rng.uniform(0, 30), 1),
+            "dob": f"19{rng.randint(60, 99)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+            "title": rng.choice(["Analyst", "Engineer", "Manager", "Director"]),
+            "manager": f"emp{rng.randrange(max(i, 1)):06d}" if i else None,
+            "salary": rng.randrange(50_000, 250_000, 1000),
+            "pto_balance": rng.randint(0, 40),
+        }
+        for i in range(n_rows)
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HRStore(os.path.join(tmp, "hr.sqlite"))
+        t0 = time.perf_counter()
+        store.upsert_many(profiles)
+        print(f"load {n_rows} rows: {time.perf_counter() - t0:.2f}s")
+        users = list(profiles)
+
+        def bench(label: str, fn, n: int) -> None:
+            t0 = time.perf_counter()
+            for _ in range(n):
+                fn()
+            print(f"{label:<44} {(time.perf_counter() - t0) / n * 1e6:8.1f} us")
+
+        bench(
+            "get(user, [years])", lambda: store.get(rng.choice(users), ["years"]), 20000
+        )
+        bench(
+            "get(user, 3 fields)",
+            lambda: store.get(rng.choice(users), ["title", "manager", "pto_balance"]),
+            20000,
+        )
+        bench(
+            "get_many(100 users, 2 fields)",
+            lambda: store.get_many(rng.sample(users, 100), ["years", "title"]),
+            500,
+        )
+        bench(
+            "100 x get(user, 2 fields)",
+            lambda: [store.get(u, ["years", "title"]) for u in rng.sample(users, 100)],
+            500,
+        )
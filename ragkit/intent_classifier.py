@@ -0,0 +1,266 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why not route every question with the LLM prompt from 09g?
+A: It costs a full LLM round trip (hundreds of ms, plus tokens) to get back one
+   word, before the real work can start. Most questions look like questions we
+   have already seen, and for those a local classifier over the question
+   embedding is just as good.
+
+Q: How does a nearest-centroid classifier work?
+A: Embed the labeled example questions, average (and re-normalize) the vectors
+   per route: one centroid each for policy, hr, hybrid and unknown. A new
+   question's embedding is compared to the centroids with a dot product (cosine
+   similarity); the closest centroid wins. With four centroids that is one tiny
+   matrix-vector product, a few microseconds. The question embedding is the one
+   retrieval needs anyway, so routing adds no extra API call.
+
+Q: When does it escalate to the LLM?
+A: The similarities are turned into probabilities with a softmax (temperature
+   INTENT_TEMPERATURE); when the top probability is below INTENT_MIN_CONFIDENCE
+   the caller falls back to the LLM routing prompt. Only unfamiliar questions pay
+   for the round trip.
+
+Q: How does the training set grow?
+A: With INTENT_LOG set (a file, or "on" for data/intent_decisions.jsonl), every
+   decision is appended to it as a JSON line (question, final route, which path
+   decided it, centroid route and confidence) by a background thread. The log
+   keeps users' questions, so it is off unless asked for. LLM-decided questions
+   are exactly the ones the centroids were unsure about; after review, promote
+   them into the examples file:
+       python -m ragkit.intent_classifier --promote data/intent_decisions.jsonl
+   The next restart trains on them and stops escalating those questions.
+
+SAMPLE CODE:
+"""
+
+import argparse
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ragkit.paths import data_path
+
+ROUTES = ("policy", "hr", "hybrid", "unknown")
+DEFAULT_EXAMPLES_FILE = Path(__file__).parent / "intent_examples.jsonl"
+
+
+def load_examples(path: Union[str, Path]) -> List[Tuple[str, str]]:
+    """(question, route) pairs from a JSON-lines file; unknown routes are skipped."""
+    examples = []
+    with open(path) as fh:
+        for line in fh:
+            if line.strip():
+                row = json.loads(line)
+                if row.get("route") in ROUTES:
+                    examples.append((row["question"], row["route"]))
+    return examples
+
+
+@dataclass
+class RouteDecision:
+    route: str
+    confidence: float
+    confident: bool
+
+
+class CentroidClassifier:
+    def __init__(
+        self, labels: Sequence[str], centroids: np.ndarray, temperature: float = 0.05
+    ) -> None:
+        self.labels = list(labels)
+        self.centroids = centroids.astype(np.float32)
+        self.temperature = temperature
+
+    @classmethod
+    def fit(
+        cls,
+        examples: Sequence[Tuple[str, str]],
+        vectors: Sequence[Sequence[float]],
+        temperature: float = 0.05,
+    ) -> "CentroidClassifier":
+        x = np.asarray(vectors, dtype=np.float32)
+        x /= np.linalg.norm(x, axis=1, keepdims=True) + 1e-12
+        routes = np.array([route for _, route in examples])
+        labels = [r for r in ROUTES if (routes == r).any()]
+        centroids = np.stack([x[routes == r].mean(axis=0) for r in labels])
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+        return cls(labels, centroids, temperature)
+
+    def probabilities(self, vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        sims = self.centroids @ (v / (np.linalg.norm(v) + 1e-12))
+        z = np.exp((sims - sims.max()) / self.temperature)
+        return z / z.sum()
+
+    def classify(self, vector: Sequence[float]) -> Tuple[str, float]:
+        p = self.probabilities(vector)
+        best = int(p.argmax())
+        return self.labels[best], float(p[best])
+
+
+class DecisionLog:
+    """Appends routing decisions to a JSON-lines file from a background thread."""
+
+    def __init__(self, path: str, flush_timeout_s: float = 5.0) -> None:
+        self.path = path
+        self.flush_timeout_s = flush_timeout_s
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+        atexit.register(self.flush)  # the thread is a daemon
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._queue.put(row)
+
+    def flush(self, timeout_s: Optional[float] = None) -> bool:
+        """Wait until every queued row is written; False if that timed out."""
+        deadline = time.monotonic() + (
+            self.flush_timeout_s if timeout_s is None else timeout_s
+        )
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            rows = [self._queue.get()]
+            while not self._queue.empty():
+                rows.append(self._queue.get_nowait())
+            try:
+                with open(self.path, "a") as fh:
+                    fh.writelines(json.dumps(r) + "\n" for r in rows)
+            except OSError:
+                pass  # losing a log line must never fail a request
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+
+
+class IntentRouter:
+    """Centroid routing with a confidence threshold and a decision log."""
+
+    def __init__(
+        self,
+        classifier: CentroidClassifier,
+        min_confidence: float = 0.6,
+        log: Optional[DecisionLog] = None,
+    ) -> None:
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+        self.log = log
+        self.decisions: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls, embeddings: Any) -> "IntentRouter":
+        """Train on INTENT_EXAMPLES with the same embeddings used for retrieval."""
+        examples = load_examples(
+            os.getenv("INTENT_EXAMPLES", str(DEFAULT_EXAMPLES_FILE))
+        )
+        vectors = embeddings.embed_documents([q for q, _ in examples])
+        classifier = CentroidClassifier.fit(
+            examples, vectors, float(os.getenv("INTENT_TEMPERATURE", "0.05"))
+        )
+        # The log holds users' questions, so it is opt-in: INTENT_LOG=on writes
+        # data/intent_decisions.jsonl, any other value is the file to write
+        log_path = os.getenv("INTENT_LOG", "off")
+        if log_path.lower() == "on":
+            log_path = data_path("intent_decisions.jsonl")
+        return cls(
+            classifier,
+            float(os.getenv("INTENT_MIN_CONFIDENCE", "0.6")),
+            None if log_path.lower() in ("", "off") else DecisionLog(log_path),
+        )
+
+    def classify(self, vector: Sequence[float]) -> RouteDecision:
+        route, confidence = self.classifier.classify(vector)
+        return RouteDecision(route, confidence, confidence >= self.min_confidence)
+
+    def record(
+        self,
+        question: str,
+        route: str,
+        source: str,
+        decision: Optional[RouteDecision] = None,
+    ) -> None:
+        """Log the final route and which path (centroid, llm, signals) decided it."""
+        self.decisions[source] = self.decisions.get(source, 0) + 1
+        if self.log is None:
+            return
+        row: Dict[str, Any] = {
+            "ts": round(time.time(), 3),
+            "question": question,
+            "route": route,
+            "source": source,
+        }
+        if decision is not None:
+            row["centroid_route"] = decision.route
+            row["confidence"] = round(decision.confidence, 4)
+        self.log.write(row)
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.decisions.values())
+        return {
+            "decisions": dict(self.decisions),
+            "escalation_rate": (
+                round(1 - self.decisions.get("centroid", 0) / total, 4)
+                if total
+                else 0.0
+            ),
+            "min_confidence": self.min_confidence,
+            "labels": self.classifier.labels,
+        }
+
+
+def promote(log_path: str, examples_path: str) -> int:
+    """Append LLM-decided questions from the log to the examples; returns the count."""
+    known = {q.strip().lower() for q, _ in load_examples(examples_path)}
+    added = 0
+    with open(log_path) as src, open(examples_path, "a") as dst:
+        for line in src:
+            row = json.loads(line)
+            key = row["question"].strip().lower()
+            if row.get("source") != "llm" or row["route"] not in ROUTES or key in known:
+                continue
+            known.add(key)
+            dst.write(json.dumps({"question": row["question"], "route": row["route"]}))
+            dst.write("\n")
+            added += 1
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Intent centroid classifier")
+    parser.add_argument("--promote", metavar="LOG", help="merge LLM decisions")
+    parser.add_argument("--examples", default=str(DEFAULT_EXAMPLES_FILE))
+    parser.add_argument("--dim", type=int, default=1536, help="embedding size")
+    args = parser.parse_args()
+    if args.promote:
+        print(f"added {promote(args.promote, args.examples)} examples")
+    else:
+        # Classification cost alone; the question embedding is shared with retrieval
+        examples = load_examples(args.examples)
+        rng = np.random.default_rng(0)
+        clf = CentroidClassifier.fit(
+            examples, rng.normal(size=(len(examples), args.dim))
+        )
+        queries = rng.normal(size=(1000, args.dim)).astype(np.float32).tolist()
+        t0 = time.perf_counter()
+        for q in queries:
+            clf.classify(q)
+        per_us = (time.perf_counter() - t0) / len(queries) * 1e6
+        print(
+            f"{len(examples)} examples, {len(clf.labels)} centroids, dim {args.dim}: "
+            f"{per_us:.1f} us/question"
+        )
@@ -0,0 +1,356 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: What does verifying a bearer token cost on every request?
+A: jwt.decode base64-decodes and parses the header and payload, checks the
+   signature and validates the claims. With HS256 that is mostly parsing, tens
+   of microseconds. With RS256 or ES256 from an identity provider the signature
+   check is public-key cryptography, several times slower. A client sends the
+   same token on every request until it expires, so nearly all of that work
+   repeats a check that already passed.
+
+Q: How is the result cached safely?
+A: By a digest of the whole token (blake2b), so only the exact bytes that were
+   verified can hit. An entry holds the verified claims and is valid until the
+   token's exp: past that a hit is a miss, and the full check runs again (and
+   fails). The cache is a bounded LRU, so a flood of distinct tokens only evicts
+   entries. Tokens that fail are never cached. Each hit returns a copy of the
+   claims.
+
+Q: Where do the keys come from, and how does rotation work?
+A: HS256 uses a shared secret. RS256 and ES256 (and HS256 with a kid) use a
+   key set in JWKS form, from a URL, a file or a dict, parsed once into key
+   objects and held locally. The key is picked by the token header's kid.
+   - The set is refetched when it is older than its TTL.
+   - An unknown kid (the IdP has rotated in a new key) refetches it at once,
+     at most once per min_refresh_s, so forged kids cannot hammer the IdP.
+   - When a kid disappears from the set, cached claims verified with it are
+     dropped.
+   A fetch that fails keeps the previous keys.
+
+Q: What stops algorithm confusion?
+A: The allowed algorithms are fixed when the verifier is built, and the header's
+   alg must be one of them. HMAC algorithms only ever get the shared secret or
+   an "oct" key. Key-set keys are passed as PyJWK objects, which PyJWT refuses
+   to use with any algorithm other than their own, so an RSA public key can
+   never be used as an HMAC secret.
+
+Q: How much does it save?
+A: Per request on a repeated token: about 40 us for HS256, 75 us for RS256 and
+   125 us for ES256 through jwt.decode, against about 1.5-2 us for a cache hit
+   (digest, LRU lookup, exp check and a copy of the claims).
+   Run this module to measure: python -m ragkit.jwt_verify
+
+SAMPLE CODE:
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import jwt
+
+logger = logging.getLogger(__name__)
+
+Claims = Dict[str, Any]
+HMAC_ALGORITHMS = frozenset({"HS256", "HS384", "HS512"})
+REQUIRED_CLAIMS = ("exp", "iat", "iss", "sub")
+
+
+def _digest(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+class KeySet:
+    """A locally held JWKS: keys by kid, refetched on TTL or on an unknown kid."""
+
+    def __init__(
+        self,
+        fetch: Callable[[], Mapping[str, Any]],
+        ttl_s: float = 300.0,
+        min_refresh_s: float = 30.0,
+    ) -> None:
+        self._fetch = fetch
+        self.ttl_s = ttl_s
+        self.min_refresh_s = min_refresh_s
+        self._lock = threading.Lock()
+        self._keys: Dict[Optional[str], jwt.PyJWK] = {}
+        self._fetched_at = float("-inf")
+        self._listeners: List[Callable[[Iterable[Optional[str]]], None]] = []
+        self.refreshes = 0
+        self.refresh()
+
+    @classmethod
+    def from_url(cls, url: str, timeout_s: float = 5.0, **kwargs: Any) -> "KeySet":
+        import httpx
+
+        def fetch() -> Mapping[str, Any]:
+            resp = httpx.get(url, timeout=timeout_s)
+            resp.raise_for_status()
+            return resp.json()
+
+        return cls(fetch, **kwargs)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], **kwargs: Any) -> "KeySet":
+        return cls(lambda: json.loads(Path(path).read_text()), **kwargs)
+
+    @classmethod
+    def from_jwks(cls, jwks: Mapping[str, Any], **kwargs: Any) -> "KeySet":
+        return cls(lambda: jwks, **kwargs)
+
+    def subscribe(self, listener: Callable[[Iterable[Optional[str]]], None]) -> None:
+        """Call listener(removed_kids) after a refresh that dropped keys."""
+        self._listeners.append(listener)
+
+    def refresh(self) -> bool:
+        """Refetch the set now; False (old keys kept) if the fetch failed."""
+        try:
+            jwks = jwt.PyJWKSet.from_dict(dict(self._fetch()))
+        except Exception as e:
+            logger.warning(
+                "keeping %d JWT keys; refresh failed: %s", len(self._keys), e
+            )
+            # Counts as a fetch: no retry storm while the IdP is down
+            self._fetched_at = time.monotonic()
+            return False
+        keys = {k.key_id: k for k in jwks.keys}
+        removed = [kid for kid in self._keys if kid not in keys]
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        self.refreshes += 1
+        if removed:
+            for listener in self._listeners:
+                listener(removed)
+        return True
+
+    def _maybe_refresh(self, force: bool) -> None:
+        age = time.monotonic() - self._fetched_at
+        if age < (self.min_refresh_s if force else self.ttl_s):
+            return
+        with self._lock:
+            # Another thread may have refreshed while this one waited
+            if time.monotonic() - self._fetched_at >= age:
+                self.refresh()
+
+    def get(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        self._maybe_refresh(force=False)
+        key = self._keys.get(kid)
+        if key is None and kid is None and len(self._keys) == 1:
+            # A token without a kid against a single-key set
+            key = next(iter(self._keys.values()))
+        if key is None:
+            self._maybe_refresh(force=True)
+            key = self._keys.get(kid)
+        return key
+
+    def kids(self) -> Tuple[Optional[str], ...]:
+        return tuple(self._keys)
+
+
+class JWTVerifier:
+    """Signature and claims check with a bounded cache of verified claims."""
+
+    def __init__(
+        self,
+        algorithms: Sequence[str] = ("HS256",),
+        secret: Optional[Union[str, bytes]] = None,
+        key_set: Optional[KeySet] = None,
+        issuer: Optional[Union[str, Sequence[str]]] = None,
+        audience: Optional[Union[str, Sequence[str]]] = None,
+        require: Sequence[str] = REQUIRED_CLAIMS,
+        leeway_s: float = 0.0,
+        maxsize: int = 10_000,
+    ) -> None:
+        if any(a.lower() == "none" for a in algorithms):
+            raise ValueError('the "none" algorithm is never accepted')
+        self.algorithms = frozenset(algorithms)
+        self.secret = secret
+        self.key_set = key_set
+        self.issuer = issuer
+        self.audience = audience
+        self.require = list(require)
+        self.leeway_s = leeway_s
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[bytes, Tuple[float, Optional[str], Claims]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        if key_set is not None:
+            key_set.subscribe(self.forget_kids)
+
+    def _key(self, header: Mapping[str, Any]) -> Any:
+        alg = header.get("alg")
+        if alg not in self.algorithms:
+            raise jwt.InvalidAlgorithmError(f"algorithm {alg!r} is not allowed")
+        kid = header.get("kid")
+        if (
+            alg in HMAC_ALGORITHMS
+            and self.secret is not None
+            and (kid is None or self.key_set is None)
+        ):
+            return self.secret
+        key = self.key_set.get(kid) if self.key_set is not None else None
+        if key is None:
+            raise jwt.InvalidKeyError(f"no key for kid {kid!r}")
+        return key
+
+    def cached(self, token: str) -> Optional[Claims]:
+        """Claims of a token verified before and not yet expired, else None."""
+        digest = _digest(token)
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is None:
+                return None
+            if time.time() >= entry[0]:
+                del self._cache[digest]
+                return None
+            self._cache.move_to_end(digest)
+            self.hits += 1
+            return dict(entry[2])
+
+    def verify(self, token: str) -> Claims:
+        """Verified claims; raises jwt.InvalidTokenError (or a subclass)."""
+        claims = self.cached(token)
+        if claims is not None:
+            return claims
+        self.misses += 1
+        try:
+            header = jwt.get_unverified_header(token)
+            claims = jwt.decode(
+                token,
+                self._key(header),
+                algorithms=[header["alg"]],
+                issuer=self.issuer,
+                audience=self.audience,
+                leeway=self.leeway_s,
+                options={"require": self.require},
+            )
+        except jwt.PyJWTError:
+            self.failures += 1
+            raise
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            digest = _digest(token)
+            with self._lock:
+                self._cache[digest] = (float(exp), header.get("kid"), dict(claims))
+                self._cache.move_to_end(digest)
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        return claims
+
+    def forget_kids(self, kids: Iterable[Optional[str]]) -> None:
+        """Drop cached claims verified with keys that left the key set."""
+        gone = set(kids)
+        with self._lock:
+            for digest in [d for d, e in self._cache.items() if e[1] in gone]:
+                del self._cache[digest]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+            "key_refreshes": self.key_set.refreshes if self.key_set else 0,
+            "kids": list(self.key_set.kids()) if self.key_set else [],
+        }
+
+
+if __name__ == "__main__":
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    secret = "bench-secret-of-at-least-32-bytes!!"
+    jwks = {
+        "keys": [
+            {
+                **json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(rsa_key.public_key())),
+                "kid": "rsa-1",
+                "alg": "RS256",
+                "use": "sig",
+            },
+            {
+                **json.loads(jwt.algorithms.ECAlgorithm.to_jwk(ec_key.public_key())),
+                "kid": "ec-1",
+                "alg": "ES256",
+                "use": "sig",
+            },
+        ]
+    }
+    now = int(time.time())
+    claims = {"iss": "bench", "sub": "alice", "roles": ["hr"], "iat": now}
+    claims["exp"] = now + 3600
+    tokens = {
+        "HS256": (jwt.encode(claims, secret, algorithm="HS256"), secret),
+        "RS256": (
+            jwt.encode(claims, rsa_key, algorithm="RS256", headers={"kid": "rsa-1"}),
+            rsa_key.public_key(),
+        ),
+        "ES256": (
+            jwt.encode(claims, ec_key, algorithm="ES256", headers={"kid": "ec-1"}),
+            ec_key.public_key(),
+        ),
+    }
+    verifier = JWTVerifier(
+        ("HS256", "RS256", "ES256"),
+        secret=secret,
+        key_set=KeySet.from_jwks(jwks),
+        issuer="bench",
+    )
+
+    def bench(label: str, fn: Callable[[], object], n: int) -> None:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        print(f"{label:<44} {(time.perf_counter() - t0) / n * 1e6:8.2f} us")
+
+    for alg, (token, key) in tokens.items():
+        # Before: what decode_jwt does on every request
+        bench(
+            f"{alg} jwt.decode per request",
+            lambda: jwt.decode(
+                token,
+                key,
+                algorithms=[alg],
+                issuer="bench",
+                options={"require": list(REQUIRED_CLAIMS)},
+            ),
+            2000,
+        )
+        assert verifier.verify(token)["sub"] == "alice"
+        bench(f"{alg} verifier, cached token", lambda: verifier.verify(token), 50_000)
+
+    # Rotation: a token signed by a key the set does not have yet
+    new_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwks["keys"].append(
+        {
+            **json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(new_key.public_key())),
+            "kid": "rsa-2",
+            "alg": "RS256",
+        }
+    )
+    verifier.key_set.min_refresh_s = 0  # type: ignore[union-attr]
+    rotated = jwt.encode(claims, new_key, algorithm="RS256", headers={"kid": "rsa-2"})
+    assert verifier.verify(rotated)["sub"] == "alice"
+    print(f"rotation picked up rsa-2: {verifier.stats()}")
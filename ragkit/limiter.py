@@ -0,0 +1,159 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why not a fixed max_concurrency for LLM calls?
+A: Any fixed number is wrong most of the time: off-peak the provider could take
+   far more parallel calls, and when it degrades the same number piles up slow
+   requests and 429s. The right limit has to be discovered from what the provider
+   is doing right now.
+
+Q: How does AIMD find it?
+A: Like TCP congestion control. While calls finish near the baseline latency and
+   the limit is actually in use, the limit grows additively (about +1 per "window"
+   of calls). On a 429, a timeout or a latency spike it is cut multiplicatively
+   (halved by default), at most once per baseline latency so one burst of
+   failures does not collapse it to the floor.
+
+Q: What is the baseline?
+A: A moving average of call latency that follows improvements quickly and
+   slowdowns slowly. It adapts if the provider gets permanently slower, but a
+   spike (or latency creeping up under load) stands out against it.
+
+Q: What happens when the limit is reached?
+A: Callers queue for a free slot; a caller that waits longer than max_wait_s is
+   rejected, and the caller turns that into a 503. Limit, in-flight calls,
+   increases, decreases and rejections are exported through stats().
+
+SAMPLE CODE:
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """429/503 responses and timeouts mean the provider is saturated."""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status in (429, 503) or "Timeout" in type(exc).__name__
+
+
+class AIMDLimiter:
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        tolerance: float = 2.0,
+        smoothing: float = 0.05,
+        max_wait_s: float = 5.0,
+    ) -> None:
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.max_wait_s = max_wait_s
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self.increases = 0
+        self.decreases: Dict[str, int] = {"overload": 0, "latency": 0}
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "AIMDLimiter":
+        return cls(
+            initial=int(os.getenv("LLM_CONCURRENCY_INITIAL", "8")),
+            min_limit=int(os.getenv("LLM_CONCURRENCY_MIN", "1")),
+            max_limit=int(os.getenv("LLM_CONCURRENCY_MAX", "64")),
+            max_wait_s=float(os.getenv("LLM_CONCURRENCY_MAX_WAIT_S", "5")),
+        )
+
+    async def acquire(self) -> bool:
+        """Take a slot; False if none freed up within max_wait_s."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return True
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            done, _ = await asyncio.wait({fut}, timeout=self.max_wait_s)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release_slot()
+            fut.cancel()
+            raise
+        if not done:
+            fut.cancel()
+            self.rejected += 1
+            return False
+        return True
+
+    def release(self, latency: float, error: Optional[BaseException] = None) -> None:
+        """Return a slot and adjust the limit from how the call went."""
+        saturated = self.in_flight >= self.limit / 2
+        self._release_slot()
+        spiked = self.baseline is not None and latency > self.tolerance * self.baseline
+        if error is not None:
+            # A cancelled call only counts if it was already slow (deadline hit)
+            if is_overload_error(error) or (
+                isinstance(error, asyncio.CancelledError) and spiked
+            ):
+                self._decrease("overload")
+            return
+        if spiked:
+            self._decrease("latency")
+        elif saturated and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.increases += 1
+            self._wake()
+        if self.baseline is None:
+            self.baseline = latency
+        else:
+            # Follow improvements quickly and slowdowns slowly, so creeping latency
+            # under load still registers as a spike instead of a new normal
+            alpha = self.smoothing * (4 if latency < self.baseline else 0.2)
+            self.baseline += alpha * (latency - self.baseline)
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < (self.baseline or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        self.decreases[reason] += 1
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            fut = self._waiters.popleft()
+            if fut.done():
+                continue
+            self.in_flight += 1
+            fut.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": sum(1 for f in self._waiters if not f.done()),
+            "baseline_ms": (
+                None if self.baseline is None else round(1000 * self.baseline, 1)
+            ),
+            "increases": self.increases,
+            "decreases": dict(self.decreases),
+            "rejected": self.rejected,
+        }
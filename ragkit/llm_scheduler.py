@@ -0,0 +1,325 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why put a scheduler in front of the chat model?
+A: Interactive /ask traffic and batch jobs share one Azure deployment quota
+   (requests per minute and tokens per minute). Without coordination a batch run
+   can use the whole quota and interactive users start getting 429s from the
+   provider. A process-wide scheduler decides who goes first and how fast.
+
+Q: How does it account for quota?
+A: Two token buckets refilled continuously: one in requests (RPM) and one in LLM
+   tokens (TPM). Each call is charged its estimated prompt tokens plus an expected
+   completion size up front; when the response reports real usage the difference
+   is settled, so estimates do not drift.
+
+Q: What are priority lanes and load shedding?
+A: Waiting calls sit in an "interactive" or "batch" queue. Interactive callers are
+   always served first. Before queueing, the scheduler predicts the wait from the
+   bucket deficits; if it exceeds the lane's limit (or a queued call waits too
+   long) the call is rejected with Overloaded, which the API turns into
+   503 + Retry-After -- before the provider starts rejecting us.
+
+Q: And how many calls run at once?
+A: After quota admission each call also needs a slot from an AIMD limiter
+   (ragkit.limiter) that adapts the in-flight limit to observed latency and 429s.
+
+SAMPLE CODE:
+"""
+
+import asyncio
+import contextvars
+import math
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from ragkit.context import count_tokens
+from ragkit.limiter import AIMDLimiter
+from ragkit.metrics import REGISTRY, timed
+
+LANES = ("interactive", "batch")
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "ragkit_llm_priority", default="interactive"
+)
+
+
+def current_priority() -> str:
+    """Lane of the calls made from here (see llm_priority)."""
+    return _priority.get()
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: float, lane: str) -> None:
+        super().__init__(f"LLM capacity exhausted for {lane} traffic")
+        self.retry_after = retry_after
+        self.lane = lane
+
+
+@contextmanager
+def llm_priority(lane: str) -> Iterator[None]:
+    """Calls made inside this block (and tasks it spawns) use the given lane."""
+    token = _priority.set(lane)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst_seconds: float = 10.0) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, n: float) -> float:
+        self._refill()
+        return max(0.0, (n - self.level) / self.rate)
+
+    def take(self, n: float) -> None:
+        self._refill()
+        self.level = min(self.capacity, self.level - n)
+
+
+@dataclass
+class _Waiter:
+    fut: asyncio.Future
+    tokens: int
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        rpm: float,
+        tpm: float,
+        max_queue_s: Optional[Dict[str, float]] = None,
+        completion_tokens: int = 256,
+        limiter: Optional[AIMDLimiter] = None,
+    ) -> None:
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_queue_s = max_queue_s or {"interactive": 5.0, "batch": 120.0}
+        self.completion_tokens = completion_tokens
+        self.limiter = limiter or AIMDLimiter()
+        self._queues: Dict[str, Deque[_Waiter]] = {lane: deque() for lane in LANES}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.admitted = {lane: 0 for lane in LANES}
+        self.shed = {lane: 0 for lane in LANES}
+        self.queue_seconds = {lane: 0.0 for lane in LANES}
+
+    @classmethod
+    def from_env(cls) -> "LLMScheduler":
+        return cls(
+            rpm=float(os.getenv("LLM_RPM", "600")),
+            tpm=float(os.getenv("LLM_TPM", "150000")),
+            max_queue_s={
+                "interactive": float(os.getenv("LLM_MAX_QUEUE_S_INTERACTIVE", "5")),
+                "batch": float(os.getenv("LLM_MAX_QUEUE_S_BATCH", "120")),
+            },
+            completion_tokens=int(os.getenv("LLM_EST_COMPLETION_TOKENS", "256")),
+            limiter=AIMDLimiter.from_env(),
+        )
+
+    def _ahead(self, lane: str) -> list:
+        # Interactive waits only behind interactive; batch waits behind everyone
+        lanes = LANES[: LANES.index(lane) + 1]
+        return [w for name in lanes for w in self._queues[name] if not w.fut.done()]
+
+    def predicted_wait(self, lane: str, tokens: int) -> float:
+        ahead = self._ahead(lane)
+        return max(
+            self.requests.time_until(len(ahead) + 1),
+            self.tokens.time_until(sum(w.tokens for w in ahead) + tokens),
+        )
+
+    def _head_lane(self) -> int:
+        """Index of the highest lane with a live waiter (len(LANES) if none)."""
+        for i, lane in enumerate(LANES):
+            if any(not w.fut.done() for w in self._queues[lane]):
+                return i
+        return len(LANES)
+
+    def _repump(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._pump()
+
+    def _pump(self) -> None:
+        self._timer = None
+        for lane in LANES:
+            q = self._queues[lane]
+            while q:
+                w = q[0]
+                if w.fut.done():
+                    q.popleft()
+                    continue
+                wait = max(
+                    self.requests.time_until(1), self.tokens.time_until(w.tokens)
+                )
+                if wait > 0:
+                    # Strict priority: nothing behind this head is admitted either
+                    loop = asyncio.get_running_loop()
+                    self._timer = loop.call_later(wait, self._pump)
+                    return
+                self.requests.take(1)
+                self.tokens.take(w.tokens)
+                q.popleft()
+                w.fut.set_result(None)
+
+    async def acquire(self, tokens: int, lane: Optional[str] = None) -> None:
+        lane = lane or _priority.get()
+        tokens = int(min(tokens, self.tokens.capacity))
+        wait = self.predicted_wait(lane, tokens)
+        if wait > self.max_queue_s[lane]:
+            self.shed[lane] += 1
+            raise Overloaded(wait, lane)
+
+        t0 = time.monotonic()
+        if wait == 0 and not self._ahead(lane):
+            self.requests.take(1)
+            self.tokens.take(tokens)
+        else:
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            head = self._head_lane()
+            self._queues[lane].append(_Waiter(fut, tokens))
+            # A timer armed for a batch head must not hold back a waiter that
+            # is ahead of it (higher lane) or can go sooner
+            if (
+                self._timer is None
+                or LANES.index(lane) < head
+                or loop.time() + wait < self._timer.when()
+            ):
+                self._repump()
+            try:
+                done, _ = await asyncio.wait({fut}, timeout=self.max_queue_s[lane])
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self.settle(tokens, 0)  # admitted but never used: give it back
+                fut.cancel()
+                raise
+            if not done:
+                fut.cancel()
+                self.shed[lane] += 1
+                raise Overloaded(self.predicted_wait(lane, tokens), lane)
+        self.admitted[lane] += 1
+        self.queue_seconds[lane] += time.monotonic() - t0
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Charge (or refund) the difference between estimated and reported tokens."""
+        self.tokens.take(actual - estimated)
+        if actual < estimated and any(self._queues.values()):
+            self._repump()  # the refund may admit the head sooner than armed
+
+    def wrap(self, model: Runnable) -> Runnable:
+        """Schedule every async call to model; the sync path is passed through."""
+
+        async def _acall(input: Any, config: RunnableConfig) -> Any:
+            text = input.to_string() if hasattr(input, "to_string") else str(input)
+            estimated = count_tokens(text) + self.completion_tokens
+            with timed("llm_queue"):
+                await self.acquire(estimated)
+                # Quota admitted; now wait for an in-flight slot from the AIMD limiter
+                admitted = await self.limiter.acquire()
+            if not admitted:
+                lane = _priority.get()
+                self.shed[lane] += 1
+                self.requests.take(-1)
+                self.settle(min(estimated, int(self.tokens.capacity)), 0)
+                raise Overloaded(self.limiter.baseline or 1.0, lane)
+            t0 = time.monotonic()
+            try:
+                with timed("llm_call"):
+                    msg = await model.ainvoke(input, config)
+            except BaseException as e:
+                self.limiter.release(time.monotonic() - t0, e)
+                raise
+            self.limiter.release(time.monotonic() - t0)
+            usage = getattr(msg, "usage_metadata", None)
+            if usage and usage.get("total_tokens"):
+                self.settle(
+                    min(estimated, int(self.tokens.capacity)), usage["total_tokens"]
+                )
+            return msg
+
+        def _call(input: Any, config: RunnableConfig) -> Any:
+            return model.invoke(input, config)
+
+        return RunnableLambda(_call, afunc=_acall, name="scheduled_llm")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": {
+                lane: sum(1 for w in q if not w.fut.done())
+                for lane, q in self._queues.items()
+            },
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+            "mean_queue_ms": {
+                lane: round(1000 * self.queue_seconds[lane] / n, 3)
+                for lane, n in self.admitted.items()
+                if n
+            },
+            "rpm_available": round(self.requests.level, 2),
+            "tpm_available": round(self.tokens.level, 2),
+            "concurrency": self.limiter.stats(),
+        }
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_scheduler() -> LLMScheduler:
+    """The process-wide scheduler shared by every model built with make_llm()."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler.from_env()
+        _register_gauges(_scheduler)
+    return _scheduler
+
+
+def _register_gauges(s: LLMScheduler) -> None:
+    REGISTRY.gauge(
+        "ragkit_llm_concurrency_limit",
+        "Current AIMD limit on in-flight LLM calls.",
+        lambda: {"": round(s.limiter.limit, 3)},
+    )
+    REGISTRY.gauge(
+        "ragkit_llm_in_flight",
+        "LLM calls currently running.",
+        lambda: {"": s.limiter.in_flight},
+    )
+    REGISTRY.gauge(
+        "ragkit_llm_concurrency_rejected_total",
+        "Calls rejected waiting for an AIMD slot.",
+        lambda: {"": s.limiter.rejected},
+    )
+    REGISTRY.gauge(
+        "ragkit_llm_shed_total",
+        "Calls shed by the scheduler, per priority lane.",
+        lambda: {f'lane="{lane}"': n for lane, n in s.shed.items()},
+    )
+
+
+def add_overload_handler(app: FastAPI) -> None:
+    @app.exception_handler(Overloaded)
+    async def _overloaded(request: Request, exc: Overloaded) -> JSONResponse:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": str(exc)},
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        )
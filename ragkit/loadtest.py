@@ -0,0 +1,235 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: How do you plan capacity for an LLM-backed API without spending quota?
+A: Run the real server code with stand-in models (ragkit.fakes): the fake chat
+   model has a realistic time to first token, token rate and 429 rate; embeddings
+   are deterministic and local; HR data is read in-process. Then drive /ask at
+   increasing arrival rates and watch where latency and errors bend upwards.
+
+Q: Why open-loop arrivals?
+A: A closed loop (N clients that each wait for their reply) slows down when the
+   server slows down, which hides overload. Real users keep arriving. Requests
+   here are sent on a fixed schedule (Poisson or uniform) whether or not earlier
+   ones finished, and latency is measured from the scheduled send time, so queueing
+   shows up in the numbers instead of being absorbed by the generator.
+
+Q: What is reported?
+A: Per arrival rate: p50/p95/p99 latency of successful replies, throughput,
+   error rate by status code, degraded replies, and event-loop lag (how late a
+   10 ms timer fires in the server's loop; high lag means blocking work on the loop).
+
+Usage (no network needed; the server runs in-process):
+    python -m ragkit.loadtest --server 21 --rates 5,10,20 --duration 20
+    FAKE_LLM_TTFT_MS=800 FAKE_LLM_ERROR_RATE=0.02 python -m ragkit.loadtest --server 20
+Against a running server started with FAKE_MODELS=1 (no loop-lag numbers):
+    python -m ragkit.loadtest --server 21 --url http://localhost:8021
+
+SAMPLE CODE:
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+SERVERS: Dict[str, Dict[str, Any]] = {
+    "20": {
+        "file": "20_overtime_rag_api.py",
+        "questions": [
+            "What overtime multiplier do I get?",
+            "How is overtime paid after two years of service?",
+            "Do I get 1.5x overtime?",
+        ],
+    },
+    "21": {
+        "file": "21_hr_policy_server.py",
+        "questions": [
+            "Who is my manager?",
+            "What is my PTO balance?",
+            "What is the overtime policy?",
+            "What overtime multiplier applies to me?",
+            "How does PTO accrue and what is my balance?",
+        ],
+    },
+    "22": {
+        "file": "22_auth_server.py",
+        "questions": [
+            "What is my overtime multiplier?",
+            "What does the policy say about overtime?",
+            "How many years of service do I have?",
+        ],
+    },
+}
+USERS = ["alice", "bob", "carol", "dave"]
+
+
+@dataclass
+class Sample:
+    latency: float
+    status: int
+    degraded: bool = False
+
+
+def load_app(server: str):
+    """Import a numbered server module with the stand-in models switched on."""
+    os.environ.setdefault("FAKE_MODELS", "1")
+    sys.path.insert(0, str(REPO_ROOT))
+    os.chdir(REPO_ROOT)
+    path = REPO_ROOT / SERVERS[server]["file"]
+    spec = importlib.util.spec_from_file_location(f"server{server}", str(path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module.app
+
+
+async def auth_headers(client: httpx.AsyncClient, server: str) -> Dict[str, Dict]:
+    if server != "22":
+        return {u: {} for u in USERS}
+    headers = {}
+    for user in USERS:
+        resp = await client.post(
+            "/auth/dev_login", json={"user": user, "roles": ["employee"]}
+        )
+        resp.raise_for_status()
+        headers[user] = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    return headers
+
+
+async def _lag_probe(samples: List[float], stop: asyncio.Event) -> None:
+    interval = 0.01
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - t0 - interval)
+
+
+async def _one(
+    client: httpx.AsyncClient,
+    scheduled: float,
+    payload: Dict[str, str],
+    headers: Dict[str, str],
+) -> Sample:
+    try:
+        resp = await client.post("/ask", json=payload, headers=headers)
+    except httpx.HTTPError:
+        return Sample(time.perf_counter() - scheduled, 0)
+    degraded = resp.status_code == 200 and bool(resp.json().get("degraded"))
+    return Sample(time.perf_counter() - scheduled, resp.status_code, degraded)
+
+
+def _pct(values: List[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)) * 1000, 1) if values else None
+
+
+async def run_rate(
+    client: httpx.AsyncClient,
+    make_request: Callable[[], tuple],
+    rate: float,
+    duration: float,
+    arrival: str = "poisson",
+    measure_lag: bool = True,
+) -> Dict[str, Any]:
+    """Send requests open-loop at rate/s for duration seconds and summarize."""
+    lag: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_lag_probe(lag, stop)) if measure_lag else None
+
+    tasks: List[asyncio.Task] = []
+    start = time.perf_counter()
+    offset = 0.0
+    while offset < duration:
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        payload, headers = make_request()
+        tasks.append(
+            asyncio.create_task(_one(client, start + offset, payload, headers))
+        )
+        offset += random.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+    samples: List[Sample] = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    if probe is not None:
+        await probe
+
+    ok = [s.latency for s in samples if s.status == 200]
+    errors: Dict[str, int] = {}
+    for s in samples:
+        if s.status != 200:
+            errors[str(s.status)] = errors.get(str(s.status), 0) + 1
+    return {
+        "rate": rate,
+        "sent": len(samples),
+        "ok": len(ok),
+        "errors": errors,
+        "error_rate": round(1 - len(ok) / len(samples), 4) if samples else 0.0,
+        "degraded": sum(1 for s in samples if s.degraded),
+        "throughput_rps": round(len(ok) / elapsed, 2),
+        "latency_ms": {
+            "p50": _pct(ok, 50),
+            "p95": _pct(ok, 95),
+            "p99": _pct(ok, 99),
+            "max": _pct(ok, 100),
+        },
+        "loop_lag_ms": (
+            {"p50": _pct(lag, 50), "p99": _pct(lag, 99), "max": _pct(lag, 100)}
+            if measure_lag
+            else None
+        ),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    random.seed(args.seed)
+    questions = SERVERS[args.server]["questions"]
+    if args.url:
+        transport = None
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        transport = httpx.ASGITransport(app=load_app(args.server))
+        client = httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest", timeout=args.timeout
+        )
+    async with client:
+        headers = await auth_headers(client, args.server)
+
+        def make_request() -> tuple:
+            user = random.choice(USERS)
+            payload = {"user": user, "question": random.choice(questions)}
+            return payload, headers[user]
+
+        for rate in [float(r) for r in args.rates.split(",")]:
+            report = await run_rate(
+                client,
+                make_request,
+                rate,
+                args.duration,
+                arrival=args.arrival,
+                measure_lag=transport is not None,
+            )
+            print(json.dumps(report), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop load test for /ask")
+    parser.add_argument("--server", choices=sorted(SERVERS), default="21")
+    parser.add_argument("--rates", default="5,10,20", help="requests/s, comma list")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds/rate")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson")
+    parser.add_argument("--url", help="drive a running server instead of in-process")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
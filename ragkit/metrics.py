@@ -0,0 +1,241 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: How do you find out where a slow /ask spent its time?
+A: Time every stage (retrieval, HR lookup, prompt rendering, LLM queueing, the
+   LLM call itself, output parsing) and keep two views of the numbers:
+   - per request: a Server-Timing response header, which browsers' dev tools and
+     our Streamlit debug panel can show directly;
+   - in aggregate: histograms per endpoint, stage and intent, exposed on /metrics
+     in the Prometheus text format, so p95 per stage can be graphed and alerted on.
+
+Q: How do stage timings reach the response header?
+A: A small ASGI middleware puts a RequestTimings object in a contextvar for the
+   duration of the request. timed(stage) and the LCEL callback append to it from
+   anywhere below the handler (including tasks it spawns, which copy the context).
+   When the response starts, the middleware writes the header and feeds the
+   histograms, labelled with the intent the handler set.
+
+Q: How is the overhead kept small?
+A: Recording a span is a perf_counter() call and a list append; histograms are
+   fixed buckets updated with one bisect. That is a few tens of microseconds per
+   request, under 1% even for a 5 ms templated answer and far less for anything
+   that calls the LLM. Run this module to measure it: python -m ragkit.metrics
+
+SAMPLE CODE:
+"""
+
+import bisect
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from langchain_core.callbacks import BaseCallbackHandler
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._stages: Dict[Tuple[str, str, str], Histogram] = {}
+        self._gauges: List[Tuple[str, str, Callable[[], Dict[str, float]]]] = []
+
+    def observe(self, endpoint: str, stage: str, intent: str, seconds: float) -> None:
+        key = (endpoint, stage, intent)
+        hist = self._stages.get(key)
+        if hist is None:
+            hist = self._stages[key] = Histogram()
+        hist.observe(seconds)
+
+    def gauge(self, name: str, help: str, fn: Callable[[], Dict[str, float]]) -> None:
+        """Register a value read at scrape time; fn maps a label string to a value."""
+        self._gauges.append((name, help, fn))
+
+    def render(self) -> str:
+        name = "ragkit_stage_seconds"
+        lines = [
+            f"# HELP {name} Time spent per request stage.",
+            f"# TYPE {name} histogram",
+        ]
+        for (endpoint, stage, intent), h in sorted(self._stages.items()):
+            labels = f'endpoint="{endpoint}",stage="{stage}",intent="{intent}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h.counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+        for gauge, help, fn in self._gauges:
+            lines.append(f"# HELP {gauge} {help}")
+            lines.append(f"# TYPE {gauge} gauge")
+            for labels, value in fn().items():
+                series = f"{gauge}{{{labels}}}" if labels else gauge
+                lines.append(f"{series} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class RequestTimings:
+    __slots__ = ("endpoint", "intent", "spans")
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self.intent = ""
+        self.spans: List[Tuple[str, float]] = []
+
+    def header(self, total: float) -> str:
+        # Spans of the same stage (e.g. one prompt per batch item) are summed
+        merged: Dict[str, float] = {}
+        for stage, seconds in self.spans:
+            merged[stage] = merged.get(stage, 0.0) + seconds
+        merged["total"] = total
+        return ", ".join(f"{s};dur={1000 * d:.1f}" for s, d in merged.items())
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "ragkit_timings", default=None
+)
+
+
+def record(stage: str, seconds: float) -> None:
+    timings = _current.get()
+    if timings is None:
+        REGISTRY.observe("", stage, "", seconds)
+    else:
+        timings.spans.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - t0)
+
+
+def set_intent(intent: str) -> None:
+    """Label this request's stage histograms with the routed intent."""
+    timings = _current.get()
+    if timings is not None:
+        timings.intent = intent
+
+
+class StageTimingCallback(BaseCallbackHandler):
+    """Times the prompt and parser steps of LCEL chains (the LLM is timed itself)."""
+
+    run_inline = True
+    STAGES = {"prompt": "prompt", "parser": "parse"}
+
+    def __init__(self) -> None:
+        self._starts: Dict[UUID, Tuple[str, float]] = {}
+
+    def on_chain_start(
+        self, serialized: Any, inputs: Any, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        stage = self.STAGES.get(kwargs.get("run_type") or "")
+        if stage is not None:
+            self._starts[run_id] = (stage, time.perf_counter())
+
+    def _finish(self, run_id: UUID) -> None:
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            record(started[0], time.perf_counter() - started[1])
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._finish(run_id)
+
+
+STAGE_TIMER = StageTimingCallback()
+
+
+class TimingMiddleware:
+    """Collects stage spans per request; adds Server-Timing and feeds REGISTRY."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings(scope["path"])
+        token = _current.set(timings)
+        t0 = time.perf_counter()
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - t0
+                route = scope.get("route")
+                timings.endpoint = getattr(route, "path", "unmatched")
+                for stage, seconds in timings.spans:
+                    REGISTRY.observe(timings.endpoint, stage, timings.intent, seconds)
+                REGISTRY.observe(timings.endpoint, "total", timings.intent, total)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header(total).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+
+def install_metrics(app: FastAPI) -> None:
+    """Add the timing middleware and a Prometheus /metrics endpoint."""
+    app.add_middleware(TimingMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(
+            REGISTRY.render(), media_type="text/plain; version=0.0.4"
+        )
+
+
+if __name__ == "__main__":
+    # Cost of the instrumentation for a request with a typical number of spans
+    n = 20000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        timings = RequestTimings("/ask")
+        token = _current.set(timings)
+        for stage in ("retrieval", "hr", "prompt", "llm_queue", "llm_call", "parse"):
+            with timed(stage):
+                pass
+        for stage, seconds in timings.spans:
+            REGISTRY.observe("/ask", stage, "hr_query", seconds)
+        timings.header(0.5)
+        _current.reset(token)
+    per_request_us = (time.perf_counter() - t0) / n * 1e6
+    print(f"instrumentation: {per_request_us:.1f} us/request")
+    for request_ms in (5, 50, 1000):
+        print(
+            f"  {request_ms:>5} ms request: {per_request_us / (request_ms * 10):.3f}%"
+        )
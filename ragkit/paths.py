@@ -0,0 +1,23 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Where do the files the servers write at runtime go?
+A: Traces, usage rollups, routing logs and caches belong to a deployment, not
+   to the source tree. Each keeps its own variable (TRACE_FILE, USAGE_DB, ...)
+   for an explicit location; unset, it goes under RAGKIT_DATA_DIR, by default
+   data/ at the repository root, which is created on first use and gitignored.
+
+SAMPLE CODE:
+"""
+
+import os
+from pathlib import Path
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def data_path(name: str) -> str:
+    """Path of a runtime file under RAGKIT_DATA_DIR, creating the directory."""
+    base = Path(os.getenv("RAGKIT_DATA_DIR", str(DEFAULT_DATA_DIR)))
+    base.mkdir(parents=True, exist_ok=True)
+    return str(base / name)
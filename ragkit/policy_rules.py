@@ -0,0 +1,365 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: What was wrong with the overtime tiers before?
+A: They were written into the code three times (pick_multiplier in 20 and 21,
+   compute_overtime in 22_tools) and once more in the bulk engine, while the
+   policy PDF was the actual source. Editing the policy changed what the LLM
+   read but not what the code computed. And "what's my rate?" went through
+   embedding, retrieval and an LLM call to restate a number.
+
+Q: How are the rules extracted?
+A: Once, at index time, from the same page text that gets embedded. Each
+   sentence that names a multiplier ("1.25x") and overtime is parsed for a
+   years-of-service condition: "exactly 2 years" is [2, 2], "more than 2 years"
+   is (2, inf), "at least 3 years" or "3+ years" is [3, inf), "less than 1 year"
+   is [0, 1), "between 3 and 5 years" is [3, 5], and a bare "1 year" is the
+   service year [1, 2). A policy in which no tier is found fails the build
+   instead of quietly paying everyone the base rate.
+
+Q: How is the lookup compiled?
+A: The interval endpoints are sorted into one array. Every value of years falls
+   either exactly on an endpoint or in the open gap between two, so the table
+   keeps one multiplier per endpoint and one per gap, each decided once at
+   compile time (first matching sentence wins; no match is the base rate 1.0).
+   A lookup is one bisect plus one comparison, and np.searchsorted does the
+   same for a whole column.
+
+Q: How are rules versioned and reloaded?
+A: The version is a digest of the compiled intervals, so it changes exactly
+   when the rules do. The table is written next to the index (policy_rules.json)
+   whenever the index is rebuilt from the PDF; servers hold a RulesFile that
+   checks the file's mtime at most every few seconds and swaps in the new table,
+   so every worker follows a rebuild.
+
+Q: How fast is a rule answer?
+A: About 0.2 us for a scalar lookup (the old if-chain was 0.1 us), 30 ns per
+   row for a column, and a few us to read the tenure out of a question and
+   render the answer, against hundreds of milliseconds for embedding,
+   retrieval and an LLM call.
+   Run this module to measure: python -m ragkit.policy_rules
+
+SAMPLE CODE:
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ragkit.shared_index import file_lock
+
+logger = logging.getLogger(__name__)
+
+RULES_FILE = "policy_rules.json"
+BASE_MULTIPLIER = 1.0
+
+_NUM = r"(\d+(?:\.\d+)?)"
+_MULTIPLIER = re.compile(_NUM + r"\s*x\b")
+_YEARS = re.compile(
+    r"(exactly|more than|over|at least|less than|under|fewer than|between)?\s*"
+    + _NUM
+    + r"(?:\s*(?:and|to|-)\s*"
+    + _NUM
+    + r")?\s*(\+)?\s*years?\b"
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_WORD_NUMBERS = {
+    w: n
+    for n, w in enumerate(
+        "zero one two three four five six seven eight nine ten eleven twelve "
+        "thirteen fourteen fifteen sixteen seventeen eighteen nineteen "
+        "twenty".split()
+    )
+}
+_WORD_NUMBERS.update({"a": 1, "an": 1, "thirty": 30, "forty": 40})
+_TENURE = re.compile(
+    r"(?:\b(?P<qual>more than|over|less than|under|fewer than|at least|"
+    r"between|up to|several|a few|few|many|some)\s+)?"
+    r"(?:\b(?P<num>\d+(?:\.\d+)?|"
+    + "|".join(sorted(_WORD_NUMBERS, key=len, reverse=True))
+    + r")(?P<half>\s+and\s+a\s+half)?[\s-]*)?"
+    r"\b(?P<unit>years?|yrs?|months?)\b"
+)
+# "my years of service": the asker's own tenure, not a hypothetical one
+_OWN_TENURE = re.compile(r"\b(?:my|your|our)\s*$")
+
+
+@dataclass(frozen=True)
+class Tier:
+    """Multiplier for years in [lo, hi] with open or closed ends (hi None: no end)."""
+
+    lo: float
+    lo_closed: bool
+    hi: Optional[float]
+    hi_closed: bool
+    multiplier: float
+    text: str = ""
+
+    def contains(self, years: float) -> bool:
+        if years < self.lo or (years == self.lo and not self.lo_closed):
+            return False
+        if self.hi is None:
+            return True
+        return years < self.hi or (years == self.hi and self.hi_closed)
+
+
+def parse_tier(sentence: str) -> Optional[Tier]:
+    """The tier stated by one policy sentence, or None if it states none."""
+    s = " ".join(sentence.lower().split())
+    mult = _MULTIPLIER.search(s)
+    years = _YEARS.search(s)
+    if "overtime" not in s or mult is None or years is None:
+        return None
+    qualifier, a, b, plus = years.groups()
+    n, m = float(a), float(mult.group(1))
+    text = " ".join(sentence.split()).lstrip("-* ")
+    if qualifier == "exactly":
+        return Tier(n, True, n, True, m, text)
+    if qualifier in ("more than", "over"):
+        return Tier(n, False, None, False, m, text)
+    if qualifier == "at least" or plus:
+        return Tier(n, True, None, False, m, text)
+    if qualifier in ("less than", "under", "fewer than"):
+        return Tier(0.0, True, n, False, m, text)
+    if qualifier == "between" and b is not None:
+        return Tier(n, True, float(b), True, m, text)
+    # A bare "1 year of service" is that service year
+    return Tier(n, True, n + 1, False, m, text)
+
+
+class PolicyRules:
+    """Overtime tiers compiled into an endpoint/gap lookup table."""
+
+    def __init__(self, tiers: Sequence[Tier], source: str = "") -> None:
+        self.tiers = tuple(tiers)
+        self.source = source
+        ends = {t.lo for t in self.tiers}
+        ends.update(t.hi for t in self.tiers if t.hi is not None)
+        self._points = sorted(ends)
+        n = len(self._points)
+        # Every value is on an endpoint or in the open gap before endpoint i
+        gaps = []
+        for i in range(n + 1):
+            if n == 0:
+                gaps.append(0.0)
+            elif i == 0:
+                gaps.append(self._points[0] - 1)
+            elif i == n:
+                gaps.append(self._points[-1] + 1)
+            else:
+                gaps.append((self._points[i - 1] + self._points[i]) / 2)
+        self._point_tier = [self._first(y) for y in self._points]
+        self._gap_tier = [self._first(y) for y in gaps]
+        self._point_mult = np.array([self._mult(i) for i in self._point_tier])
+        self._gap_mult = np.array([self._mult(i) for i in self._gap_tier])
+        self._points_np = np.array(self._points, dtype=np.float64)
+        digest = hashlib.blake2b(
+            json.dumps([asdict(t) for t in self.tiers], sort_keys=True).encode(),
+            digest_size=6,
+        )
+        self.version = digest.hexdigest()
+
+    def _first(self, years: float) -> int:
+        return next((i for i, t in enumerate(self.tiers) if t.contains(years)), -1)
+
+    def _mult(self, tier: int) -> float:
+        return self.tiers[tier].multiplier if tier >= 0 else BASE_MULTIPLIER
+
+    @classmethod
+    def compile(cls, text: str, source: str = "") -> "PolicyRules":
+        """Tiers from policy text, in document order; ValueError if there are none."""
+        tiers = [t for t in map(parse_tier, _SENTENCE_END.split(text)) if t]
+        if not tiers:
+            raise ValueError(f"no overtime tiers found in {source or 'policy text'}")
+        return cls(tiers, source)
+
+    def _index(self, years: float) -> int:
+        i = bisect.bisect_left(self._points, years)
+        if i < len(self._points) and self._points[i] == years:
+            return self._point_tier[i]
+        return self._gap_tier[i]
+
+    def tier(self, years: float) -> Optional[Tier]:
+        i = self._index(years)
+        return self.tiers[i] if i >= 0 else None
+
+    def multiplier(self, years: float) -> float:
+        return self._mult(self._index(years))
+
+    def multipliers(self, years: np.ndarray) -> np.ndarray:
+        """multiplier() for a whole column."""
+        y = np.asarray(years, dtype=np.float64)
+        if not len(self._points):
+            return np.full(y.shape, BASE_MULTIPLIER)
+        idx = np.searchsorted(self._points_np, y, side="left")
+        at = np.minimum(idx, len(self._points) - 1)
+        return np.where(
+            self._points_np[at] == y, self._point_mult[at], self._gap_mult[idx]
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "version": self.version,
+                "source": self.source,
+                "tiers": [asdict(t) for t in self.tiers],
+            },
+            indent=2,
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "PolicyRules":
+        doc = json.loads(data)
+        return cls([Tier(**t) for t in doc["tiers"]], doc.get("source", ""))
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write atomically: a reader sees the old table or the new one."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(self.to_json())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "PolicyRules":
+        return cls.from_json(Path(path).read_text())
+
+
+def rules_path(persist_dir: str) -> Path:
+    return Path(persist_dir) / RULES_FILE
+
+
+class RulesFile:
+    """The compiled rules of an index, swapped when a rebuild rewrites the file."""
+
+    def __init__(self, path: Union[str, Path], reload_s: float = 2.0) -> None:
+        self.path = Path(path)
+        self.reload_s = reload_s
+        self._lock = threading.Lock()
+        self._mtime = self.path.stat().st_mtime
+        self._checked = time.monotonic()
+        self._rules = PolicyRules.load(self.path)
+        self.reloads = 0
+
+    @classmethod
+    def ensure(cls, persist_dir: str, build: Callable[[], PolicyRules]) -> "RulesFile":
+        """Open the index's rules; an index built before rules existed gets them now."""
+        path = rules_path(persist_dir)
+        with file_lock(f"{path}.lock"):
+            if not path.exists():
+                build().save(path)
+        return cls(path, float(os.getenv("POLICY_RULES_RELOAD_S", "2")))
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self.reload_s or not self._lock.acquire(False):
+            return
+        try:
+            self._checked = now
+            mtime = self.path.stat().st_mtime
+            if mtime != self._mtime:
+                self._mtime = mtime
+                self._rules = PolicyRules.load(self.path)
+                self.reloads += 1
+                logger.info(
+                    "reloaded policy rules %s from %s", self._rules.version, self.path
+                )
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("keeping policy rules %s: %s", self._rules.version, e)
+        finally:
+            self._lock.release()
+
+    @property
+    def rules(self) -> PolicyRules:
+        self._maybe_reload()
+        return self._rules
+
+
+def parse_tenure(question: str) -> Tuple[bool, Optional[float]]:
+    """(names a tenure, years) for a question; years None if it cannot be read.
+
+    "with 3 years", "after two years", "18 months", "two and a half years" are
+    read; "my years of service" refers to the asker and names nothing; ranges
+    ("more than 2 years") and vague amounts ("a few years") name a tenure that
+    cannot be read, and so do two different ones.
+    """
+    q = " ".join(question.lower().split())
+    found: List[float] = []
+    named = False
+    for m in _TENURE.finditer(q):
+        num, half, unit = m.group("num"), m.group("half"), m.group("unit")
+        if num is None and _OWN_TENURE.search(q, 0, m.start()):
+            continue
+        named = True
+        if num is None or m.group("qual"):
+            return True, None
+        value = float(_WORD_NUMBERS.get(num, num)) + (0.5 if half else 0.0)
+        found.append(value / 12 if unit.startswith("month") else value)
+    if len(set(found)) > 1:
+        return True, None
+    return named, (found[0] if found else None)
+
+
+def pages_text(pages: Sequence[object]) -> str:
+    """Text of loaded document pages (anything with page_content)."""
+    return "\n".join(getattr(p, "page_content", "") for p in pages)
+
+
+if __name__ == "__main__":
+    policy = (
+        "Company Overtime Policy\n"
+        "- Employees with 1 year of service receive 1.25x overtime pay.\n"
+        "- Employees with exactly 2 years of service receive 1.5x overtime pay.\n"
+        "- Employees with more than 2 years of service receive 1.7x overtime pay.\n"
+    )
+
+    def pick_multiplier(years: float) -> float:
+        # The hard-coded tiers the compiled table replaces
+        if years > 2:
+            return 1.7
+        if years == 2:
+            return 1.5
+        if years >= 1:
+            return 1.25
+        return 1.0
+
+    def bench(label: str, fn: Callable[[], object], n: int) -> None:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        print(f"{label:<40} {(time.perf_counter() - t0) / n * 1e6:8.3f} us")
+
+    rules = PolicyRules.compile(policy, "sample")
+    print(f"version {rules.version}: {len(rules.tiers)} tiers")
+    probe: List[Tuple[float, float]] = [
+        (y, pick_multiplier(y)) for y in (0, 0.5, 1, 1.5, 1.99, 2, 2.01, 3, 40)
+    ]
+    assert all(rules.multiplier(y) == m for y, m in probe), probe
+    years = np.random.default_rng(0).uniform(0, 10, 1_000_000).round(1)
+    assert (rules.multipliers(years) == [pick_multiplier(y) for y in years]).all()
+
+    bench("compile (3 sentences)", lambda: PolicyRules.compile(policy), 2000)
+    bench("multiplier(years)", lambda: rules.multiplier(2.5), 200_000)
+    bench("hard-coded pick_multiplier", lambda: pick_multiplier(2.5), 200_000)
+    bench(
+        "parse_tenure + tier",
+        lambda: rules.tier(parse_tenure("with 3 years")[1] or 0.0),
+        50_000,
+    )
+    t0 = time.perf_counter()
+    rules.multipliers(years)
+    print(
+        f"{'multipliers (1M rows)':<40} "
+        f"{(time.perf_counter() - t0) / len(years) * 1e9:8.3f} ns/row"
+    )
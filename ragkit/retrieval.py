@@ -0,0 +1,161 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why query the vector store with many embeddings at once?
+A: Chroma's collection.query() accepts a list of query embeddings and searches them
+   together. One call for a batch of questions avoids per-question overhead (Python
+   round trips, locking, result conversion) compared to calling the retriever N times.
+
+Q: Why keep the distances and embeddings around?
+A: Later stages (adaptive k, MMR, context packing) need the score profile and the
+   chunk vectors. Returning them alongside the Document avoids a second lookup.
+
+Q: What is adaptive-k retrieval?
+A: Instead of always keeping a fixed k, fetch max_k candidates with scores and cut
+   where relevance drops off: at the largest gap between consecutive scores, or
+   where a score falls below a fraction of the best one, within [min_k, max_k].
+   Simple questions keep one or two chunks; broad ones keep more.
+
+Q: Where do I see the chosen k and the scores while tuning?
+A: Each cut is logged as one JSON line on the "ragkit.retrieval" logger.
+   Nothing configures ragkit loggers under uvicorn, so RETRIEVAL_LOG=1 gives
+   that logger its own stderr handler at INFO; otherwise it follows whatever
+   logging the application sets up.
+
+SAMPLE CODE:
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+if os.getenv("RETRIEVAL_LOG") == "1":
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(levelname)s:     %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # one line per cut even if the root logger is set up
+
+
+@dataclass
+class Candidate:
+    doc: Document
+    distance: float
+    embedding: Optional[List[float]] = None
+
+
+def query_candidates(
+    vs,
+    query_embeddings: Sequence[Sequence[float]],
+    k: int,
+    include_embeddings: bool = False,
+) -> List[List[Candidate]]:
+    """Run one multi-query search; returns one candidate list per query embedding."""
+    if not query_embeddings:
+        return []
+    if hasattr(vs, "query_candidates"):
+        # Memory-mapped snapshot (ragkit.shared_index) searches itself
+        return vs.query_candidates(query_embeddings, k, include_embeddings)
+    include = ["documents", "metadatas", "distances"]
+    if include_embeddings:
+        include.append("embeddings")
+    res = vs._collection.query(
+        query_embeddings=[list(e) for e in query_embeddings],
+        n_results=k,
+        include=include,
+    )
+    out: List[List[Candidate]] = []
+    for qi in range(len(query_embeddings)):
+        texts = res["documents"][qi]
+        metas = res["metadatas"][qi]
+        dists = res["distances"][qi]
+        embs = res["embeddings"][qi] if include_embeddings else [None] * len(texts)
+        out.append(
+            [
+                Candidate(
+                    doc=Document(page_content=t, metadata=m or {}),
+                    distance=float(d),
+                    embedding=list(e) if e is not None else None,
+                )
+                for t, m, d, e in zip(texts, metas, dists, embs)
+            ]
+        )
+    return out
+
+
+@dataclass
+class AdaptiveK:
+    min_k: int = 1
+    max_k: int = 8
+    rel_threshold: float = 0.8
+    min_gap: float = 0.05
+    enabled: bool = True
+
+    @classmethod
+    def from_env(cls, default_k: int) -> "AdaptiveK":
+        """RETRIEVAL_MODE=fixed keeps exactly default_k; otherwise ADAPTIVE_K_* tune the cut."""
+        if os.getenv("RETRIEVAL_MODE", "adaptive") == "fixed":
+            return cls(min_k=default_k, max_k=default_k, enabled=False)
+        return cls(
+            min_k=int(os.getenv("ADAPTIVE_K_MIN", "1")),
+            max_k=int(os.getenv("ADAPTIVE_K_MAX", str(max(default_k, 8)))),
+            rel_threshold=float(os.getenv("ADAPTIVE_K_REL", "0.8")),
+            min_gap=float(os.getenv("ADAPTIVE_K_MIN_GAP", "0.05")),
+        )
+
+
+def relevance_scores(vs, cands: Sequence[Candidate]) -> List[float]:
+    # Same distance -> [0, 1] relevance mapping Chroma uses for *_with_relevance_scores
+    fn = vs._select_relevance_score_fn()
+    return [float(fn(c.distance)) for c in cands]
+
+
+def adaptive_cut(scores: Sequence[float], policy: AdaptiveK) -> int:
+    """Number of candidates to keep; scores must be sorted best first."""
+    n = len(scores)
+    if n == 0:
+        return 0
+    lo, hi = min(policy.min_k, n), min(policy.max_k, n)
+    if not policy.enabled or lo >= hi:
+        return hi
+
+    k = hi
+    # Largest drop between consecutive scores in the allowed window
+    gaps = [scores[i] - scores[i + 1] for i in range(lo - 1, hi - 1)]
+    if gaps:
+        best = max(range(len(gaps)), key=gaps.__getitem__)
+        if gaps[best] >= policy.min_gap:
+            k = lo + best
+    # Anything far below the best match is noise
+    if scores[0] > 0:
+        floor = policy.rel_threshold * scores[0]
+        within = sum(1 for s in scores[:k] if s >= floor)
+        k = min(k, max(within, lo))
+    return k
+
+
+def select_candidates(
+    vs, cands: Sequence[Candidate], policy: AdaptiveK, label: str = ""
+) -> List[Candidate]:
+    """Apply the adaptive-k cut and log the chosen k with the score profile."""
+    scores = relevance_scores(vs, cands)
+    k = adaptive_cut(scores, policy)
+    logger.info(
+        "retrieval %s",
+        json.dumps(
+            {
+                "label": label,
+                "k": k,
+                "fetched": len(cands),
+                "adaptive": policy.enabled,
+                "scores": [round(s, 4) for s in scores],
+            }
+        ),
+    )
+    return list(cands[:k])
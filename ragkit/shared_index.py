@@ -0,0 +1,156 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: What goes wrong with `uvicorn --workers 8` and an in-process vector index?
+A: Every worker imports the app module and builds or loads the index itself. On a
+   cold start eight processes race to embed and write the same persist directory,
+   and once running there are eight private copies of every vector in RAM.
+
+Q: How is the index built only once?
+A: Building and loading happen under an exclusive file lock (fcntl.flock) next to
+   the persist directory. The first process builds the index and writes a
+   snapshot; everyone else blocks on the lock, then finds the snapshot and only
+   opens it.
+
+Q: How do workers share the vectors?
+A: The snapshot stores the vectors as a float32 .npy file, and workers open it with
+   np.load(mmap_mode="r"). The pages live once in the OS page cache and are mapped
+   read-only into every worker, so adding workers does not add copies of the
+   vectors. Only the chunk texts and metadata (small) are loaded per worker.
+
+Q: How is the snapshot searched?
+A: Brute force: one matrix product against the mapped vectors, then argpartition
+   for the top k. It returns the same Candidate lists and relevance mapping as the
+   Chroma path, so adaptive-k, MMR and context packing work unchanged.
+
+SAMPLE CODE:
+"""
+
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from ragkit.retrieval import Candidate
+
+SNAPSHOT_DIR = "snapshot"
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Exclusive inter-process lock held for the duration of the block."""
+    with open(path, "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _space(vs: Any) -> str:
+    try:
+        config = vs._collection.configuration
+        for section in ("hnsw", "spann"):
+            if config.get(section) and config[section].get("space"):
+                return config[section]["space"]
+    except Exception:
+        pass
+    return "l2"
+
+
+def export_snapshot(vs: Any, snapshot_dir: Path) -> None:
+    """Write a Chroma collection's vectors, texts and metadata as a read-only snapshot."""
+    data = vs._collection.get(include=["embeddings", "documents", "metadatas"])
+    vectors = np.asarray(data["embeddings"], dtype=np.float32)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    np.save(snapshot_dir / "vectors.npy", vectors)
+    np.save(snapshot_dir / "sq_norms.npy", np.einsum("ij,ij->i", vectors, vectors))
+    docs = [
+        {"text": t, "metadata": m or {}}
+        for t, m in zip(data["documents"], data["metadatas"])
+    ]
+    (snapshot_dir / "docs.json").write_text(json.dumps(docs))
+    # Written last: a snapshot without a manifest is incomplete and gets rebuilt
+    manifest = {"count": len(docs), "dim": int(vectors.shape[1]), "space": _space(vs)}
+    (snapshot_dir / "manifest.json").write_text(json.dumps(manifest))
+
+
+class MmapIndex:
+    """Read-only index over a snapshot whose vectors are memory-mapped."""
+
+    def __init__(self, snapshot_dir: Path, embeddings: Any) -> None:
+        self.embeddings = embeddings
+        manifest = json.loads((snapshot_dir / "manifest.json").read_text())
+        self.space = manifest["space"]
+        self._vectors = np.load(snapshot_dir / "vectors.npy", mmap_mode="r")
+        self._sq_norms = np.load(snapshot_dir / "sq_norms.npy", mmap_mode="r")
+        self._docs = json.loads((snapshot_dir / "docs.json").read_text())
+
+    def query_candidates(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        k: int,
+        include_embeddings: bool = False,
+    ) -> List[List[Candidate]]:
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        dots = q @ self._vectors.T
+        # Same distances Chroma reports for each space
+        if self.space == "cosine":
+            norms = np.sqrt(self._sq_norms) * np.linalg.norm(q, axis=1)[:, None]
+            dist = 1.0 - dots / (norms + 1e-12)
+        elif self.space == "ip":
+            dist = 1.0 - dots
+        else:
+            dist = np.einsum("ij,ij->i", q, q)[:, None] - 2 * dots + self._sq_norms
+        k = min(k, dist.shape[1])
+        out: List[List[Candidate]] = []
+        for row in dist:
+            top = np.argpartition(row, k - 1)[:k] if k else np.array([], dtype=int)
+            top = top[np.argsort(row[top])]
+            out.append(
+                [
+                    Candidate(
+                        doc=Document(
+                            page_content=self._docs[i]["text"],
+                            metadata=dict(self._docs[i]["metadata"]),
+                        ),
+                        distance=float(row[i]),
+                        embedding=(
+                            self._vectors[i].tolist() if include_embeddings else None
+                        ),
+                    )
+                    for i in top
+                ]
+            )
+        return out
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        if self.space == "cosine":
+            return VectorStore._cosine_relevance_score_fn
+        if self.space == "ip":
+            return VectorStore._max_inner_product_relevance_score_fn
+        return VectorStore._euclidean_relevance_score_fn
+
+
+def load_shared_index(
+    persist_dir: str, embeddings: Any, build: Callable[[], Any]
+) -> MmapIndex:
+    """Build (once, under a lock) and snapshot the index, then map it read-only."""
+    snapshot_dir = Path(persist_dir) / SNAPSHOT_DIR
+    with file_lock(f"{persist_dir}.lock"):
+        if not (snapshot_dir / "manifest.json").exists():
+            export_snapshot(build(), snapshot_dir)
+    return MmapIndex(snapshot_dir, embeddings)
+
+
+def shared_index_enabled() -> bool:
+    """SHARED_INDEX=1, or more than one worker via WEB_CONCURRENCY."""
+    return (
+        os.getenv("SHARED_INDEX") == "1" or int(os.getenv("WEB_CONCURRENCY", "1")) > 1
+    )
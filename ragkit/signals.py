@@ -0,0 +1,283 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why replace `any(k in ql for k in signals)` with a compiled matcher?
+A: Each `in` is a separate scan of the question, so routing costs
+   (number of signals x question length) and grows with every phrase added. An
+   Aho-Corasick automaton built once from all phrases finds every occurrence of
+   every phrase in a single left-to-right pass, in time proportional to the
+   question length plus the number of matches, however many phrases there are.
+
+Q: How does Aho-Corasick work?
+A: Put the phrases in a trie. For each trie node add a failure link to the
+   node for the longest proper suffix of its path that is also in the trie
+   (computed breadth-first), and merge the outputs of that node into its own.
+   While scanning, follow the trie on each character; on a mismatch follow
+   failure links instead of restarting. Every node reached reports the phrases
+   ending at that position.
+
+Q: What does one match return?
+A: The intent groups hit (e.g. hr, policy), the HR fields the phrases map to in
+   config order (deduplicated), and the (start, end, phrase) spans, all from the
+   same pass. Callers combine groups into an intent themselves, since that rule
+   (both groups -> hybrid) is routing logic rather than signal data.
+   named_fields keeps only the fields an "hr" phrase asked for: "overtime" maps
+   to years because the rate depends on it, but it does not ask for years.
+
+Q: How are signals configured and reloaded?
+A: A JSON file ({"intents": {group: [phrases]}, "fields": {phrase: [fields]}}),
+   ragkit/signals.json by default or SIGNALS_FILE. match() checks the file's
+   mtime at most every SIGNALS_RELOAD_S seconds and swaps in a freshly built
+   automaton when it changed; a broken edit is logged and the old one kept.
+
+Q: Is it faster today?
+A: Not yet: with the ~30 built-in phrases the substring scans run in C and beat
+   a per-character Python loop (about 6 vs 13 us per question). The scans grow
+   linearly with the phrase count while the automaton stays flat, so it wins
+   from a few hundred phrases on (about 70 vs 17 us at 1,000 and 630 vs 18 us at
+   10,000). Run this module to measure: python -m ragkit.signals
+
+SAMPLE CODE:
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIGNALS_FILE = Path(__file__).parent / "signals.json"
+HR_GROUP = "hr"
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher; patterns are matched as given (no folding)."""
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        self.patterns = list(patterns)
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for pid, pattern in enumerate(self.patterns):
+            node = 0
+            for ch in pattern:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = goto[node][ch] = len(goto)
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append(pid)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())  # depth 1: fail to the root
+        for node in queue:  # breadth-first; the list grows while iterating
+            for ch, child in goto[node].items():
+                queue.append(child)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                out[child].extend(out[fail[child]])
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+        self._lengths = [len(p) for p in self.patterns]
+
+    def find(self, text: str) -> List[Tuple[int, int, int]]:
+        """All (start, end, pattern id) occurrences, overlapping ones included."""
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        found: List[Tuple[int, int, int]] = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                end = i + 1
+                for pid in out[node]:
+                    found.append((end - lengths[pid], end, pid))
+        return found
+
+
+@dataclass
+class SignalMatch:
+    intents: FrozenSet[str] = frozenset()
+    fields: List[str] = field(default_factory=list)
+    spans: List[Tuple[int, int, str]] = field(default_factory=list)
+    named_fields: List[str] = field(default_factory=list)
+
+    @property
+    def phrases(self) -> FrozenSet[str]:
+        return frozenset(phrase for _, _, phrase in self.spans)
+
+
+class SignalMatcher:
+    """Intent groups and HR fields from one compiled pass over a question."""
+
+    def __init__(
+        self, intents: Dict[str, Sequence[str]], fields: Dict[str, Sequence[str]]
+    ) -> None:
+        phrases: Dict[str, int] = {}
+        for group, group_phrases in intents.items():
+            for p in group_phrases:
+                phrases.setdefault(p.lower(), len(phrases))
+        for p in fields:
+            phrases.setdefault(p.lower(), len(phrases))
+        self._phrases = list(phrases)
+        self._groups: List[Tuple[str, ...]] = [() for _ in self._phrases]
+        for group, group_phrases in intents.items():
+            for p in group_phrases:
+                pid = phrases[p.lower()]
+                self._groups[pid] = self._groups[pid] + (group,)
+        # Field order follows the config, not the question, so results are stable
+        self._fields: List[Tuple[str, ...]] = [tuple(fs) for fs in fields.values()]
+        self._field_rank: List[Optional[int]] = [None] * len(self._phrases)
+        for rank, p in enumerate(fields):
+            self._field_rank[phrases[p.lower()]] = rank
+        self._automaton = AhoCorasick(self._phrases)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "SignalMatcher":
+        with open(path) as fh:
+            config = json.load(fh)
+        return cls(config.get("intents", {}), config.get("fields", {}))
+
+    def match(self, text: str) -> SignalMatch:
+        hits = self._automaton.find(text.lower())
+        if not hits:
+            return SignalMatch()
+        groups = set()
+        ranks = set()
+        named = set()
+        spans = []
+        for start, end, pid in hits:
+            groups.update(self._groups[pid])
+            rank = self._field_rank[pid]
+            if rank is not None:
+                ranks.add(rank)
+                if HR_GROUP in self._groups[pid]:
+                    named.add(rank)
+            spans.append((start, end, self._phrases[pid]))
+        fields: List[str] = []
+        named_fields: List[str] = []
+        for rank in sorted(ranks):
+            for f in self._fields[rank]:
+                if f not in fields:
+                    fields.append(f)
+                if rank in named and f not in named_fields:
+                    named_fields.append(f)
+        return SignalMatch(frozenset(groups), fields, spans, named_fields)
+
+
+class Signals:
+    """A SignalMatcher that rebuilds itself when its config file changes."""
+
+    def __init__(self, path: Union[str, Path], reload_s: float = 2.0) -> None:
+        self.path = Path(path)
+        self.reload_s = reload_s
+        self._lock = threading.Lock()
+        self._mtime = self.path.stat().st_mtime
+        self._checked = time.monotonic()
+        self.matcher = SignalMatcher.from_file(self.path)
+        self.reloads = 0
+
+    @classmethod
+    def from_env(cls) -> "Signals":
+        return cls(
+            os.getenv("SIGNALS_FILE", str(DEFAULT_SIGNALS_FILE)),
+            float(os.getenv("SIGNALS_RELOAD_S", "2")),
+        )
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self.reload_s or not self._lock.acquire(False):
+            return
+        try:
+            self._checked = now
+            mtime = self.path.stat().st_mtime
+            if mtime != self._mtime:
+                self._mtime = mtime  # a broken edit is reported once, not per check
+                self.matcher = SignalMatcher.from_file(self.path)
+                self.reloads += 1
+                logger.info("reloaded signals from %s", self.path)
+        except (OSError, ValueError) as e:
+            logger.warning("keeping previous signals; reload failed: %s", e)
+        finally:
+            self._lock.release()
+
+    def match(self, text: str) -> SignalMatch:
+        self._maybe_reload()
+        return self.matcher.match(text)
+
+
+_signals: Optional[Signals] = None
+
+
+def get_signals() -> Signals:
+    global _signals
+    if _signals is None:
+        _signals = Signals.from_env()
+    return _signals
+
+
+if __name__ == "__main__":
+    import random
+    import string
+
+    config = json.loads(DEFAULT_SIGNALS_FILE.read_text())
+    questions = [
+        "What is my PTO balance and the holiday policy?",
+        "Who is my manager?",
+        "What overtime multiplier applies after two years of service?",
+        "Can you summarize the travel policy for international trips, including "
+        "per diem limits, booking rules and how expenses are reimbursed?",
+    ]
+
+    def scan(intents: Dict[str, List[str]], fields: Dict[str, List[str]], q: str):
+        # The substring scans this module replaces
+        ql = q.lower()
+        groups = {g for g, ps in intents.items() if any(p in ql for p in ps)}
+        out: List[str] = []
+        for p, fs in fields.items():
+            if p in ql:
+                out.extend(f for f in fs if f not in out)
+        return groups, out
+
+    def bench(fn, n: int) -> float:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            for q in questions:
+                fn(q)
+        return (time.perf_counter() - t0) / (n * len(questions)) * 1e6
+
+    rng = random.Random(7)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=6)) for _ in range(4000)]
+    for extra in (0, 1000, 10000):
+        intents = {g: list(ps) for g, ps in config["intents"].items()}
+        fields = dict(config["fields"])
+        for i in range(extra):
+            phrase = " ".join(rng.sample(words, 2))
+            if i % 2:
+                intents["hr" if i % 4 == 1 else "policy"].append(phrase)
+            else:
+                fields[phrase] = [f"field_{i}"]
+        t0 = time.perf_counter()
+        matcher = SignalMatcher(intents, fields)
+        build_ms = (time.perf_counter() - t0) * 1000
+        for q in questions:
+            m = matcher.match(q)
+            assert (set(m.intents), m.fields) == scan(intents, fields, q), q
+        n = max(20, 20000 // (1 + extra // 100))
+        scan_us = bench(lambda q: scan(intents, fields, q), n)
+        match_us = bench(matcher.match, n)
+        print(
+            f"{sum(map(len, intents.values())) + len(fields):>6} signals: "
+            f"scan {scan_us:8.1f} us/question, "
+            f"aho-corasick {match_us:6.1f} us/question "
+            f"(build {build_ms:.1f} ms)"
+        )
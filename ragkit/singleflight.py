@@ -0,0 +1,114 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: What is single-flight request coalescing?
+A: When several identical requests arrive while the first one is still running,
+   only the first does the work. The others await the same in-flight task and all
+   receive its result, so a burst of N identical questions costs one retrieval and
+   one LLM call instead of N.
+
+Q: What makes two requests "identical"?
+A: The normalized question plus every input that personalizes the answer (intent,
+   HR facts, years of service). Anything not in the key must not affect the output,
+   otherwise one user could receive an answer computed for another.
+
+Q: Why run the shared work as a separate task?
+A: If the first caller disconnects and is cancelled, the followers still need the
+   result. Each caller awaits the task through asyncio.shield(), so cancelling one
+   waiter never cancels the computation. Only when the last waiter goes away is the
+   shared task cancelled too, so abandoned work does not keep running.
+
+Q: Who is charged for a coalesced call?
+A: The leader made the call, so its usage row and trace hold the tokens and the
+   model spans. Each follower still gets its own records: a "coalesced" usage
+   row under its user and intent (no tokens, its wait as latency) and a
+   "singleflight.follow" span in its trace carrying the leader's trace and span
+   ids. Requests coalesce only within one LLM priority lane, so an interactive
+   request never waits on a call queued in the batch lane.
+
+SAMPLE CODE:
+"""
+
+import asyncio
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from ragkit.batch import normalize_question
+from ragkit.llm_scheduler import current_priority
+from ragkit.tracing import Span, current_span, span
+from ragkit.usage import record_coalesced
+
+
+def make_key(question: str, **personalization: Any) -> Tuple[Hashable, ...]:
+    frozen = tuple(sorted((k, repr(v)) for k, v in personalization.items()))
+    return (normalize_question(question), frozen)
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._leaders: Dict[asyncio.Task, Optional[Span]] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        # The shared call runs in the leader's lane: never mix lanes
+        key = (current_priority(), key)
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._leaders[task] = current_span()
+            task.add_done_callback(functools.partial(self._forget, key))
+            follower = False
+        else:
+            self.coalesced += 1
+            follower = True
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            if not follower:
+                return await asyncio.shield(task)
+            return await self._follow(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        self._leaders.pop(task, None)
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _follow(self, task: asyncio.Task) -> Any:
+        # The follower's own usage row and a trace link to the leader's call
+        leader = self._leaders.get(task)
+        link = (
+            {"leader.trace_id": leader.trace_id, "leader.span_id": leader.span_id}
+            if leader is not None
+            else {}
+        )
+        t0 = time.perf_counter()
+        try:
+            with span("singleflight.follow", **link):
+                return await asyncio.shield(task)
+        finally:
+            record_coalesced(time.perf_counter() - t0)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
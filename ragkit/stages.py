@@ -0,0 +1,79 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why run pipeline stages as a dependency graph?
+A: Retrieval and the HR lookup do not depend on each other, so awaiting them one
+   after the other makes latency the SUM of the stages. Declaring each stage with
+   its dependencies and starting it as soon as they resolve makes latency the
+   length of the critical path, i.e. roughly the MAX of independent stages.
+
+Q: What is speculative execution here?
+A: Retrieval only needs the question, so it can start the moment the request
+   arrives, before intent routing has decided whether it is needed. If routing
+   says it is not (a pure HR question), the speculative task is cancelled.
+
+Q: How do you avoid leaking tasks?
+A: Use the graph as an async context manager; on exit every stage that is still
+   running (unused speculation, or siblings of a failed stage) is cancelled.
+
+SAMPLE CODE:
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Sequence, Tuple
+
+
+class StageGraph:
+    def __init__(self) -> None:
+        self._stages: Dict[
+            str, Tuple[Callable[..., Awaitable[Any]], Tuple[str, ...]]
+        ] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[..., Awaitable[Any]],
+        deps: Sequence[str] = (),
+        eager: bool = False,
+    ) -> None:
+        """Register a stage; fn receives dependency results positionally, in deps order."""
+        self._stages[name] = (fn, tuple(deps))
+        if eager:
+            self.start(name)
+
+    def start(self, name: str) -> asyncio.Task:
+        task = self._tasks.get(name)
+        if task is None:
+            fn, deps = self._stages[name]
+            task = asyncio.ensure_future(self._run(fn, deps))
+            self._tasks[name] = task
+        return task
+
+    async def _run(
+        self, fn: Callable[..., Awaitable[Any]], deps: Tuple[str, ...]
+    ) -> Any:
+        values = await asyncio.gather(*(self.start(d) for d in deps))
+        return await fn(*values)
+
+    async def result(self, name: str) -> Any:
+        return await self.start(name)
+
+    def cancel(self, name: str) -> None:
+        task = self._tasks.get(name)
+        if task is not None and not task.done():
+            task.cancel()
+
+    async def __aenter__(self) -> "StageGraph":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        pending = [t for t in self._tasks.values() if not t.done()]
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        # Silence "exception was never retrieved" for stages whose result nobody used
+        for t in self._tasks.values():
+            if not t.cancelled():
+                t.exception()
@@ -0,0 +1,513 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: Why trace when we already have stage timings?
+A: Timings say how long each stage took on average; a trace shows one request
+   end to end as a tree: the client's traceparent, the /ask handler, each stage,
+   and inside the LLM stage every Runnable step (prompt, scheduler wrapper, chat
+   model, parser) with its model name and token counts. A single slow request can
+   be explained from its trace alone.
+
+Q: How are LCEL steps turned into spans?
+A: A LangChain callback handler. Every Runnable reports start/end with its run_id
+   and parent_run_id; the handler opens a span on start (child of the parent run's
+   span, or of the current stage span when the chain is the top-level run) and
+   closes it on end. Chat model ends carry usage_metadata (prompt/completion
+   tokens) and the model name, which become span attributes.
+
+Q: How does the trace cross the HTTP boundary?
+A: W3C Trace Context. The Streamlit clients send a traceparent header
+   (00-<trace id>-<parent span id>-01); the server middleware continues that trace
+   instead of starting a new one, so client and server share one trace id.
+
+Q: Where do spans go?
+A: TRACE_EXPORT=file appends one JSON line per finished trace to TRACE_FILE
+   (data/traces.jsonl by default, see ragkit.paths); TRACE_EXPORT=otlp posts
+   OTLP/HTTP JSON to OTEL_EXPORTER_OTLP_ENDPOINT (e.g. a local OpenTelemetry
+   collector or Jaeger). Export runs on a background thread so the event loop
+   never waits on disk or network; the queue is flushed at exit, so a CLI that
+   ends right after its last call keeps its traces. Unset, tracing is off and
+   the handler does nothing.
+
+SAMPLE CODE:
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+import httpx
+from fastapi import FastAPI
+from langchain_core.callbacks import BaseCallbackHandler
+
+from ragkit.paths import data_path
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    match = _TRACEPARENT_RE.match((value or "").strip().lower())
+    return (match.group(1), match.group(2)) if match else None
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    # Local root span the span is exported with; several requests may continue
+    # the same remote trace id at once, so the trace id alone is not a key
+    root_id: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round(
+                ((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3
+            ),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _BackgroundExporter:
+    def __init__(self, flush_timeout_s: float = 5.0) -> None:
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue()
+        self.flush_timeout_s = flush_timeout_s
+        self.failures = 0
+        threading.Thread(target=self._run, daemon=True).start()
+        # The thread is a daemon: without this a CLI that exits right after its
+        # last call loses the traces still queued
+        atexit.register(self.flush)
+
+    def export(self, spans: List[Span]) -> None:
+        self._queue.put(spans)
+
+    def flush(self, timeout_s: Optional[float] = None) -> bool:
+        """Wait until every queued trace is written; False if that timed out."""
+        deadline = time.monotonic() + (
+            self.flush_timeout_s if timeout_s is None else timeout_s
+        )
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            try:
+                self._write(spans)
+            except Exception:
+                # Tracing must never take the service down; say so once, not
+                # once per trace
+                self.failures += 1
+                if self.failures == 1:
+                    logger.exception(
+                        "%s failed, dropping traces it cannot write",
+                        type(self).__name__,
+                    )
+            finally:
+                self._queue.task_done()
+
+    def _write(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+
+class FileExporter(_BackgroundExporter):
+    """One JSON line per finished trace."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        super().__init__()
+
+    def _write(self, spans: List[Span]) -> None:
+        root = min(spans, key=lambda s: s.start_ns)
+        line = {
+            "trace_id": root.trace_id,
+            "root": root.name,
+            "duration_ms": root.to_dict()["duration_ms"],
+            "spans": [s.to_dict() for s in sorted(spans, key=lambda s: s.start_ns)],
+        }
+        with open(self.path, "a") as fh:
+            fh.write(json.dumps(line, default=str) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPExporter(_BackgroundExporter):
+    """OTLP/HTTP JSON to a collector's /v1/traces."""
+
+    def __init__(self, endpoint: str, service: str) -> None:
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service = service
+        self._client = httpx.Client(timeout=5.0)
+        super().__init__()
+
+    def _write(self, spans: List[Span]) -> None:
+        body = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": _otlp_value(self.service)}
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "ragkit"},
+                            "spans": [
+                                {
+                                    "traceId": s.trace_id,
+                                    "spanId": s.span_id,
+                                    "parentSpanId": s.parent_id or "",
+                                    "name": s.name,
+                                    "kind": 1,
+                                    "startTimeUnixNano": str(s.start_ns),
+                                    "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                                    "attributes": [
+                                        {"key": k, "value": _otlp_value(v)}
+                                        for k, v in s.attributes.items()
+                                    ],
+                                    "status": (
+                                        {"code": 2, "message": s.error}
+                                        if s.error
+                                        else {"code": 1}
+                                    ),
+                                }
+                                for s in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+        self._client.post(self.url, json=body).raise_for_status()
+
+
+class Tracer:
+    def __init__(self, exporter: _BackgroundExporter) -> None:
+        self.exporter = exporter
+        self._traces: Dict[str, List[Span]] = {}
+
+    def start(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        remote: Optional[Tuple[str, str]] = None,
+        **attributes: Any,
+    ) -> Span:
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        elif remote is not None:
+            trace_id, parent_id = remote
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+        span = Span(
+            trace_id,
+            secrets.token_hex(8),
+            parent_id,
+            name,
+            time.time_ns(),
+            None,
+            attributes,
+        )
+        if parent is None:
+            span.root_id = span.span_id
+            self._traces[span.span_id] = []
+        else:
+            span.root_id = parent.root_id
+        return span
+
+    def end(self, span: Span, error: Optional[BaseException] = None) -> None:
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        spans = self._traces.get(span.root_id or "")
+        if spans is None:
+            self.exporter.export([span])  # finished after its root was exported
+            return
+        spans.append(span)
+        if span.span_id == span.root_id:
+            del self._traces[span.span_id]
+            self.exporter.export(spans)
+
+
+_tracer: Optional[Tracer] = None
+_tracer_ready = False
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "ragkit_span", default=None
+)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost open span of this context, if tracing is on."""
+    return _current_span.get()
+
+
+def get_tracer(service: str = "ragkit") -> Optional[Tracer]:
+    """Process-wide tracer from TRACE_EXPORT (file|otlp); None when tracing is off."""
+    global _tracer, _tracer_ready
+    if not _tracer_ready:
+        _tracer_ready = True
+        mode = os.getenv("TRACE_EXPORT", "off").lower()
+        service = os.getenv("OTEL_SERVICE_NAME", service)
+        if mode == "file":
+            path = os.getenv("TRACE_FILE") or data_path("traces.jsonl")
+            _tracer = Tracer(FileExporter(path))
+        elif mode == "otlp":
+            endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+            _tracer = Tracer(OTLPExporter(endpoint, service))
+    return _tracer
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child span of the current one for a block of non-LCEL work."""
+    tracer = get_tracer()
+    if tracer is None:
+        yield None
+        return
+    current = tracer.start(name, parent=_current_span.get(), **attributes)
+    token = _current_span.set(current)
+    error: Optional[BaseException] = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.end(current, error)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Opens a span per Runnable step; chat model spans carry model and token counts."""
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        self._spans: Dict[UUID, Span] = {}
+
+    def _start(
+        self, run_id: UUID, parent_run_id: Optional[UUID], name: str, **attrs: Any
+    ) -> None:
+        tracer = get_tracer()
+        if tracer is None:
+            return
+        parent = self._spans.get(parent_run_id) if parent_run_id else None
+        parent = parent or _current_span.get()
+        self._spans[run_id] = tracer.start(name, parent=parent, **attrs)
+
+    def _end(
+        self, run_id: UUID, error: Optional[BaseException] = None, **attrs: Any
+    ) -> None:
+        current = self._spans.pop(run_id, None)
+        tracer = get_tracer()
+        if current is None or tracer is None:
+            return
+        current.attributes.update(attrs)
+        tracer.end(current, error)
+
+    def on_chain_start(
+        self,
+        serialized: Any,
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chain"
+        self._start(
+            run_id,
+            parent_run_id,
+            name,
+            **{"run.type": kwargs.get("run_type") or "chain"},
+        )
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end(run_id, error)
+
+    def on_chat_model_start(
+        self,
+        serialized: Any,
+        messages: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = (
+            (metadata or {}).get("ls_model_name")
+            or params.get("model")
+            or params.get("model_name")
+            or params.get("_type", "")
+        )
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chat_model"
+        self._start(
+            run_id, parent_run_id, name, **{"run.type": "llm", "llm.model": model}
+        )
+
+    def on_llm_start(
+        self,
+        serialized: Any,
+        prompts: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "llm"
+        self._start(run_id, parent_run_id, name, **{"run.type": "llm"})
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        attrs: Dict[str, Any] = {}
+        try:
+            message = response.generations[0][0].message
+            usage = getattr(message, "usage_metadata", None) or {}
+            attrs["llm.prompt_tokens"] = usage.get("input_tokens", 0)
+            attrs["llm.completion_tokens"] = usage.get("output_tokens", 0)
+            model = message.response_metadata.get("model_name")
+            if model:
+                attrs["llm.model"] = model
+        except (AttributeError, IndexError):
+            pass
+        self._end(run_id, **attrs)
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end(run_id, error)
+
+    def on_retriever_start(
+        self,
+        serialized: Any,
+        query: str,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start(
+            run_id,
+            parent_run_id,
+            kwargs.get("name") or "retriever",
+            **{"run.type": "retriever"},
+        )
+
+    def on_retriever_end(self, documents: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, **{"retriever.documents": len(documents)})
+
+    def on_retriever_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end(run_id, error)
+
+    def on_tool_start(
+        self,
+        serialized: Any,
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._start(run_id, parent_run_id, name, **{"run.type": "tool"})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end(run_id, error)
+
+
+TRACE_CALLBACK = TracingCallbackHandler()
+
+
+class TracingMiddleware:
+    """Root span per HTTP request, continuing the caller's traceparent if present."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        tracer = get_tracer()
+        if scope["type"] != "http" or tracer is None:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        remote = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        root = tracer.start(
+            f"{scope['method']} {scope['path']}",
+            remote=remote,
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        token = _current_span.set(root)
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+            await send(message)
+
+        error: Optional[BaseException] = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                root.name = f"{scope['method']} {route.path}"
+            _current_span.reset(token)
+            tracer.end(root, error)
+
+
+def install_tracing(app: FastAPI) -> None:
+    """Trace requests to app when TRACE_EXPORT is set; service name is the app title."""
+    if get_tracer(service=app.title) is not None:
+        app.add_middleware(TracingMiddleware)
@@ -0,0 +1,458 @@
+"""
+INTERVIEW STYLE Q&A:
+
+Q: How do you find out which users and intents drive the LLM bill?
+A: Meter every model call at the point where models are created (make_llm and
+   make_embeddings), not in each handler: prompt and completion tokens, model,
+   latency and an estimated cost, labelled with the service, endpoint, user and
+   intent of the request that made the call. Sum those per label set and the
+   expensive paths (the ones worth caching or templating) sort to the top.
+
+Q: Where do tokens come from?
+A: Chat models report usage_metadata on every reply, which a LangChain callback
+   handler bound to the model picks up on on_llm_end. Embedding APIs do not
+   surface usage through LangChain, so the embeddings wrapper counts input tokens
+   itself with the same tokenizer used for context packing.
+
+Q: How do calls get their user and intent?
+A: A small middleware opens a usage scope per request (endpoint from the matched
+   route); handlers tag it with tag_usage(user=..., intent=...) once they know
+   them. Batch endpoints, where one request covers many users, pass
+   {"metadata": {"user": ..., "intent": ...}} per item in the LCEL config, which
+   takes precedence over the request scope. A request answered by another's
+   in-flight call (ragkit.singleflight) adds a "coalesced" row under its own
+   labels, with no tokens, so it is not invisible in the report.
+
+Q: Why an in-memory rollup flushed to sqlite instead of a row per call?
+A: A row per call would put a disk write on the hot path. Calls are added to a
+   dict keyed by (day, service, endpoint, user, intent, kind, model) under a lock;
+   a background thread upserts the deltas every USAGE_FLUSH_S seconds (and at
+   exit), so several worker processes can share one USAGE_DB file
+   (data/usage.sqlite by default, see ragkit.paths). GET /admin/usage?by=
+   intent,user reads it back grouped and sorted by cost.
+
+Q: How is cost estimated?
+A: From a per-model price table in USD per million tokens (prompt, completion),
+   matched on the longest model-name prefix so dated versions such as
+   gpt-4o-mini-2024-07-18 resolve. Override it with USAGE_PRICES, a JSON object
+   of the same shape. Unknown models are counted with zero cost.
+
+SAMPLE CODE:
+"""
+
+import asyncio
+import atexit
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import FastAPI, HTTPException
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import Runnable
+
+from ragkit.context import count_tokens
+from ragkit.paths import data_path
+
+# USD per 1M tokens: (prompt, completion)
+PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "text-embedding-ada-002": (0.10, 0.0),
+}
+GROUP_COLUMNS = ("day", "service", "endpoint", "user", "intent", "kind", "model")
+UNKNOWN = "-"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    day TEXT NOT NULL,
+    service TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    user TEXT NOT NULL,
+    intent TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL,
+    latency_s REAL NOT NULL,
+    PRIMARY KEY (day, service, endpoint, user, intent, kind, model)
+)
+"""
+_UPSERT = """
+INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, service, endpoint, user, intent, kind, model) DO UPDATE SET
+    calls = calls + excluded.calls,
+    errors = errors + excluded.errors,
+    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = completion_tokens + excluded.completion_tokens,
+    cost_usd = cost_usd + excluded.cost_usd,
+    latency_s = latency_s + excluded.latency_s
+"""
+
+
+def price_for(
+    model: str, prices: Dict[str, Tuple[float, float]]
+) -> Tuple[float, float]:
+    best = ""
+    for name in prices:
+        if model.startswith(name) and len(name) > len(best):
+            best = name
+    return prices[best] if best else (0.0, 0.0)
+
+
+class RequestUsage:
+    """Labels for the model calls made while serving one request."""
+
+    __slots__ = ("scope", "user", "intent")
+
+    def __init__(self, scope: Dict[str, Any]) -> None:
+        self.scope = scope
+        self.user = ""
+        self.intent = ""
+
+    @property
+    def endpoint(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path", UNKNOWN)
+
+
+_request: contextvars.ContextVar[Optional[RequestUsage]] = contextvars.ContextVar(
+    "ragkit_usage", default=None
+)
+
+
+def tag_usage(user: Optional[str] = None, intent: Optional[str] = None) -> None:
+    """Attribute this request's model calls to a user and/or intent."""
+    current = _request.get()
+    if current is None:
+        return
+    if user is not None:
+        current.user = user.strip().lower()
+    if intent is not None:
+        current.intent = intent
+
+
+def record_coalesced(latency: float) -> None:
+    """Count a request served by another's in-flight call: its labels, no tokens."""
+    if _request.get() is not None:
+        get_meter().record("coalesced", UNKNOWN, 0, 0, latency)
+
+
+class UsageMeter:
+    def __init__(
+        self,
+        path: str,
+        service: str,
+        flush_s: float = 30.0,
+        prices: Optional[Dict[str, Tuple[float, float]]] = None,
+    ) -> None:
+        self.path = path
+        self.service = service
+        self.flush_s = flush_s
+        self.prices = dict(PRICES if prices is None else prices)
+        self._rollup: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        with self._connect() as db:
+            db.execute(_SCHEMA)
+        threading.Thread(target=self._run, daemon=True).start()
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls, service: str) -> "UsageMeter":
+        prices = dict(PRICES)
+        prices.update(
+            {
+                k: tuple(v)
+                for k, v in json.loads(os.getenv("USAGE_PRICES", "{}")).items()
+            }
+        )
+        return cls(
+            os.getenv("USAGE_DB") or data_path("usage.sqlite"),
+            service,
+            float(os.getenv("USAGE_FLUSH_S", "30")),
+            prices,
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10.0)
+
+    def record(
+        self,
+        kind: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float,
+        error: bool = False,
+        user: Optional[str] = None,
+        intent: Optional[str] = None,
+        request: Optional[RequestUsage] = None,
+    ) -> None:
+        request = request or _request.get()
+        key = (
+            time.strftime("%Y-%m-%d", time.gmtime()),
+            request.endpoint if request else UNKNOWN,
+            user or (request.user if request else "") or UNKNOWN,
+            intent or (request.intent if request else "") or UNKNOWN,
+            kind,
+            model or UNKNOWN,
+        )
+        prompt_price, completion_price = price_for(model, self.prices)
+        cost = (
+            prompt_tokens * prompt_price + completion_tokens * completion_price
+        ) / 1e6
+        with self._lock:
+            row = self._rollup.get(key)
+            if row is None:
+                row = self._rollup[key] = [0, 0, 0, 0, 0.0, 0.0]
+            row[0] += 1
+            row[1] += int(error)
+            row[2] += prompt_tokens
+            row[3] += completion_tokens
+            row[4] += cost
+            row[5] += latency
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._rollup = self._rollup, {}
+        if not pending:
+            return
+        with self._db_lock, self._connect() as db:
+            db.executemany(
+                _UPSERT,
+                [
+                    (key[0], self.service, *key[1:], *row)
+                    for key, row in pending.items()
+                ],
+            )
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_s)
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass  # keep metering; the next flush retries with a fresh rollup
+
+    def report(
+        self, by: Sequence[str], days: int = 30, limit: int = 100
+    ) -> Dict[str, Any]:
+        """Totals grouped by the given label columns, most expensive first."""
+        self.flush()
+        cols = ", ".join(by)
+        since = time.strftime("%Y-%m-%d", time.gmtime(time.time() - days * 86400))
+        query = (
+            f"SELECT {cols + ', ' if cols else ''}SUM(calls), SUM(errors), "
+            "SUM(prompt_tokens), SUM(completion_tokens), SUM(cost_usd), "
+            f"SUM(latency_s) FROM usage WHERE day >= ?"
+            f"{' GROUP BY ' + cols if cols else ''} ORDER BY {len(by) + 5} DESC LIMIT ?"
+        )
+        with self._db_lock, self._connect() as db:
+            rows = db.execute(query, (since, limit)).fetchall()
+        out = []
+        for row in rows:
+            calls, errors, prompt, completion, cost, latency = row[len(by) :]
+            if not calls:
+                continue
+            out.append(
+                {
+                    **dict(zip(by, row[: len(by)])),
+                    "calls": calls,
+                    "errors": errors,
+                    "prompt_tokens": prompt,
+                    "completion_tokens": completion,
+                    "cost_usd": round(cost, 6),
+                    "mean_latency_ms": round(1000 * latency / calls, 1),
+                }
+            )
+        return {"since": since, "by": list(by), "rows": out}
+
+
+_meter: Optional[UsageMeter] = None
+
+
+def get_meter(service: str = "ragkit") -> UsageMeter:
+    """Process-wide meter; install_usage names the service before the first flush."""
+    global _meter
+    if _meter is None:
+        _meter = UsageMeter.from_env(service)
+    return _meter
+
+
+class UsageCallback(BaseCallbackHandler):
+    """Records tokens, model and latency of every chat model run it sees."""
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        self._starts: Dict[UUID, Tuple[float, str, Dict[str, Any], Any]] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: Any,
+        messages: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        params = kwargs.get("invocation_params") or {}
+        metadata = metadata or {}
+        model = (
+            metadata.get("ls_model_name")
+            or params.get("model")
+            or params.get("model_name")
+            or ""
+        )
+        self._starts[run_id] = (time.perf_counter(), model, metadata, _request.get())
+
+    def _finish(
+        self, run_id: UUID, prompt: int, completion: int, model: str, error: bool
+    ) -> None:
+        started = self._starts.pop(run_id, None)
+        if started is None:
+            return
+        t0, start_model, metadata, request = started
+        get_meter().record(
+            "llm",
+            model or start_model,
+            prompt,
+            completion,
+            time.perf_counter() - t0,
+            error=error,
+            user=metadata.get("user"),
+            intent=metadata.get("intent"),
+            request=request,
+        )
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt = completion = 0
+        model = ""
+        try:
+            message = response.generations[0][0].message
+            usage = getattr(message, "usage_metadata", None) or {}
+            prompt = usage.get("input_tokens", 0)
+            completion = usage.get("output_tokens", 0)
+            model = message.response_metadata.get("model_name", "")
+        except (AttributeError, IndexError):
+            pass
+        self._finish(run_id, prompt, completion, model, error=False)
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._finish(run_id, 0, 0, "", error=True)
+
+
+USAGE_CALLBACK = UsageCallback()
+
+
+def meter_llm(llm: Runnable) -> Runnable:
+    """Bind the usage callback so every call through llm is metered."""
+    return llm.with_config(callbacks=[USAGE_CALLBACK])
+
+
+class MeteredEmbeddings(Embeddings):
+    """Counts input tokens and latency of an Embeddings object's calls."""
+
+    def __init__(self, inner: Embeddings) -> None:
+        self.inner = inner
+        self.model = str(getattr(inner, "model", "") or type(inner).__name__)
+
+    def _record(self, texts: Sequence[str], t0: float, error: bool = False) -> None:
+        tokens = sum(count_tokens(t) for t in texts)
+        get_meter().record(
+            "embedding", self.model, tokens, 0, time.perf_counter() - t0, error=error
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        t0 = time.perf_counter()
+        try:
+            vectors = self.inner.embed_documents(texts)
+        except Exception:
+            self._record(texts, t0, error=True)
+            raise
+        self._record(texts, t0)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        t0 = time.perf_counter()
+        try:
+            vector = self.inner.embed_query(text)
+        except Exception:
+            self._record([text], t0, error=True)
+            raise
+        self._record([text], t0)
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        t0 = time.perf_counter()
+        try:
+            vectors = await self.inner.aembed_documents(texts)
+        except Exception:
+            self._record(texts, t0, error=True)
+            raise
+        self._record(texts, t0)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        t0 = time.perf_counter()
+        try:
+            vector = await self.inner.aembed_query(text)
+        except Exception:
+            self._record([text], t0, error=True)
+            raise
+        self._record([text], t0)
+        return vector
+
+
+class UsageMiddleware:
+    """Opens a usage scope per HTTP request so model calls know their endpoint."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request.set(RequestUsage(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request.reset(token)
+
+
+def install_usage(
+    app: FastAPI, service: str, dependencies: Optional[List[Any]] = None
+) -> None:
+    """Meter model calls per request and add GET /admin/usage."""
+    meter = get_meter(service)
+    meter.service = service
+    app.add_middleware(UsageMiddleware)
+
+    @app.get("/admin/usage", dependencies=dependencies or [])
+    async def usage_report(
+        by: str = "endpoint,intent", days: int = 30, limit: int = 100
+    ) -> Dict[str, Any]:
+        columns = [c.strip() for c in by.split(",") if c.strip()]
+        unknown = [c for c in columns if c not in GROUP_COLUMNS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"unknown group-by column(s) {unknown}; use {list(GROUP_COLUMNS)}",
+            )
+        return await asyncio.to_thread(meter.report, columns, days, limit)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The servers import ragkit from the repository root; so do the tests
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,49 @@
+import pytest
+
+from ragkit.answers import render_hr_answer, template_fields
+from ragkit.signals import DEFAULT_SIGNALS_FILE, SignalMatcher
+
+FACTS = {"years": 3.0, "manager": "bob", "pto_balance": 12}
+
+
+@pytest.fixture(scope="module")
+def signals():
+    return SignalMatcher.from_file(DEFAULT_SIGNALS_FILE)
+
+
+@pytest.mark.parametrize(
+    "question, answer",
+    [
+        ("Who is my manager?", "Your manager is bob."),
+        ("How many years of service do I have?", "You have 3 years of service."),
+        ("What's my PTO balance?", "Your PTO balance is 12."),
+        # Overtime implies years of service but does not ask for it
+        ("explain my overtime rate", None),
+        ("how does overtime work for me?", None),
+        ("years of service for the overtime policy?", None),
+        ("why did my manager change?", None),
+        ("who is my manager's manager?", None),
+        ("what's my title and salary?", None),
+    ],
+)
+def test_only_named_fields_are_templated(signals, question, answer):
+    assert render_hr_answer(template_fields(signals.match(question)), FACTS) == answer
+
+
+def test_implied_fields_are_still_loaded(signals):
+    match = signals.match("explain my overtime rate")
+    assert match.fields == ["years"]
+    assert match.named_fields == []
+
+
+def test_only_hr_phrases_name_fields():
+    matcher = SignalMatcher(
+        {"hr": ["pto balance"], "overtime_rate": ["rate"]},
+        {"pto balance": ["pto_balance"], "rate": ["years"]},
+    )
+    match = matcher.match("my rate and pto balance")
+    # Fields follow config order; only the hr phrase names one
+    assert match.fields == ["pto_balance", "years"]
+    assert match.named_fields == ["pto_balance"]
+    assert template_fields(match) == []
+    assert template_fields(matcher.match("pto balance?")) == ["pto_balance"]
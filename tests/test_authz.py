@@ -0,0 +1,71 @@
+import pytest
+
+from ragkit.authz import FIELDS, SENSITIVE, Authorizer, OrgIndex
+
+# carol -> bob -> alice, carol -> dave; erin is elsewhere
+LINES = [
+    ("carol", None),
+    ("bob", "carol"),
+    ("alice", "bob"),
+    ("dave", "carol"),
+    ("erin", None),
+]
+ALL = list(FIELDS)
+BASIC = [f for f in FIELDS if f not in SENSITIVE]
+
+
+@pytest.fixture
+def authz():
+    return Authorizer(OrgIndex(LINES))
+
+
+@pytest.mark.parametrize(
+    "caller, subject, roles, expected",
+    [
+        # Everyone reads their own record
+        ("alice", "alice", [], ALL),
+        ("Alice", "ALICE", ["employee"], ALL),
+        # Managers read basic fields of anyone below them, at any depth
+        ("bob", "alice", ["manager"], BASIC),
+        ("carol", "alice", ["manager"], BASIC),
+        # ... but nothing about peers, bosses or other teams
+        ("bob", "dave", ["manager"], []),
+        ("alice", "bob", ["manager"], []),
+        ("erin", "alice", ["manager"], []),
+        # Being above someone grants nothing without the manager role
+        ("bob", "alice", [], []),
+        # HR and admin read everything about everyone
+        ("erin", "alice", ["hr"], ALL),
+        ("alice", "carol", ["admin"], ALL),
+        ("bob", "alice", ["manager", "hr"], ALL),
+        # Unknown roles grant nothing
+        ("erin", "alice", ["root"], []),
+    ],
+)
+def test_allowed_fields(authz, caller, subject, roles, expected):
+    assert authz.allowed(ALL, subject, caller, roles) == expected
+
+
+def test_allowed_keeps_request_order_and_drops_unknown_fields(authz):
+    assert authz.allowed(
+        ["salary", "title", "nope", "years"], "alice", "alice", []
+    ) == [
+        "salary",
+        "title",
+        "years",
+    ]
+
+
+def test_masks_follow_reporting_line_moves(authz):
+    assert authz.allowed(["title"], "alice", "bob", ["manager"]) == ["title"]
+    authz.org.set_manager("alice", "dave")
+    assert authz.allowed(["title"], "alice", "bob", ["manager"]) == []
+    assert authz.allowed(["title"], "alice", "dave", ["manager"]) == ["title"]
+    assert authz.allowed(["title"], "alice", "carol", ["manager"]) == ["title"]
+
+
+def test_cycles_are_rejected():
+    org = OrgIndex(LINES)
+    with pytest.raises(ValueError, match="cycle"):
+        org.set_manager("carol", "alice")
+    assert org.is_above("carol", "alice")
@@ -0,0 +1,57 @@
+import sqlite3
+
+import pytest
+
+from ragkit.hr_cache import HRViewCache
+from ragkit.hr_store import DEMO_PROFILES, HRStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "hr.sqlite")
+    HRStore(path).upsert_many(DEMO_PROFILES)
+    return path
+
+
+def respond(cache, store, if_none_match=None):
+    return cache.respond(
+        "alice", ("profile",), if_none_match, lambda: store.get("alice", ["title"])
+    )
+
+
+def test_unchanged_record_is_not_modified(path):
+    store = HRStore(path)
+    cache = HRViewCache.for_store(store)
+    etag = respond(cache, store).headers["etag"]
+    assert respond(cache, store, etag).status_code == 304
+    store.upsert_many({"bob": {"title": "VP"}})
+    assert respond(cache, store, etag).status_code == 304
+
+
+def test_write_from_another_store_changes_etag_and_view(path):
+    store = HRStore(path)
+    cache = HRViewCache.for_store(store)
+    etag = respond(cache, store).headers["etag"]
+    # A second worker (its own HRStore on the same file) updates alice
+    HRStore(path).upsert_many({"alice": {"title": "Lead"}})
+    resp = respond(cache, store, etag)
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+    assert b'"Lead"' in resp.body
+
+
+def test_plain_sql_write_bumps_version(path):
+    store = HRStore(path)
+    before = store.version("alice")
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE employees SET title = 'Lead' WHERE user = 'alice'")
+    assert store.version("alice") > before
+    assert store.version("nobody") == 0
+
+
+def test_workers_on_one_file_share_etags(path):
+    a, b = HRStore(path), HRStore(path)
+    assert a.epoch == b.epoch
+    assert HRViewCache.for_store(a).etag("alice", "k") == HRViewCache.for_store(b).etag(
+        "alice", "k"
+    )
@@ -0,0 +1,78 @@
+import pytest
+
+from ragkit.authz import OrgIndex
+from ragkit.hr_store import DEMO_PROFILES, HRStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HRStore(str(tmp_path / "hr.sqlite"))
+    store.upsert_many(DEMO_PROFILES)
+    return store
+
+
+def test_get_projects_requested_fields(store):
+    assert store.get("ALICE", ["manager", "years", "nope"]) == {
+        "years": 0.8,
+        "manager": "bob",
+    }
+    assert store.get("nobody", ["years"]) is None
+
+
+def test_get_many_matches_get(store):
+    users = list(DEMO_PROFILES) + ["nobody"]
+    many = store.get_many(users, ["title", "salary"])
+    assert set(many) == set(DEMO_PROFILES)
+    for user in DEMO_PROFILES:
+        assert many[user] == store.get(user, ["title", "salary"])
+
+
+def test_partial_upsert_keeps_other_columns(store):
+    before = store.get("alice", ["years", "dob", "title", "manager"])
+    store.upsert_many({"Alice": {"title": "Senior Analyst"}})
+    after = store.get("alice", ["years", "dob", "title", "manager"])
+    assert after == {**before, "title": "Senior Analyst"}
+
+
+def test_upsert_inserts_new_rows_with_defaults(store):
+    store.upsert_many({"zoe": {"title": "Intern"}, "yan": {}})
+    assert store.get("zoe", ["years", "title", "manager"]) == {
+        "years": 0.0,
+        "title": "Intern",
+        "manager": None,
+    }
+    assert store.get("yan", ["years"]) == {"years": 0.0}
+    assert store.count() == len(DEMO_PROFILES) + 2
+
+
+def test_listeners_see_only_written_fields(store):
+    seen = []
+    store.subscribe(seen.append)
+    store.upsert_many({"Alice": {"title": "Lead", "unknown": 1}})
+    assert seen == [{"alice": {"title": "Lead"}}]
+
+
+def test_partial_upsert_keeps_reporting_line(store):
+    index = OrgIndex.from_store(store)
+    assert index.is_above("bob", "alice")
+    store.upsert_many({"alice": {"pto_balance": 3}})
+    assert index.is_above("bob", "alice")
+    store.upsert_many({"alice": {"manager": None}})
+    assert not index.is_above("bob", "alice")
+
+
+def test_org_index_catches_up_on_writes_from_another_store(store):
+    index = OrgIndex.from_store(store, sync_s=0.0)
+    assert index.is_above("bob", "alice")
+    # Another worker moves alice under dave
+    HRStore(store.path).upsert_many({"alice": {"manager": "dave"}})
+    assert not index.is_above("bob", "alice")
+    assert index.is_above("dave", "alice")
+    assert index.sync() == 0
+
+
+def test_default_stores_do_not_share_rows():
+    a, b = HRStore(), HRStore()
+    a.upsert_many(DEMO_PROFILES)
+    assert a.count() == len(DEMO_PROFILES)
+    assert b.count() == 0
@@ -0,0 +1,19 @@
+import json
+
+from ragkit.intent_classifier import DecisionLog
+
+
+def test_decision_log_flushes_every_row(tmp_path):
+    log = DecisionLog(str(tmp_path / "decisions.jsonl"))
+    for i in range(50):
+        log.write({"question": f"q{i}", "route": "hr"})
+    assert log.flush()
+    rows = [json.loads(line) for line in open(log.path)]
+    assert [r["question"] for r in rows] == [f"q{i}" for i in range(50)]
+
+
+def test_flush_returns_when_rows_cannot_be_written(tmp_path):
+    log = DecisionLog(str(tmp_path / "missing" / "decisions.jsonl"))
+    log.write({"question": "q"})
+    # An unwritable path drops the row; flush still returns
+    assert log.flush(timeout_s=1.0)
@@ -0,0 +1,157 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from ragkit.jwt_verify import JWTVerifier, KeySet
+
+SECRET = "test-secret-of-at-least-32-bytes!!"
+
+
+def claims(**extra):
+    now = int(time.time())
+    return {"iss": "test", "sub": "alice", "iat": now, "exp": now + 3600, **extra}
+
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def ec_jwk(key, kid):
+    return {
+        **json.loads(jwt.algorithms.ECAlgorithm.to_jwk(key.public_key())),
+        "kid": kid,
+        "alg": "ES256",
+    }
+
+
+@pytest.fixture
+def ec_keys():
+    return {kid: ec.generate_private_key(ec.SECP256R1()) for kid in ("k1", "k2")}
+
+
+def test_repeated_token_hits_the_cache():
+    verifier = JWTVerifier(secret=SECRET, issuer="test")
+    token = jwt.encode(claims(roles=["hr"]), SECRET, algorithm="HS256")
+    first = verifier.verify(token)
+    first["roles"].append("admin")  # callers may not touch the cached claims
+    second = verifier.verify(token)
+    assert second["sub"] == "alice"
+    assert verifier.stats()["hits"] == 1
+    assert verifier.stats()["misses"] == 1
+    assert verifier.cached(token)["sub"] == "alice"
+    assert verifier.cached(token + "x") is None
+
+
+def test_cached_entries_expire_with_the_token():
+    # The leeway lets the check pass; the cache still ends at the token's exp
+    verifier = JWTVerifier(secret=SECRET, issuer="test", leeway_s=60)
+    token = jwt.encode(claims(exp=int(time.time()) - 10), SECRET, algorithm="HS256")
+    verifier.verify(token)
+    assert verifier.cached(token) is None
+    verifier.verify(token)
+    assert (verifier.hits, verifier.misses) == (0, 2)
+
+
+def test_failures_are_not_cached():
+    verifier = JWTVerifier(secret=SECRET, issuer="test")
+    forged = jwt.encode(claims(), "another-secret-of-at-least-32-bytes", "HS256")
+    for _ in range(2):
+        with pytest.raises(jwt.InvalidSignatureError):
+            verifier.verify(forged)
+    assert verifier.stats()["failures"] == 2
+    assert verifier.stats()["cached"] == 0
+    with pytest.raises(jwt.InvalidIssuerError):
+        verifier.verify(jwt.encode(claims(iss="evil"), SECRET, algorithm="HS256"))
+    with pytest.raises(jwt.MissingRequiredClaimError):
+        verifier.verify(jwt.encode({"sub": "alice"}, SECRET, algorithm="HS256"))
+
+
+def test_cache_is_bounded():
+    verifier = JWTVerifier(secret=SECRET, issuer="test", maxsize=3)
+    tokens = [
+        jwt.encode(claims(sub=f"u{i}"), SECRET, algorithm="HS256") for i in range(5)
+    ]
+    for token in tokens:
+        verifier.verify(token)
+    assert verifier.stats()["cached"] == 3
+    assert verifier.cached(tokens[0]) is None
+    assert verifier.cached(tokens[-1]) is not None
+
+
+def test_none_and_unlisted_algorithms_are_refused(ec_keys):
+    with pytest.raises(ValueError):
+        JWTVerifier(("HS256", "none"), secret=SECRET)
+    verifier = JWTVerifier(secret=SECRET, issuer="test")
+    unsigned = jwt.encode(claims(), None, algorithm="none")
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        verifier.verify(unsigned)
+    signed = jwt.encode(claims(), ec_keys["k1"], algorithm="ES256")
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        verifier.verify(signed)
+
+
+def test_key_set_key_is_never_an_hmac_secret(ec_keys):
+    # Classic confusion: HS256 "signed" with the public key the server holds
+    jwks = {"keys": [ec_jwk(ec_keys["k1"], "k1")]}
+    verifier = JWTVerifier(
+        ("HS256", "ES256"), key_set=KeySet.from_jwks(jwks), issuer="test"
+    )
+    public_pem = (
+        ec_keys["k1"]
+        .public_key()
+        .public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    )
+    signing_input = b".".join(
+        b64url(json.dumps(part).encode())
+        for part in ({"alg": "HS256", "typ": "JWT", "kid": "k1"}, claims())
+    )
+    signature = hmac.new(public_pem, signing_input, hashlib.sha256).digest()
+    forged = (signing_input + b"." + b64url(signature)).decode()
+    with pytest.raises(jwt.PyJWTError):
+        verifier.verify(forged)
+    assert verifier.stats()["cached"] == 0
+
+
+def test_rotation_refetches_and_purges(ec_keys):
+    jwks = {"keys": [ec_jwk(ec_keys["k1"], "k1")]}
+    key_set = KeySet(lambda: jwks, min_refresh_s=0)
+    verifier = JWTVerifier(("ES256",), key_set=key_set, issuer="test")
+    old = jwt.encode(claims(), ec_keys["k1"], algorithm="ES256", headers={"kid": "k1"})
+    verifier.verify(old)
+
+    # A new kid is fetched on first sight
+    jwks = {"keys": [ec_jwk(ec_keys["k1"], "k1"), ec_jwk(ec_keys["k2"], "k2")]}
+    new = jwt.encode(claims(), ec_keys["k2"], algorithm="ES256", headers={"kid": "k2"})
+    assert verifier.verify(new)["sub"] == "alice"
+    assert set(key_set.kids()) == {"k1", "k2"}
+
+    # A kid that leaves the set takes its cached tokens with it
+    jwks = {"keys": [ec_jwk(ec_keys["k2"], "k2")]}
+    assert key_set.refresh()
+    assert verifier.cached(old) is None
+    assert verifier.cached(new) is not None
+    with pytest.raises(jwt.InvalidKeyError):
+        verifier.verify(old)
+
+
+def test_failed_fetch_keeps_the_old_keys(ec_keys):
+    state = {"jwks": {"keys": [ec_jwk(ec_keys["k1"], "k1")]}}
+
+    def fetch():
+        if state["jwks"] is None:
+            raise OSError("IdP down")
+        return state["jwks"]
+
+    key_set = KeySet(fetch)
+    state["jwks"] = None
+    assert not key_set.refresh()
+    assert key_set.kids() == ("k1",)
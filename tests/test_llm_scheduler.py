@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+import pytest
+
+from ragkit.llm_scheduler import LLMScheduler, Overloaded
+
+
+def drained(rpm, tpm, **kwargs):
+    scheduler = LLMScheduler(rpm=rpm, tpm=tpm, **kwargs)
+    scheduler.tokens.take(scheduler.tokens.capacity)
+    return scheduler
+
+
+def test_interactive_waiter_overtakes_an_armed_batch_timer():
+    # 1,000 tokens/s from an empty bucket: the batch head needs 10 s, the
+    # interactive call 0.1 s, and must not wait for the batch head's timer
+    scheduler = drained(60_000, 60_000)
+
+    async def main():
+        batch = asyncio.ensure_future(scheduler.acquire(10_000, lane="batch"))
+        await asyncio.sleep(0.01)
+        t0 = time.monotonic()
+        await scheduler.acquire(100, lane="interactive")
+        elapsed = time.monotonic() - t0
+        assert not batch.done()
+        batch.cancel()
+        return elapsed
+
+    assert asyncio.run(main()) < 1.0
+    assert scheduler.admitted == {"interactive": 1, "batch": 0}
+    assert scheduler.shed == {"interactive": 0, "batch": 0}
+
+
+def test_interactive_is_shed_when_the_predicted_wait_is_too_long():
+    scheduler = drained(60_000, 60_000, max_queue_s={"interactive": 0.5, "batch": 60})
+
+    async def main():
+        with pytest.raises(Overloaded):
+            await scheduler.acquire(5_000, lane="interactive")
+
+    asyncio.run(main())
+    assert scheduler.shed["interactive"] == 1
@@ -0,0 +1,89 @@
+import csv
+import io
+
+import numpy as np
+import pytest
+
+from ragkit.overtime import CSVOvertime, compute, iter_csv
+from ragkit.policy_rules import PolicyRules
+
+RULES = PolicyRules.compile(
+    "- Employees with 1 year of service receive 1.25x overtime pay.\n"
+    "- Employees with exactly 2 years of service receive 1.5x overtime pay.\n"
+    "- Employees with more than 2 years of service receive 1.7x overtime pay.\n"
+)
+
+
+def run(*chunks, chunk_bytes=4 << 20):
+    out = b"".join(iter_csv(iter(chunks), RULES, chunk_bytes))
+    return list(csv.reader(io.StringIO(out.decode())))
+
+
+def test_compute_matches_the_tiers():
+    out = compute(
+        RULES,
+        np.array([0.8, 1, 2, 3.4]),
+        np.array([10, 10, 4, 1.5]),
+        np.array([50, 50, 10, 100]),
+    )
+    assert out["multiplier"].tolist() == [1.0, 1.25, 1.5, 1.7]
+    assert out["paid_hours"].tolist() == [10.0, 12.5, 6.0, 2.55]
+    assert out["overtime_pay"].tolist() == [500.0, 625.0, 60.0, 255.0]
+
+
+def test_stream_split_anywhere():
+    rows = run(
+        b"user,years,ho",
+        b"urs,rate\nalice,0.8,10,50\nbob,1,10,50\n",
+        b"carol,2,4,10\ndave,3.4,1.5,100",
+    )
+    assert rows == [
+        ["user", "multiplier", "paid_hours", "overtime_pay", "error"],
+        ["alice", "1.00", "10.00", "500.00", ""],
+        ["bob", "1.25", "12.50", "625.00", ""],
+        ["carol", "1.50", "6.00", "60.00", ""],
+        ["dave", "1.70", "2.55", "255.00", ""],
+    ]
+
+
+def test_small_chunks_keep_every_row():
+    body = b"years,hours\n" + b"2.5,1\n" * 1000
+    rows = run(body, chunk_bytes=64)
+    assert len(rows) == 1001
+    assert rows[0] == ["multiplier", "paid_hours", "error"]
+    assert set(map(tuple, rows[1:])) == {("1.70", "1.70", "")}
+
+
+def test_bad_rows_are_reported_not_raised():
+    rows = run(
+        b"user,years,hours\nalice,1,10\nbob,abc,5\ncarol,2\ndave,-1,3\nerin,3,2\n"
+    )
+    assert rows[1] == ["alice", "1.25", "12.50", ""]
+    assert rows[2] == ["bob", "", "", "bad years: 'abc'"]
+    assert rows[3] == ["carol", "", "", "expected 3 fields, got 2"]
+    assert rows[4] == ["dave", "", "", "bad years: '-1'"]
+    assert rows[5] == ["erin", "1.70", "3.40", ""]
+
+
+def test_quoted_users_round_trip():
+    rows = run(b'user,years,hours\n"Doe, J",1,10\n"say ""hi""",2,1\nplain,3,1\n')
+    assert rows[1:] == [
+        ["Doe, J", "1.25", "12.50", ""],
+        ['say "hi"', "1.50", "1.50", ""],
+        ["plain", "1.70", "1.70", ""],
+    ]
+
+
+@pytest.mark.parametrize(
+    "body, message", [(b"a,b\n1,2\n", "missing column"), (b"", "empty input")]
+)
+def test_bad_header_raises_before_any_output(body, message):
+    with pytest.raises(ValueError, match=message):
+        next(iter_csv(iter([body]), RULES))
+
+
+def test_rows_are_counted():
+    engine = CSVOvertime(RULES)
+    engine.feed(b"years,hours\n1,1\n2,2\n")
+    engine.close()
+    assert engine.rows == 2
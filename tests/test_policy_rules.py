@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from ragkit.answers import render_rule_answer, rule_question
+from ragkit.policy_rules import PolicyRules, parse_tenure, parse_tier
+from ragkit.signals import DEFAULT_SIGNALS_FILE, SignalMatcher
+
+POLICY = (
+    "Company Overtime Policy\n"
+    "- Employees with 1 year of service receive 1.25x overtime pay.\n"
+    "- Employees with exactly 2 years of service receive 1.5x overtime pay.\n"
+    "- Employees with more than 2 years of service receive 1.7x overtime pay.\n"
+    "- Paid Time Off (PTO) accrues per department policy and role.\n"
+)
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return PolicyRules.compile(POLICY, "test")
+
+
+@pytest.fixture(scope="module")
+def signals():
+    return SignalMatcher.from_file(DEFAULT_SIGNALS_FILE)
+
+
+def routed(signals, question):
+    return rule_question(question, signals.match(question).intents)
+
+
+@pytest.mark.parametrize(
+    "years, expected",
+    [(0, 1.0), (0.8, 1.0), (1, 1.25), (1.5, 1.25), (2, 1.5), (2.01, 1.7), (40, 1.7)],
+)
+def test_tiers_match_policy(rules, years, expected):
+    assert rules.multiplier(years) == expected
+    assert rules.multipliers(np.array([years])).tolist() == [expected]
+
+
+@pytest.mark.parametrize(
+    "sentence, bounds",
+    [
+        ("Employees with exactly 2 years get 1.5x overtime.", (2, True, 2, True)),
+        ("More than 2 years of service: 1.7x overtime.", (2, False, None, False)),
+        ("At least 3 years of service: 2x overtime.", (3, True, None, False)),
+        ("5+ years of service earn 2.5x overtime.", (5, True, None, False)),
+        ("Less than 1 year of service: 1.1x overtime.", (0, True, 1, False)),
+        ("Between 3 and 5 years of service: 1.8x overtime.", (3, True, 5, True)),
+        ("1 year of service gets 1.25x overtime pay.", (1, True, 2, False)),
+    ],
+)
+def test_parse_tier_bounds(sentence, bounds):
+    tier = parse_tier(sentence)
+    assert tier is not None
+    assert (tier.lo, tier.lo_closed, tier.hi, tier.hi_closed) == bounds
+
+
+def test_sentences_without_a_tier_are_skipped():
+    assert parse_tier("PTO accrues per department policy.") is None
+    with pytest.raises(ValueError):
+        PolicyRules.compile("Company Leave Policy\nNo overtime rules here.")
+
+
+def test_version_follows_the_rules(rules):
+    assert PolicyRules.compile(POLICY).version == rules.version
+    edited = POLICY.replace("1.7x", "1.8x")
+    assert PolicyRules.compile(edited).version != rules.version
+    assert PolicyRules.from_json(rules.to_json()).version == rules.version
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ("What is the overtime multiplier after two years?", (True, 2.0)),
+        ("What's the overtime rate with 18 months of service?", (True, 1.5)),
+        ("what is the multiplier at 2 years of service?", (True, 2.0)),
+        ("overtime rate for two and a half years", (True, 2.5)),
+        ("overtime rate after a year", (True, 1.0)),
+        ("what's my overtime rate", (False, None)),
+        ("overtime rate for my years of service", (False, None)),
+        ("overtime rate for more than 2 years", (True, None)),
+        ("overtime rate after a few years", (True, None)),
+        ("overtime rate at 3 years vs 1 year", (True, None)),
+    ],
+)
+def test_parse_tenure(question, expected):
+    assert parse_tenure(question) == expected
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ("What's my overtime rate?", (True, None)),
+        ("What is the overtime multiplier after two years?", (True, 2.0)),
+        ("What's the overtime rate with 18 months of service?", (True, 1.5)),
+        ("what is the multiplier at 2 years of service?", (True, 2.0)),
+        # Not about overtime: the rules must not answer them
+        ("What is my rate of PTO accrual?", (False, None)),
+        ("what is my rate of pay?", (False, None)),
+        ("what's my multiplier?", (False, None)),
+        # Narrative, about someone else, or a tenure that cannot be read: LLM
+        ("Why is my overtime rate 1.25x?", (False, None)),
+        ("what's my manager's overtime rate?", (False, None)),
+        ("overtime rate after several years?", (False, None)),
+        ("overtime multiplier for more than 2 years?", (False, None)),
+    ],
+)
+def test_rule_question_routing(signals, question, expected):
+    assert routed(signals, question) == expected
+
+
+def test_rule_answer_cites_the_policy(rules):
+    text = render_rule_answer(rules, 2.0, personal=False)
+    assert "the overtime multiplier is 1.50x" in text
+    assert "exactly 2 years" in text
+    assert "1 year of service your" in render_rule_answer(rules, 1.0)
+    assert "No overtime tier" in render_rule_answer(rules, 0.5)
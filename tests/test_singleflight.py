@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from ragkit import tracing, usage
+from ragkit.llm_scheduler import llm_priority
+from ragkit.singleflight import SingleFlight, make_key
+
+
+class Capture:
+    def __init__(self):
+        self.exported = []
+
+    def export(self, spans):
+        self.exported.append(spans)
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = tracing.Tracer(Capture())
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    monkeypatch.setattr(tracing, "_tracer_ready", True)
+    return tracer
+
+
+@pytest.fixture
+def meter(monkeypatch, tmp_path):
+    meter = usage.UsageMeter(str(tmp_path / "usage.sqlite"), "test", flush_s=3600)
+    monkeypatch.setattr(usage, "_meter", meter)
+    return meter
+
+
+def run_tagged(user, coro):
+    """Run coro as a request attributed to user."""
+
+    async def tagged():
+        usage._request.set(usage.RequestUsage({"path": "/ask"}))
+        usage.tag_usage(user=user)
+        return await coro
+
+    return asyncio.ensure_future(tagged())
+
+
+def test_make_key_normalizes_and_personalizes():
+    assert make_key("What is  my rate?") == make_key("what is my rate?")
+    assert make_key("q", years=1) != make_key("q", years=2)
+
+
+def test_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["answer"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {
+        "calls": 5,
+        "executions": 1,
+        "coalesced": 4,
+        "in_flight": 0,
+    }
+
+
+def test_lanes_do_not_coalesce():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def batch():
+        with llm_priority("batch"):
+            return await flight.do("k", work)
+
+    async def main():
+        return await asyncio.gather(flight.do("k", work), batch(), flight.do("k", work))
+
+    asyncio.run(main())
+    assert (flight.executions, flight.coalesced) == (2, 1)
+
+
+def test_cancelling_the_leader_keeps_the_followers():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "answer"
+
+
+def test_followers_get_their_own_usage_and_trace_link(tracer, meter):
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def request(user):
+        root = tracer.start("POST /ask")
+        token = tracing._current_span.set(root)
+        try:
+            return await flight.do("k", work)
+        finally:
+            tracing._current_span.reset(token)
+            tracer.end(root)
+
+    async def main():
+        return await asyncio.gather(
+            run_tagged("alice", request("alice")), run_tagged("bob", request("bob"))
+        )
+
+    asyncio.run(main())
+    leader_trace, follower_trace = tracer.exporter.exported
+    (link,) = [s for s in follower_trace if s.name == "singleflight.follow"]
+    leader_root = leader_trace[-1]
+    assert link.attributes == {
+        "leader.trace_id": leader_root.trace_id,
+        "leader.span_id": leader_root.span_id,
+    }
+    rows = meter.report(["user", "kind"])["rows"]
+    assert [(r["user"], r["kind"], r["calls"]) for r in rows] == [
+        ("bob", "coalesced", 1)
+    ]
+    assert rows[0]["prompt_tokens"] == rows[0]["completion_tokens"] == 0
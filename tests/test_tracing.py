@@ -0,0 +1,88 @@
+import logging
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from ragkit.tracing import FileExporter, Tracer, parse_traceparent
+
+
+class Capture:
+    def __init__(self):
+        self.exported = []
+
+    def export(self, spans):
+        self.exported.append(spans)
+
+
+def test_parse_traceparent():
+    tid, pid = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    assert parse_traceparent(f"00-{tid}-{pid}-01") == (tid, pid)
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+
+def test_requests_continuing_one_traceparent_export_separately():
+    exporter = Capture()
+    tracer = Tracer(exporter)
+    remote = ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7")
+    first = tracer.start("POST /ask", remote=remote)
+    second = tracer.start("POST /ask", remote=remote)
+    a = tracer.start("llm", parent=first)
+    b = tracer.start("llm", parent=second)
+    tracer.end(a)
+    tracer.end(first)
+    tracer.end(b)
+    tracer.end(second)
+    assert [[s.span_id for s in spans] for spans in exporter.exported] == [
+        [a.span_id, first.span_id],
+        [b.span_id, second.span_id],
+    ]
+    assert {s.trace_id for spans in exporter.exported for s in spans} == {remote[0]}
+
+
+def test_late_span_is_exported_alone():
+    exporter = Capture()
+    tracer = Tracer(exporter)
+    root = tracer.start("GET /")
+    late = tracer.start("cleanup", parent=root)
+    tracer.end(root)
+    tracer.end(late)
+    assert [len(spans) for spans in exporter.exported] == [1, 1]
+
+
+def test_export_failures_are_logged_once(tmp_path, caplog):
+    exporter = FileExporter(str(tmp_path / "missing" / "traces.jsonl"))
+    tracer = Tracer(exporter)
+    with caplog.at_level(logging.ERROR, logger="ragkit.tracing"):
+        for _ in range(3):
+            tracer.end(tracer.start("GET /"))
+        deadline = time.monotonic() + 5
+        while exporter.failures < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert exporter.failures == 3
+    assert len([r for r in caplog.records if r.name == "ragkit.tracing"]) == 1
+
+
+def test_flush_waits_for_queued_traces(tmp_path):
+    exporter = FileExporter(str(tmp_path / "traces.jsonl"))
+    tracer = Tracer(exporter)
+    for _ in range(3):
+        tracer.end(tracer.start("GET /"))
+    assert exporter.flush()
+    assert len((tmp_path / "traces.jsonl").read_text().splitlines()) == 3
+
+
+def test_traces_are_written_before_exit(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    script = (
+        "from ragkit.tracing import get_tracer\n"
+        "t = get_tracer()\n"
+        "for _ in range(3):\n"
+        "    t.end(t.start('cli'))\n"
+    )
+    env = {**os.environ, "TRACE_EXPORT": "file", "TRACE_FILE": str(path)}
+    root = Path(__file__).resolve().parent.parent
+    subprocess.run([sys.executable, "-c", script], cwd=root, env=env, check=True)
+    assert len(path.read_text().splitlines()) == 3